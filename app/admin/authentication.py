@@ -2,15 +2,16 @@ from typing import Optional
 from datetime import datetime
 
 
+from fastapi.concurrency import run_in_threadpool
 from sqladmin.authentication import AuthenticationBackend
 from starlette.requests import Request
 from starlette.responses import RedirectResponse
-from sqlalchemy import select, or_
+from sqlalchemy import exists, select
 
 
 from app.logger import log
 from app.config import Settings, get_settings
-from app.database import get_db
+from app.database import db, get_async_session_factory
 import app.model as m
 import app.schema as s
 from app.oauth2 import (
@@ -20,30 +21,33 @@ from app.oauth2 import (
 )
 
 settings: Settings = get_settings()
-db = get_db().__next__()
+
+
+def login_superuser(user_id: str, password: str) -> int | None:
+    """id of authenticated superuser, session per call
+
+    Runs in threadpool, password hashing would block the event loop
+    """
+    with db.Session() as session:
+        superuser = m.SuperUser.authenticate(session, user_id, password)
+        if not superuser:
+            return None
+        superuser.last_login = datetime.utcnow()
+        session.commit()
+        return superuser.id
 
 
 class AdminAuth(AuthenticationBackend):
     async def login(self, request: Request) -> bool:
         form = await request.form()
         email = form["username"]
-        admin = db.scalar(
-            select(m.SuperUser).where(
-                or_(m.SuperUser.email == email, m.SuperUser.username == email)
-            )
-        )
-        if not admin:
-            log(log.INFO, "%s is not a superuser", email)
-            return RedirectResponse(request.url_for("admin:login"), status_code=302)
-        password = form["password"]
-        superuser = m.SuperUser.authenticate(db, email, password)
-        if not superuser:
+        superuser_id = await run_in_threadpool(login_superuser, email, form["password"])
+        if not superuser_id:
+            log(log.INFO, "%s is not authenticated as superuser", email)
             return RedirectResponse(request.url_for("admin:login"), status_code=302)
-        session_token = create_access_token(data={"user_id": superuser.id})
+        session_token = create_access_token(data={"user_id": superuser_id})
         # And update session
         request.session.update({"token": session_token})
-        superuser.last_login = datetime.utcnow()
-        db.commit()
         return True
 
     async def logout(self, request: Request) -> bool:
@@ -57,9 +61,11 @@ class AdminAuth(AuthenticationBackend):
         token_data: s.TokenData = verify_access_token(
             session_token, INVALID_CREDENTIALS_EXCEPTION
         )
-        if not db.query(m.SuperUser).filter_by(id=token_data.user_id).first():
-            return False
-        return True
+        async with get_async_session_factory()() as session:
+            is_superuser: bool = await session.scalar(
+                select(exists().where(m.SuperUser.id == token_data.user_id))
+            )
+        return is_superuser
 
 
 authentication_backend = AdminAuth(secret_key=settings.JWT_SECRET)
@@ -0,0 +1,35 @@
+import sqlalchemy as sa
+from starlette.requests import Request
+
+from app.database import get_engine
+
+# tables with less rows are counted exactly
+ESTIMATED_COUNT_MIN_ROWS = 10000
+
+
+class EstimatedCountMixin:
+    """Total of not filtered list page taken from postgres table statistics
+
+    count(*) scans the whole table, an estimate is enough for pagination of big
+    tables. Exact count is used on other databases and for small or not analyzed
+    tables. Search results are counted exactly by sqladmin
+    """
+
+    def count_query(self, request: Request) -> sa.Select:
+        table: sa.Table = self.model.__table__
+        exact_count = sa.select(sa.func.count()).select_from(table)
+        if get_engine().dialect.name != "postgresql":
+            return exact_count
+
+        estimate = (
+            sa.select(sa.cast(sa.column("reltuples"), sa.BigInteger))
+            .select_from(sa.table("pg_class"))
+            .where(sa.column("oid") == sa.func.to_regclass(table.name))
+            .scalar_subquery()
+        )
+        return sa.select(
+            sa.case(
+                (estimate >= ESTIMATED_COUNT_MIN_ROWS, estimate),
+                else_=exact_count.scalar_subquery(),
+            )
+        )
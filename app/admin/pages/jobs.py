@@ -1,10 +1,12 @@
 from sqladmin import ModelView, action
 from fastapi.responses import RedirectResponse
+from sqlalchemy import select
 
 from app.model import Job
+from .estimated_count import EstimatedCountMixin
 
 
-class JobAdmin(ModelView, model=Job):
+class JobAdmin(EstimatedCountMixin, ModelView, model=Job):
     """Class for setting up the Admin panel for the User model"""
 
     # Metadata
@@ -88,14 +90,12 @@ class JobAdmin(ModelView, model=Job):
     )
     async def delete_job(self, request) -> None:
         """set job.is_deleted to True and don't delete the job"""
-        pks = request.query_params.get("pks", "").split(",")
-        for pk in pks:
-            model: Job = await self.get_object_for_edit(pk)
-            model.is_deleted = True
-
-        session = self.session_maker()
-        session.add(model)
-        session.commit()
+        pks = [int(pk) for pk in request.query_params.get("pks", "").split(",") if pk]
+        with self.session_maker() as session:
+            # ORM update, so flush listeners refresh users and price stats
+            for job in session.scalars(select(Job).where(Job.id.in_(pks))):
+                job.is_deleted = True
+            session.commit()
 
         referer = request.headers.get("Referer")
         if referer:
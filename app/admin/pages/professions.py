@@ -1,7 +1,9 @@
 from sqladmin import ModelView, action
 from fastapi.responses import RedirectResponse
+from sqlalchemy import select
 
 from app.model import Profession
+from app.controller import reference_cache, PROFESSIONS_CACHE_KEY
 
 
 class ProfessionAdmin(ModelView, model=Profession):
@@ -49,6 +51,12 @@ class ProfessionAdmin(ModelView, model=Profession):
     page_size = 25
     page_size_options = [25, 50, 100, 200]
 
+    async def after_model_change(self, data, model, is_created, request) -> None:
+        reference_cache.invalidate(PROFESSIONS_CACHE_KEY)
+
+    async def after_model_delete(self, model, request) -> None:
+        reference_cache.invalidate(PROFESSIONS_CACHE_KEY)
+
     @action(
         name="delete_profession",
         label="Mark as deleted",
@@ -57,14 +65,15 @@ class ProfessionAdmin(ModelView, model=Profession):
     )
     async def delete_profession(self, request) -> None:
         """set profession.is_deleted to True and don't delete the profession"""
-        pks = request.query_params.get("pks", "").split(",")
-        for pk in pks:
-            model: Profession = await self.get_object_for_edit(pk)
-            model.is_deleted = True
-
-        session = self.session_maker()
-        session.add(model)
-        session.commit()
+        pks = [int(pk) for pk in request.query_params.get("pks", "").split(",") if pk]
+        with self.session_maker() as session:
+            # ORM update, so flush listeners see the change
+            for profession in session.scalars(
+                select(Profession).where(Profession.id.in_(pks))
+            ):
+                profession.is_deleted = True
+            session.commit()
+        reference_cache.invalidate(PROFESSIONS_CACHE_KEY)
 
         referer = request.headers.get("Referer")
         if referer:
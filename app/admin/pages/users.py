@@ -1,9 +1,10 @@
 from sqladmin import ModelView
 
 from app.model import User
+from .estimated_count import EstimatedCountMixin
 
 
-class UserAdmin(ModelView, model=User):
+class UserAdmin(EstimatedCountMixin, ModelView, model=User):
     """Class for setting up the Admin panel for the User model"""
 
     # Metadata
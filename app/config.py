@@ -6,7 +6,34 @@ class Settings(BaseSettings):
     JWT_SECRET: str
     ACCESS_TOKEN_EXPIRE_MINUTES: int
     DATABASE_URI: str
+
+    # DATABASE POOLS, sync pool per process shared by api, admin and celery,
+    # async pool only in api processes serving async read endpoints;
+    # every api worker process keeps up to
+    # DB_POOL_SIZE + DB_MAX_OVERFLOW + DB_ASYNC_POOL_SIZE + DB_ASYNC_MAX_OVERFLOW
+    # connections, celery worker process up to DB_POOL_SIZE + DB_MAX_OVERFLOW
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_ASYNC_POOL_SIZE: int = 5
+    DB_ASYNC_MAX_OVERFLOW: int = 5
+    DB_POOL_TIMEOUT: int = 30
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    # postgres only, 0 - no timeout
+    DB_STATEMENT_TIMEOUT_MS: int = 0
+    # PgBouncer in transaction pooling mode: connections are pooled by PgBouncer,
+    # no prepared statements cache, statement timeout is set per transaction
+    DB_PGBOUNCER: bool = False
+    # log connections kept out of pool longer, 0 - never
+    DB_CONNECTION_HOLD_WARNING_MS: int = 1000
+
     DEFAULT_PAGE_SIZE: int = 10
+    JOBS_PAGE_SIZE: int = 20
+    JOBS_MAX_PAGE_SIZE: int = 100
+    NOTIFICATIONS_PAGE_SIZE: int = 20
+    NOTIFICATIONS_MAX_PAGE_SIZE: int = 100
+    PAYMENTS_PAGE_SIZE: int = 20
+    PAYMENTS_MAX_PAGE_SIZE: int = 100
     DEFAULT_AVATAR_PROFILE_URL: str = (
         "https://storage.googleapis.com/tenkabel-stage/default_profile_image.png"
     )
@@ -19,21 +46,63 @@ class Settings(BaseSettings):
     PAY_PLUS_PAYMENT_PAGE_ID: str = ""
     PAYPLUS_CURRENCY_CODE: str = "ILS"
     PAY_PLUS_DISABLED: bool = False
+    # parallel charges of weekly fee collection, each holds a db connection
+    PAY_PLUS_CHARGE_CONCURRENCY: int = 4
+    PAY_PLUS_TIMEOUT: float = 15
+    PAY_PLUS_CONNECT_TIMEOUT: float = 3
+    PAY_PLUS_MAX_CONNECTIONS: int = 20
+    PAY_PLUS_RETRIES: int = 2
+    PAY_PLUS_RETRY_BACKOFF_SECONDS: float = 0.5
+    # consecutive failures opening circuit breaker, 0 - never open
+    PAY_PLUS_CIRCUIT_FAILURES: int = 5
+    PAY_PLUS_CIRCUIT_RESET_SECONDS: int = 30
+    # in-process fake PayPlus server (app.controller.payplus_fake) for benchmarks
+    PAY_PLUS_FAKE: bool = False
+    PAY_PLUS_FAKE_LATENCY_MS: int = 0
+    PAY_PLUS_FAKE_REJECT_RATE: float = 0.0
+    PAY_PLUS_WEBHOOK_MAX_RETRIES: int = 5
 
     # GOOGLE
     GOOGLE_STORAGE_BUCKET_NAME: str = "tenkabel-dev"
     GOOGLE_SERVICE_ACCOUNT_PATH: str = "./google_cloud_service_account.json"
 
+    # Files storage: gcs, local or memory
+    STORAGE_BACKEND: str = "gcs"
+    LOCAL_STORAGE_PATH: str = "./storage"
+    LOCAL_STORAGE_URL: str = "http://127.0.0.1:8000/storage"
+    # direct uploads to local or memory storage
+    STORAGE_UPLOAD_URL: str = "http://127.0.0.1:8000/api/files/storage"
+    FILE_UPLOAD_URL_EXPIRES_SECONDS: int = 900
+    FILE_MAX_SIZE: int = 25 * 1024 * 1024
+    USER_FILES_QUOTA: int = 1024 * 1024 * 1024
+
     # REDIS
     REDIS_URL: str = "redis://:password@redis"
     FEE_PAY_DAY: int = 3
     DAILY_REPORT_HOURS: int = 22
     DAILY_REPORT_MINUTES: int = 0
 
+    # Image variants
+    IMAGE_MAX_RETRIES: int = 3
+    IMAGE_RETRY_SECONDS: int = 60
+
+    # Push notifications
+    PUSH_COALESCE_SECONDS: int = 5
+    # queued notifications older than that are not delivered
+    PUSH_EXPIRES_SECONDS: int = 3600
+    PUSH_MAX_RETRIES: int = 5
+    PUSH_RETRY_BACKOFF_SECONDS: int = 2
+    PUSH_RETRY_BACKOFF_MAX_SECONDS: int = 300
+
     VAT_COEFFICIENT: float = 1.17
     COMMISSION_COEFFICIENT: float = 0.009
 
     POPULAR_TAGS_LIMIT: int = 5
+    REFERENCE_CACHE_TTL: int = 300
+    # seconds authenticated user flags are cached, 0 - no cache
+    PRINCIPAL_CACHE_TTL: int = 30
+    # price range of /options/price histogram buckets
+    JOB_PRICE_BUCKET_SIZE: int = 100
     MINIMUM_MOBILE_APP_VERSION: str
 
     APP_STORE_LINK: str
@@ -1,9 +1,17 @@
 # flake8: noqa F401
 from .mail_client import MailClient
-from .pagination import create_pagination
+from .pagination import (
+    create_pagination,
+    encode_cursor,
+    decode_cursor,
+    paginate_by_cursor,
+    paginate_by_cursor_async,
+)
 from .push_notification import PushHandler
 from .notification import (
     job_created_notify,
+    create_notifications_schemas,
+    create_notifications_schemas_async,
     handle_job_status_update_notification,
     handle_job_payment_notification,
     handle_job_commission_notification,
@@ -12,6 +20,7 @@ from .user import (
     manage_tab_controller,
     delete_device,
     delete_user_view,
+    payments_tab_query,
 )
 from .rate import create_rate_controller
 from .payplus import (
@@ -25,3 +34,21 @@ from .platform_payment import (
     create_application_payments,
 )
 from .attachment import AttachmentController
+from .image import ImageController, ImageError
+from .job_search import filter_jobs_by_search_query, update_jobs_search_vector
+from .user_stats import update_users_stats
+from .job_price_stats import (
+    job_price_option,
+    update_job_price_stats,
+    update_jobs_price_stats,
+)
+from .payment_method import update_users_payment_method, check_users_payment_method
+from .reference_cache import (
+    reference_cache,
+    cached_json_response,
+    cached_json_response_async,
+    serialize,
+    PROFESSIONS_CACHE_KEY,
+    LOCATIONS_CACHE_KEY,
+    POPULAR_TAGS_CACHE_KEY,
+)
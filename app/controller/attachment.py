@@ -1,15 +1,25 @@
+import hashlib
+import mimetypes
+
 from fastapi import HTTPException, status, UploadFile
-from google.cloud.exceptions import GoogleCloudError
-from google.cloud import storage
+from kombu.exceptions import OperationalError
+from redis import RedisError
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import SQLAlchemyError
-from sqlalchemy import select
+from sqlalchemy import func, select
 
 from app import model as m
 from app import schema as s
 from app.logger import log
 from app.config import Settings
+from app.database import release_connection
+from app.utility import generate_uuid
 from app.dependency.file import get_file_by_uuid
+from .image import ImageController
+from .storage import StorageBackend, StorageError
+
+
+HASH_CHUNK_SIZE = 1024 * 1024
 
 
 class AttachmentController:
@@ -22,27 +32,232 @@ class AttachmentController:
         return s.enums.AttachmentType.DOCUMENT
 
     @staticmethod
-    def upload_file_to_google_cloud_storage(
-        filename: str,
+    def upload_file_to_storage(
         file: UploadFile,
         destination_filename: str,
-        google_storage_client,
+        storage: StorageBackend,
+    ) -> str:
+        """returns public url of uploaded file"""
+        try:
+            return storage.upload(
+                destination_filename, file.file, content_type=file.content_type
+            )
+        except StorageError as e:
+            log(log.INFO, "Error while uploading file to storage:\n%s", e)
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="Error while uploading file to storage",
+            )
+
+    @staticmethod
+    def get_content_hash(file: UploadFile) -> str:
+        """SHA-256 of spooled upload, read by chunks"""
+        content_hash = hashlib.sha256()
+        file.file.seek(0)
+        while chunk := file.file.read(HASH_CHUNK_SIZE):
+            content_hash.update(chunk)
+        file.file.seek(0)
+        return content_hash.hexdigest()
+
+    @staticmethod
+    def get_user_file_by_content_hash(
+        content_hash: str, user: m.User, db: Session
+    ) -> m.File | None:
+        return db.scalar(
+            select(m.File).where(
+                m.File.user_id == user.id,
+                m.File.content_hash == content_hash,
+                m.File.is_uploaded.is_(True),
+                m.File.is_deleted.is_(False),
+            )
+        )
+
+    @staticmethod
+    def get_user_files_size(user: m.User, db: Session) -> int:
+        return db.scalar(
+            select(func.coalesce(func.sum(m.File.size), 0)).where(
+                m.File.user_id == user.id,
+                m.File.is_uploaded.is_(True),
+                m.File.is_deleted.is_(False),
+            )
+        )
+
+    @staticmethod
+    def check_user_quota(size: int, user: m.User, db: Session, settings: Settings):
+        if size > settings.FILE_MAX_SIZE:
+            log(log.INFO, "File size %d exceeds limit", size)
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail="File is too large",
+            )
+        if (
+            AttachmentController.get_user_files_size(user, db) + size
+            > settings.USER_FILES_QUOTA
+        ):
+            log(log.INFO, "User [%s] files quota exceeded", user.id)
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail="Files quota exceeded",
+            )
+
+    @staticmethod
+    def create_upload_slot(
+        data: s.FileUploadIn,
+        user: m.User,
+        db: Session,
+        storage: StorageBackend,
+        settings: Settings,
+    ) -> s.FileUploadOut:
+        """pending file and url for client to upload its content directly to storage
+
+        No upload is needed if user already has a file with the same content hash
+        """
+        if data.content_hash:
+            user_file = AttachmentController.get_user_file_by_content_hash(
+                data.content_hash, user, db
+            )
+            if user_file:
+                log(log.INFO, "File %s with same content already uploaded", user_file)
+                return s.FileUploadOut(file=user_file, upload_url=None, headers={})
+
+        AttachmentController.check_user_quota(data.size, user, db, settings)
+
+        file_uuid = generate_uuid()
+        # own folder for every upload, so files with same names don't overwrite
+        path = f"attachments/{user.uuid}/{file_uuid}/{data.filename}"
+        file = m.File(
+            uuid=file_uuid,
+            user_id=user.id,
+            original_filename=data.filename,
+            url=storage.public_url(path),
+            path=path,
+            size=data.size,
+            content_type=data.content_type,
+            content_hash=data.content_hash,
+            is_uploaded=False,
+        )
+        db.add(file)
+        try:
+            db.commit()
+        except SQLAlchemyError as e:
+            log(log.ERROR, "Upload slot for file %s failed - %s", data.filename, e)
+            db.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="Failed to create upload slot",
+            )
+        log(log.INFO, "Upload slot for file %s created", file)
+
+        return s.FileUploadOut(
+            file=file,
+            upload_url=storage.signed_upload_url(
+                path, data.content_type, settings.FILE_UPLOAD_URL_EXPIRES_SECONDS
+            ),
+            headers={"Content-Type": data.content_type},
+        )
+
+    @staticmethod
+    def confirm_upload(
+        file: m.File,
+        user: m.User,
+        db: Session,
+        storage: StorageBackend,
         settings: Settings,
-    ) -> storage.Blob:
-        bucket = google_storage_client.get_bucket(settings.GOOGLE_STORAGE_BUCKET_NAME)
+    ) -> m.File:
+        """check uploaded content of pending file, rejected content is deleted"""
+        if file.is_uploaded:
+            log(log.INFO, "File %s is already uploaded", file)
+            return file
 
-        blob = bucket.blob(filename)
-        blob = bucket.blob(destination_filename)
+        path = file.storage_path
+        release_connection(db)
         try:
-            blob.upload_from_file(file.file)
-        except GoogleCloudError as e:
-            log(log.INFO, "Error while uploading file to google cloud storage:\n%s", e)
+            stored = storage.stat(path)
+        except StorageError as e:
+            log(log.INFO, "Error while reading file %s from storage:\n%s", file, e)
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="Error while reading file from storage",
+            )
+        if not stored:
+            log(log.INFO, "File %s content not found in storage", file)
             raise HTTPException(
                 status_code=status.HTTP_409_CONFLICT,
-                detail="Error while uploading file to google cloud storage",
+                detail="File is not uploaded",
+            )
+
+        # local storage doesn't keep content type
+        if stored.size != file.size or (
+            stored.content_type and stored.content_type != file.content_type
+        ):
+            log(
+                log.INFO,
+                "File %s content %s doesn't match declared size %d and type %s",
+                file,
+                stored,
+                file.size,
+                file.content_type,
+            )
+            AttachmentController.delete_file_from_storage(path, storage)
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail="Uploaded file doesn't match declared size or type",
             )
 
-        return blob
+        AttachmentController.check_user_quota(file.size, user, db, settings)
+        file.is_uploaded = True
+        # declared hash is used for dedup once it is checked by celery worker,
+        # content is not read by api
+        content_hash, file.content_hash = file.content_hash, None
+        db.commit()
+        log(log.INFO, "File %s upload confirmed", file)
+        if content_hash:
+            AttachmentController.schedule_content_hash_check(file, content_hash)
+        ImageController.schedule_file_variants(file)
+        return file
+
+    @staticmethod
+    def schedule_content_hash_check(file: m.File, content_hash: str):
+        """queue check of declared content hash of directly uploaded file"""
+        from app.controller.celery import check_file_content_hash
+
+        try:
+            check_file_content_hash.delay(file.id, content_hash)
+        except (RedisError, OperationalError) as e:
+            # file is just not deduplicated
+            log(log.ERROR, "Content hash check of file %s not queued: %s", file, e)
+
+    @staticmethod
+    def check_content_hash(
+        file: m.File, content_hash: str, db: Session, storage: StorageBackend
+    ) -> bool:
+        """compare declared hash with stored content, mismatching file is deleted"""
+        path = file.storage_path
+        release_connection(db)
+        try:
+            stored_hash = hashlib.sha256(storage.download(path)).hexdigest()
+        except StorageError as e:
+            log(log.ERROR, "Content of file %s was not read: %s", file, e)
+            raise
+        if stored_hash != content_hash:
+            log(
+                log.WARNING,
+                "File %s content hash %s doesn't match declared %s, file deleted",
+                file,
+                stored_hash,
+                content_hash,
+            )
+            file.is_deleted = True
+            db.commit()
+            try:
+                storage.delete(path)
+            except StorageError as e:
+                log(log.ERROR, "File %s was not deleted from storage: %s", file, e)
+            return False
+        file.content_hash = stored_hash
+        db.commit()
+        log(log.INFO, "File %s content hash checked", file)
+        return True
 
     @staticmethod
     def validate_files(
@@ -51,6 +266,12 @@ class AttachmentController:
         files = []
         for file_uuid in file_uuids:
             file: m.File = get_file_by_uuid(file_uuid, user=user, db=db)
+            if not file.is_uploaded:
+                log(log.INFO, "File %s is not uploaded yet", file_uuid)
+                raise HTTPException(
+                    status_code=status.HTTP_409_CONFLICT,
+                    detail="File is not uploaded",
+                )
             files.append(file)
 
         return files
@@ -99,50 +320,36 @@ class AttachmentController:
         return attachment
 
     @staticmethod
-    def delete_file_from_google_cloud_storage(
-        filename: str,
-        google_storage_client,
-        settings: Settings,
-    ):
-        bucket = google_storage_client.get_bucket(settings.GOOGLE_STORAGE_BUCKET_NAME)
-        blob = bucket.blob(filename)
-        if blob.exists():
-            try:
-                blob.delete()
-                log(log.INFO, "Deleting file %s from google cloud client", filename)
-            except GoogleCloudError as e:
-                log(
-                    log.INFO,
-                    "Error while deleting file from google cloud storage:\n%s",
-                    e,
-                )
-                raise HTTPException(
-                    status_code=status.HTTP_409_CONFLICT,
-                    detail="Error while deleting file from google cloud storage",
-                )
-        else:
-            log(log.INFO, "File %s not found in google cloud client", filename)
+    def delete_file_from_storage(filename: str, storage: StorageBackend):
+        try:
+            storage.delete(filename)
+            log(log.INFO, "Deleting file %s from storage", filename)
+        except StorageError as e:
+            log(log.INFO, "Error while deleting file from storage:\n%s", e)
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="Error while deleting file from storage",
+            )
 
     @staticmethod
     def upload_user_profile_picture(
-        filename: str,
         file: bytes,
         destination_filename: str,
-        google_storage_client,
-        settings: Settings,
-    ):
-        bucket = google_storage_client.get_bucket(settings.GOOGLE_STORAGE_BUCKET_NAME)
-        blob = bucket.blob(filename)
-        blob = bucket.blob(destination_filename)
+        storage: StorageBackend,
+    ) -> str:
+        """returns public url of uploaded picture"""
         try:
-            blob.upload_from_string(file)
-        except GoogleCloudError as e:
-            log(log.INFO, "Error while uploading file to google cloud storage:\n%s", e)
+            return storage.upload(
+                destination_filename,
+                file,
+                content_type=mimetypes.guess_type(destination_filename)[0],
+            )
+        except StorageError as e:
+            log(log.INFO, "Error while uploading file to storage:\n%s", e)
             raise HTTPException(
                 status_code=status.HTTP_409_CONFLICT,
-                detail="Error while uploading file to google cloud storage",
+                detail="Error while uploading file to storage",
             )
-        return blob.public_url
 
     @classmethod
     def is_valid_image_filename(cls, filename: str):
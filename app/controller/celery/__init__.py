@@ -1,16 +1,178 @@
 from celery.schedules import crontab
+from celery.signals import worker_process_init
+from sqlalchemy.exc import SQLAlchemyError
 from .app import app
+from app.controller.storage import StorageError
 from app.config import get_settings, Settings
 from app.logger import log
 
 settings: Settings = get_settings()
 
 
-@app.task
-def pay_plus_fee():
+@app.task(bind=True)
+def pay_plus_fee(self):
     from app.controller.platform_payment import collect_fee
 
-    return collect_fee()
+    def report_progress(progress: dict):
+        # no result backend for tasks run in place
+        if not self.request.is_eager:
+            self.update_state(state="PROGRESS", meta=progress)
+
+    return collect_fee(report_progress)
+
+
+@app.task
+def reconcile_fee_charges():
+    from app.controller.platform_payment import reconcile_sent_charges
+    from app.database import db
+
+    with db.Session() as session:
+        return reconcile_sent_charges(session)
+
+
+@app.task(
+    autoretry_for=(SQLAlchemyError,),
+    retry_backoff=True,
+    max_retries=settings.PAY_PLUS_WEBHOOK_MAX_RETRIES,
+)
+def apply_payplus_webhook_event(event_id: int):
+    from app.controller.payplus_webhook import apply_webhook_event
+    from app.database import db
+
+    with db.Session() as session:
+        status = apply_webhook_event(session, event_id)
+    return status and status.value
+
+
+@app.task(bind=True, max_retries=settings.PUSH_MAX_RETRIES)
+def send_push_notification(
+    self,
+    device_tokens: list[str],
+    data: dict,
+    message_id: str | None = None,
+    collapse_key: str | None = None,
+):
+    from app.controller.push_notification import PushHandler
+
+    push_handler = PushHandler()
+    if message_id and collapse_key:
+        device_tokens = push_handler.pop_latest_tokens(
+            message_id, collapse_key, device_tokens
+        )
+        if not device_tokens:
+            log(log.INFO, "Push notification [%s] was coalesced", message_id)
+            return
+
+    failed_tokens = push_handler.send_multicast(device_tokens, data)
+    if failed_tokens:
+        log(log.WARNING, "Retry push to [%d] devices", len(failed_tokens))
+        raise self.retry(
+            args=(failed_tokens, data),
+            countdown=push_handler.retry_countdown(self.request.retries),
+        )
+
+
+@app.task(bind=True, max_retries=settings.IMAGE_MAX_RETRIES)
+def process_user_picture(self, user_id: int, path: str):
+    """make variants of original profile picture, original is deleted then"""
+    from app.controller.image import ImageController, ImageError
+    from app.database import db
+    from app.dependency import get_storage
+    from app import model as m
+
+    storage = get_storage()
+    try:
+        urls = ImageController.upload_variants(path, storage)
+    except ImageError as e:
+        if self.request.retries < self.max_retries:
+            log(log.WARNING, "Retry picture variants of user [%s]: %s", user_id, e)
+            raise self.retry(
+                countdown=settings.IMAGE_RETRY_SECONDS * (self.request.retries + 1)
+            )
+        # user keeps JPEG picture without variants
+        log(log.ERROR, "Picture variants of user [%s] failed: %s", user_id, e)
+        ImageController.delete_images([storage.public_url(path)], storage)
+        return
+
+    with db.Session() as session:
+        user = session.get(m.User, user_id)
+        # user could upload another picture while this one was processed
+        picture_url = storage.public_url(ImageController.picture_path(path))
+        if not user or user.picture != picture_url:
+            log(log.INFO, "Picture [%s] of user [%s] was replaced", path, user_id)
+            ImageController.delete_images(
+                [storage.public_url(path), picture_url, *urls.values()], storage
+            )
+            return
+        user.picture_variants = urls
+        session.commit()
+    ImageController.delete_images([storage.public_url(path)], storage)
+    log(log.INFO, "Picture variants of user [%s] saved", user_id)
+
+
+@app.task(bind=True, max_retries=settings.IMAGE_MAX_RETRIES)
+def process_file_variants(self, file_id: int):
+    from app.controller.image import ImageController, ImageError
+    from app.database import db
+    from app.dependency import get_storage
+    from app import model as m
+
+    with db.Session() as session:
+        file = session.get(m.File, file_id)
+        if not file or file.is_deleted:
+            log(log.INFO, "File [%s] not found", file_id)
+            return
+        path = file.storage_path
+
+    try:
+        urls = ImageController.upload_variants(path, get_storage())
+    except ImageError as e:
+        if self.request.retries < self.max_retries:
+            log(log.WARNING, "Retry variants of file [%s]: %s", file_id, e)
+            raise self.retry(
+                countdown=settings.IMAGE_RETRY_SECONDS * (self.request.retries + 1)
+            )
+        log(log.ERROR, "Variants of file [%s] failed: %s", file_id, e)
+        return
+
+    with db.Session() as session:
+        file = session.get(m.File, file_id)
+        file.variants = urls
+        session.commit()
+    log(log.INFO, "Variants of file [%s] saved", file_id)
+
+
+@app.task(autoretry_for=(StorageError,), retry_backoff=True)
+def check_file_content_hash(file_id: int, content_hash: str):
+    from app.controller.attachment import AttachmentController
+    from app.database import db
+    from app.dependency import get_storage
+    from app import model as m
+
+    with db.Session() as session:
+        file = session.get(m.File, file_id)
+        if not file or file.is_deleted:
+            log(log.INFO, "File [%s] not found", file_id)
+            return
+        AttachmentController.check_content_hash(
+            file, content_hash, session, get_storage()
+        )
+
+
+@worker_process_init.connect
+def reset_db_pool(**kwargs):
+    from app.database import get_engine
+
+    # connections of the parent process must not be shared by forked workers
+    get_engine().dispose(close=False)
+
+
+@worker_process_init.connect
+def reset_payplus_client(**kwargs):
+    from app.controller.payplus_client import get_payplus_client
+
+    # the same for PayPlus keep-alive connections
+    get_payplus_client.cache_clear()
 
 
 @app.on_after_finalize.connect
@@ -32,4 +194,12 @@ def setup_periodic_tasks(sender, **kwargs):
         pay_plus_fee.s(),
         name="Weekly collecting fee",
     )
+    sender.add_periodic_task(
+        crontab(
+            hour=settings.DAILY_REPORT_HOURS,
+            minute=settings.DAILY_REPORT_MINUTES,
+        ),
+        reconcile_fee_charges.s(),
+        name="Daily reconciling sent fee charges",
+    )
     log(log.INFO, "Tasks scheduled!")
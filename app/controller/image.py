@@ -0,0 +1,153 @@
+import io
+import posixpath
+from functools import lru_cache
+
+from kombu.exceptions import OperationalError
+from PIL import Image, ImageOps, UnidentifiedImageError, features
+from redis import RedisError
+
+from app import model as m
+from app import schema as s
+from app.logger import log
+from .storage import StorageBackend, StorageError
+
+# longest side of variant image, images are never upscaled
+IMAGE_VARIANT_SIZES = {
+    "thumbnail": 128,
+    "medium": 512,
+    "full": 1600,
+}
+IMAGE_VARIANT_QUALITY = 80
+# profile picture for clients not aware of variants
+PICTURE_VARIANT = "picture"
+PICTURE_QUALITY = 50
+
+
+class ImageError(Exception):
+    """Raised when image can't be decoded or variants can't be saved"""
+
+
+@lru_cache
+def is_webp_supported() -> bool:
+    return features.check("webp")
+
+
+class ImageController:
+    @staticmethod
+    def variant_path(path: str, variant: str, extension: str) -> str:
+        """profile/uuid/avatar.png -> profile/uuid/variants/avatar_medium.webp"""
+        folder, filename = posixpath.split(path)
+        name = filename.rsplit(".", 1)[0]
+        return posixpath.join(folder, "variants", f"{name}_{variant}.{extension}")
+
+    @staticmethod
+    def picture_path(path: str) -> str:
+        """path of JPEG profile picture made of original uploaded to path"""
+        return ImageController.variant_path(path, PICTURE_VARIANT, "jpg")
+
+    @staticmethod
+    def verify_image(data: bytes):
+        """cheap check of image header, image is not decoded"""
+        try:
+            Image.open(io.BytesIO(data)).verify()
+        except (UnidentifiedImageError, OSError, SyntaxError) as e:
+            raise ImageError(e)
+
+    @staticmethod
+    def make_picture(data: bytes) -> bytes:
+        """JPEG of image in its original size"""
+        try:
+            image = Image.open(io.BytesIO(data))
+            image = ImageOps.exif_transpose(image).convert("RGB")
+            output = io.BytesIO()
+            image.save(output, format="JPEG", optimize=True, quality=PICTURE_QUALITY)
+        except (UnidentifiedImageError, OSError, SyntaxError) as e:
+            raise ImageError(e)
+        return output.getvalue()
+
+    @staticmethod
+    def make_variants(data: bytes) -> dict[str, tuple[bytes, str, str]]:
+        """variant name -> (content, content type, extension)
+
+        WebP if Pillow is built with it, JPEG otherwise
+        """
+        try:
+            image = Image.open(io.BytesIO(data))
+            # photos from phones are rotated by EXIF tag
+            image = ImageOps.exif_transpose(image)
+            image = image.convert("RGBA" if "A" in image.getbands() else "RGB")
+        except (UnidentifiedImageError, OSError, SyntaxError) as e:
+            raise ImageError(e)
+
+        if is_webp_supported():
+            image_format, content_type, extension = "WEBP", "image/webp", "webp"
+        else:
+            image_format, content_type, extension = "JPEG", "image/jpeg", "jpg"
+            image = image.convert("RGB")
+
+        variants = {}
+        for variant, size in IMAGE_VARIANT_SIZES.items():
+            variant_image = image.copy()
+            variant_image.thumbnail((size, size), Image.LANCZOS)
+            output = io.BytesIO()
+            variant_image.save(
+                output,
+                format=image_format,
+                quality=IMAGE_VARIANT_QUALITY,
+                optimize=True,
+            )
+            variants[variant] = (output.getvalue(), content_type, extension)
+        return variants
+
+    @staticmethod
+    def upload_variants(path: str, storage: StorageBackend) -> dict[str, str]:
+        """create variants of stored image next to it, returns their urls"""
+        try:
+            variants = ImageController.make_variants(storage.download(path))
+            urls = {}
+            for variant, (content, content_type, extension) in variants.items():
+                urls[variant] = storage.upload(
+                    ImageController.variant_path(path, variant, extension),
+                    content,
+                    content_type=content_type,
+                )
+        except StorageError as e:
+            raise ImageError(e)
+        log(log.INFO, "Image variants of [%s] uploaded", path)
+        return urls
+
+    @staticmethod
+    def delete_images(urls: list[str | None], storage: StorageBackend):
+        """delete stored images by urls, failures are only logged"""
+        for url in urls:
+            path = storage.path_from_url(url)
+            if not path:
+                continue
+            try:
+                storage.delete(path)
+            except StorageError as e:
+                log(log.WARNING, "Image [%s] was not deleted: %s", path, e)
+
+    @staticmethod
+    def schedule_user_picture_variants(user: m.User, path: str):
+        """queue variants processing of just uploaded profile picture,
+        variants are made in place if the task can't be queued"""
+        from app.controller.celery import process_user_picture
+
+        try:
+            process_user_picture.delay(user.id, path)
+        except (RedisError, OperationalError) as e:
+            log(log.ERROR, "Picture variants of user [%s] not queued: %s", user.id, e)
+            process_user_picture.apply(args=(user.id, path))
+
+    @staticmethod
+    def schedule_file_variants(file: m.File):
+        """queue variants processing of uploaded image file"""
+        from app.controller.celery import process_file_variants
+
+        if file.type != s.enums.AttachmentType.IMAGE or file.variants:
+            return
+        try:
+            process_file_variants.delay(file.id)
+        except (RedisError, OperationalError) as e:
+            log(log.ERROR, "Variants of file %s not queued: %s", file, e)
@@ -0,0 +1,408 @@
+from typing import Iterable
+
+from sqlalchemy import (
+    Integer,
+    Select,
+    select,
+    delete,
+    insert,
+    func,
+    or_,
+    and_,
+    tuple_,
+    union_all,
+    literal_column,
+)
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.elements import ColumnElement
+
+from app import model as m
+from app import schema as s
+from app.config import get_settings, Settings
+from app.database import lock_keys
+from app.logger import log
+
+settings: Settings = get_settings()
+
+# location_id / profession_id of stats over all locations / professions
+ANY_ID = 0
+# advisory locks namespace of price stats rows, by bucket
+# (every job changes ANY_ID rows of its bucket)
+JOB_PRICE_STATS_LOCK = 2
+
+STATS_COLUMNS = [
+    "location_id",
+    "profession_id",
+    "bucket",
+    "jobs_count",
+    "min_price",
+    "max_price",
+]
+
+
+def price_bucket(payment: int) -> int:
+    return payment // settings.JOB_PRICE_BUCKET_SIZE
+
+
+def _bucket() -> ColumnElement:
+    # inline constant, so selected and grouped by expressions are the same
+    size = literal_column(str(settings.JOB_PRICE_BUCKET_SIZE), Integer)
+    return m.Job.payment // size
+
+
+def _in_buckets(buckets: Iterable[int]) -> ColumnElement:
+    size = settings.JOB_PRICE_BUCKET_SIZE
+    return or_(
+        *[
+            and_(m.Job.payment >= bucket * size, m.Job.payment < (bucket + 1) * size)
+            for bucket in sorted(buckets)
+        ]
+    )
+
+
+def _is_listed() -> ColumnElement:
+    """Job is shown to workers, only these jobs are in price stats"""
+    return and_(
+        m.Job.is_deleted.is_(False),
+        m.Job.status == s.enums.JobStatus.PENDING,
+    )
+
+
+def job_price_stats_query(
+    by_location: bool,
+    by_profession: bool,
+    buckets: list[int] | None = None,
+    location_ids: list[int] | None = None,
+    profession_ids: list[int] | None = None,
+) -> Select:
+    """Select price stats calculated from pending jobs, grouped by price bucket and
+    by location and profession if requested (ANY_ID otherwise)"""
+    bucket = _bucket()
+    location_id = (
+        m.JobLocation.location_id
+        if by_location
+        else literal_column(str(ANY_ID), Integer)
+    )
+    profession_id = (
+        m.Job.profession_id if by_profession else literal_column(str(ANY_ID), Integer)
+    )
+    query = (
+        select(
+            location_id,
+            profession_id,
+            bucket,
+            func.count(m.Job.id),
+            func.min(m.Job.payment),
+            func.max(m.Job.payment),
+        )
+        .select_from(m.Job)
+        .where(_is_listed())
+    )
+    group_by = [bucket]
+    if by_location:
+        query = query.join(m.JobLocation, m.JobLocation.job_id == m.Job.id)
+        if location_ids is not None:
+            query = query.where(m.JobLocation.location_id.in_(location_ids))
+        group_by.append(location_id)
+    if by_profession:
+        query = query.where(m.Job.profession_id.is_not(None))
+        if profession_ids is not None:
+            query = query.where(m.Job.profession_id.in_(profession_ids))
+        group_by.append(profession_id)
+    if buckets is not None:
+        query = query.where(_in_buckets(buckets))
+    return query.group_by(*group_by)
+
+
+def update_job_price_stats(
+    db: Session,
+    buckets: list[int] | None = None,
+    location_ids: list[int] | None = None,
+    profession_ids: list[int] | None = None,
+) -> None:
+    """Recalculate price stats of given buckets, locations and professions
+    (all if None), including their ANY_ID rows"""
+    # no location or profession rows to update for empty lists of ids
+    by_locations = (False, True) if location_ids is None or location_ids else (False,)
+    by_professions = (
+        (False, True) if profession_ids is None or profession_ids else (False,)
+    )
+    queries = [
+        job_price_stats_query(
+            by_location, by_profession, buckets, location_ids, profession_ids
+        )
+        for by_location in by_locations
+        for by_profession in by_professions
+    ]
+    # core execution, so it can be called while session is flushing
+    connection = db.connection()
+    # stats are read after concurrent changes of these buckets are committed
+    lock_keys(connection, JOB_PRICE_STATS_LOCK, buckets)
+    rows = [
+        dict(zip(STATS_COLUMNS, row)) for row in connection.execute(union_all(*queries))
+    ]
+
+    stale = delete(m.JobPriceStats)
+    if buckets is not None:
+        stale = stale.where(m.JobPriceStats.bucket.in_(buckets))
+    if location_ids is not None:
+        stale = stale.where(m.JobPriceStats.location_id.in_([ANY_ID, *location_ids]))
+    if profession_ids is not None:
+        stale = stale.where(
+            m.JobPriceStats.profession_id.in_([ANY_ID, *profession_ids])
+        )
+    if buckets is None and location_ids is None and profession_ids is None:
+        # full rebuild
+        connection.execute(stale)
+        if rows:
+            connection.execute(insert(m.JobPriceStats), rows)
+        log(log.DEBUG, "Job price stats updated - all")
+        return
+
+    if rows:
+        dialect = postgresql if db.get_bind().dialect.name == "postgresql" else sqlite
+        query = dialect.insert(m.JobPriceStats).values(rows)
+        query = query.on_conflict_do_update(
+            index_elements=[
+                m.JobPriceStats.location_id,
+                m.JobPriceStats.profession_id,
+                m.JobPriceStats.bucket,
+            ],
+            set_={column: query.excluded[column] for column in STATS_COLUMNS[3:]},
+        )
+        connection.execute(query)
+        # buckets left without jobs
+        stale = stale.where(
+            tuple_(
+                m.JobPriceStats.location_id,
+                m.JobPriceStats.profession_id,
+                m.JobPriceStats.bucket,
+            ).not_in(
+                [tuple(row[column] for column in STATS_COLUMNS[:3]) for row in rows]
+            )
+        )
+    connection.execute(stale)
+    log(
+        log.DEBUG,
+        "Job price stats updated - buckets %s, locations %s, professions %s",
+        buckets,
+        location_ids,
+        profession_ids,
+    )
+
+
+def update_jobs_price_stats(
+    db: Session,
+    job_ids: list[int],
+    payments: Iterable[int] = (),
+    profession_ids: Iterable[int] = (),
+    location_ids: Iterable[int] = (),
+) -> None:
+    """Recalculate price stats touched by given jobs
+
+    payments, profession_ids and location_ids are previous values of changed jobs,
+    current ones are read from db
+    """
+    payments, profession_ids, location_ids = (
+        set(payments),
+        set(profession_ids),
+        set(location_ids),
+    )
+    rows = db.connection().execute(
+        select(m.Job.payment, m.Job.profession_id, m.JobLocation.location_id)
+        .select_from(m.Job)
+        .outerjoin(m.JobLocation, m.JobLocation.job_id == m.Job.id)
+        .where(m.Job.id.in_(job_ids))
+    )
+    for payment, profession_id, location_id in rows:
+        payments.add(payment)
+        profession_ids.add(profession_id)
+        location_ids.add(location_id)
+    payments.discard(None)
+    profession_ids.discard(None)
+    location_ids.discard(None)
+    if not payments:
+        return
+    update_job_price_stats(
+        db,
+        sorted({price_bucket(payment) for payment in payments}),
+        sorted(location_ids),
+        sorted(profession_ids),
+    )
+
+
+def _pending_jobs_query(
+    query: Select,
+    regions: list[str] | None,
+    category: str | None,
+    user_uuid: str | None,
+) -> Select:
+    """Filter query over jobs table by pending jobs in any of regions and category,
+    without jobs of the user"""
+    query = query.where(_is_listed())
+    if regions:
+        query = query.where(m.Job.regions.any(m.Location.name_en.in_(regions)))
+    if category:
+        query = query.where(
+            m.Job.profession_id.in_(
+                select(m.Profession.id).where(m.Profession.name_en == category)
+            )
+        )
+    if user_uuid:
+        query = query.where(
+            m.Job.owner_id.not_in(select(m.User.id).where(m.User.uuid == user_uuid))
+        )
+    return query
+
+
+def _pending_jobs_price(
+    db: Session,
+    aggregate: ColumnElement,
+    bucket: int,
+    regions: list[str] | None,
+    category: str | None,
+    user_uuid: str | None,
+) -> int | None:
+    """Price of pending jobs in given bucket, aggregated over jobs table"""
+    query = select(aggregate).where(_in_buckets([bucket]))
+    return db.scalar(_pending_jobs_query(query, regions, category, user_uuid))
+
+
+def _pending_jobs_buckets(
+    db: Session,
+    regions: list[str] | None,
+    category: str | None,
+    user_uuid: str | None,
+) -> dict[int, list[int]]:
+    """bucket: [jobs count, min price, max price] of pending jobs, aggregated over
+    jobs table, every job is counted once"""
+    bucket = _bucket()
+    query = select(
+        bucket,
+        func.count(m.Job.id),
+        func.min(m.Job.payment),
+        func.max(m.Job.payment),
+    ).group_by(bucket)
+    query = _pending_jobs_query(query, regions, category, user_uuid)
+    return {row[0]: list(row[1:]) for row in db.execute(query)}
+
+
+def _price_option(
+    buckets: dict[int, list[int]],
+    histogram: bool,
+    regions: list[str] | None,
+    category: str | None,
+) -> s.PriceOption:
+    """Price option of buckets: [jobs count, min price, max price]"""
+    min_price = max_price = None
+    if buckets:
+        min_price = buckets[min(buckets)][1]
+        max_price = buckets[max(buckets)][2]
+    log(
+        log.INFO,
+        "Max price is - %s min price is - %s regions are - %s category is - %s",
+        max_price,
+        min_price,
+        regions,
+        category,
+    )
+
+    size = settings.JOB_PRICE_BUCKET_SIZE
+    return s.PriceOption(
+        max_price=max_price,
+        min_price=min_price,
+        buckets=(
+            [
+                s.PriceBucket(
+                    price_from=bucket * size,
+                    price_to=(bucket + 1) * size,
+                    jobs_count=buckets[bucket][0],
+                )
+                for bucket in sorted(buckets)
+            ]
+            if histogram
+            else None
+        ),
+    )
+
+
+def job_price_option(
+    db: Session,
+    regions: list[str] | None = None,
+    category: str | None = None,
+    user_uuid: str | None = None,
+    histogram: bool = False,
+) -> s.PriceOption:
+    """Price range of pending jobs in regions and category, without jobs of the user
+
+    Read from job price stats, user's own jobs are subtracted from them. Jobs
+    table is queried only if a user's job has the lowest or highest price, or for
+    several regions, as stats of regions count a job in each of its regions
+    """
+    if regions and len(set(regions)) > 1:
+        buckets = _pending_jobs_buckets(db, regions, category, user_uuid)
+        return _price_option(buckets, histogram, regions, category)
+
+    location_ids = select(m.Location.id).where(m.Location.name_en.in_(regions or []))
+    profession_ids = select(m.Profession.id).where(m.Profession.name_en == category)
+    query = (
+        select(
+            m.JobPriceStats.bucket,
+            func.sum(m.JobPriceStats.jobs_count),
+            func.min(m.JobPriceStats.min_price),
+            func.max(m.JobPriceStats.max_price),
+        )
+        .where(
+            (
+                m.JobPriceStats.location_id.in_(location_ids)
+                if regions
+                else m.JobPriceStats.location_id == ANY_ID
+            ),
+            (
+                m.JobPriceStats.profession_id.in_(profession_ids)
+                if category
+                else m.JobPriceStats.profession_id == ANY_ID
+            ),
+        )
+        .group_by(m.JobPriceStats.bucket)
+    )
+    # bucket: [jobs count, min price, max price]
+    buckets = {row[0]: list(row[1:]) for row in db.execute(query)}
+
+    # buckets where the lowest or highest price may be of excluded user's job
+    inexact_buckets = set()
+    if user_uuid and buckets:
+        own_jobs_query = select(m.Job.payment).where(
+            _is_listed(),
+            m.Job.owner_id.in_(select(m.User.id).where(m.User.uuid == user_uuid)),
+        )
+        if regions:
+            # single region, so the job is counted once as in stats
+            own_jobs_query = own_jobs_query.join(
+                m.JobLocation, m.JobLocation.job_id == m.Job.id
+            ).where(m.JobLocation.location_id.in_(location_ids))
+        if category:
+            own_jobs_query = own_jobs_query.where(
+                m.Job.profession_id.in_(profession_ids)
+            )
+        for payment in db.scalars(own_jobs_query):
+            bucket = price_bucket(payment)
+            if bucket not in buckets:
+                continue
+            buckets[bucket][0] -= 1
+            if payment in buckets[bucket][1:]:
+                inexact_buckets.add(bucket)
+        buckets = {bucket: stats for bucket, stats in buckets.items() if stats[0] > 0}
+
+    if buckets:
+        lowest, highest = min(buckets), max(buckets)
+        if lowest in inexact_buckets:
+            buckets[lowest][1] = _pending_jobs_price(
+                db, func.min(m.Job.payment), lowest, regions, category, user_uuid
+            )
+        if highest in inexact_buckets:
+            buckets[highest][2] = _pending_jobs_price(
+                db, func.max(m.Job.payment), highest, regions, category, user_uuid
+            )
+    return _price_option(buckets, histogram, regions, category)
@@ -0,0 +1,116 @@
+import re
+from functools import reduce
+
+from sqlalchemy import Select, select, update, func, or_, cast, literal, false
+from sqlalchemy.dialects.postgresql import REGCONFIG
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.elements import ColumnElement
+
+from app import model as m
+from app.logger import log
+
+# "english" gives stemming for english words,
+# "simple" keeps words as is (hebrew and everything else)
+SEARCH_CONFIGS = ("english", "simple")
+
+
+def is_full_text_search_enabled(db: Session) -> bool:
+    return db.get_bind().dialect.name == "postgresql"
+
+
+def _to_tsvector(text: ColumnElement) -> ColumnElement:
+    return reduce(
+        lambda left, right: left.op("||")(right),
+        [
+            func.to_tsvector(cast(literal(config), REGCONFIG), func.coalesce(text, ""))
+            for config in SEARCH_CONFIGS
+        ],
+    )
+
+
+def _to_tsquery(text: str) -> ColumnElement:
+    return reduce(
+        lambda left, right: left.op("||")(right),
+        [
+            func.to_tsquery(cast(literal(config), REGCONFIG), text)
+            for config in SEARCH_CONFIGS
+        ],
+    )
+
+
+def _join_words(*parts: ColumnElement) -> ColumnElement:
+    """parts separated by space, NULL parts are skipped instead of nulling all"""
+    return reduce(
+        lambda left, right: left + " " + right,
+        [func.coalesce(part, "") for part in parts],
+    )
+
+
+def job_search_vector() -> ColumnElement:
+    """tsvector of job name, city, profession, regions and description"""
+    profession = (
+        select(_join_words(m.Profession.name_en, m.Profession.name_hebrew))
+        .where(m.Profession.id == m.Job.profession_id)
+        .scalar_subquery()
+    )
+    regions = (
+        select(
+            func.string_agg(
+                _join_words(m.Location.name_en, m.Location.name_hebrew), " "
+            )
+        )
+        .join(m.JobLocation, m.JobLocation.location_id == m.Location.id)
+        .where(m.JobLocation.job_id == m.Job.id)
+        .scalar_subquery()
+    )
+    return (
+        func.setweight(_to_tsvector(m.Job.name), "A")
+        .op("||")(
+            func.setweight(
+                _to_tsvector(_join_words(m.Job.city, profession, regions)), "B"
+            )
+        )
+        .op("||")(func.setweight(_to_tsvector(m.Job.description), "C"))
+    )
+
+
+def update_jobs_search_vector(db: Session, job_ids: list[int] | None = None) -> None:
+    """Recalculate search vector of given jobs (all jobs if job_ids is None)"""
+    if not is_full_text_search_enabled(db):
+        return
+    query = update(m.Job).values(search_vector=job_search_vector())
+    if job_ids is not None:
+        query = query.where(m.Job.id.in_(job_ids))
+    # core execution, so it can be called while session is flushing
+    db.connection().execute(query)
+    log(log.DEBUG, "Jobs search vector updated - %s", job_ids or "all")
+
+
+def filter_jobs_by_search_query(
+    db: Session, query: Select, q: str, ranked: bool = True
+) -> Select:
+    """Filter jobs query by search string
+
+    Uses full text search index on postgres (ranked by relevance if `ranked`),
+    falls back to substring matching on other databases
+    """
+    if not is_full_text_search_enabled(db):
+        return query.where(
+            or_(
+                m.Job.name.icontains(f"%{q}%"),
+                m.Job.description.icontains(f"%{q}%"),
+                m.Job.city.icontains(f"%{q}%"),
+                m.Job.profession.has(m.Profession.name_en.icontains(f"%{q}%")),
+                m.Job.regions.any(m.Location.name_en.icontains(f"%{q}%")),
+            )
+        )
+
+    words = re.findall(r"\w+", q)
+    if not words:
+        return query.where(false())
+    # prefix matching for every word, so search works while user is typing
+    ts_query = _to_tsquery(" & ".join(f"{word}:*" for word in words))
+    query = query.where(m.Job.search_vector.bool_op("@@")(ts_query))
+    if ranked:
+        query = query.order_by(func.ts_rank(m.Job.search_vector, ts_query).desc())
+    return query
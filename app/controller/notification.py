@@ -1,94 +1,208 @@
-from sqlalchemy import and_, select
+import sqlalchemy as sa
+from sqlalchemy import and_, or_, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from app import model as m
 from app import schema as s
 from .push_notification import PushHandler
 from app.utility.notification import get_notification_payload
+from app.utility.load_options import application_load_options, job_load_options
+from app.database import release_connection
 from app.logger import log
 
 
-def check_location_notification(regions: list[m.Location], user: m.User) -> bool:
-    return user.notification_locations_flag and (
-        (any(region in user.notification_locations for region in regions))
-        or (
-            not user.notification_locations
-            and any(region in user.locations for region in regions)
-        )
+def _user_has(table: sa.Table, *conditions) -> sa.Exists:
+    """exists row of users relation table for the user with given conditions"""
+    return (
+        sa.exists().where(table.c.user_id == m.User.id, *conditions).correlate(m.User)
     )
 
 
-def check_profession_notification(profession: m.Profession, user: m.User) -> bool:
-    return user.notification_profession_flag and (
-        (profession in user.notification_professions)
-        or (not user.notification_professions and profession in user.professions)
+def job_created_recipients_query(job: m.Job) -> sa.Select:
+    """distinct (user_id, push_token) pairs of users to notify about new job
+
+    push_token is NULL for users without devices or with disabled push notifications
+    """
+    regions = select(m.JobLocation.location_id).where(m.JobLocation.job_id == job.id)
+    notification_locations = m.UserNotificationLocation.__table__
+    notification_professions = m.UserNotificationsProfessions.__table__
+    locations = m.UserLocation.__table__
+    professions = m.UserProfession.__table__
+
+    location_match = _user_has(
+        notification_locations,
+        notification_locations.c.location_id.in_(regions),
     )
+    has_notification_locations = _user_has(notification_locations)
+    profession_match = _user_has(
+        notification_professions,
+        notification_professions.c.profession_id == job.profession_id,
+    )
+    has_notification_professions = _user_has(notification_professions)
 
+    is_recipient = or_(
+        and_(location_match, or_(profession_match, ~has_notification_professions)),
+        and_(~has_notification_locations, profession_match),
+    )
+    # notification settings fall back to user's own locations and professions
+    is_push_enabled = or_(
+        and_(
+            m.User.notification_profession_flag,
+            or_(
+                profession_match,
+                and_(
+                    ~has_notification_professions,
+                    _user_has(
+                        professions, professions.c.profession_id == job.profession_id
+                    ),
+                ),
+            ),
+        ),
+        and_(
+            m.User.notification_locations_flag,
+            or_(
+                location_match,
+                and_(
+                    ~has_notification_locations,
+                    _user_has(locations, locations.c.location_id.in_(regions)),
+                ),
+            ),
+        ),
+    )
 
-def job_created_notify(job: m.Job, db: Session) -> None:
-    db.refresh(job)
-    regions_ids: list[int] = [region.id for region in job.regions]
-    profession: m.Profession = db.scalar(
-        select(m.Profession).where(m.Profession.id == job.profession_id)
+    return (
+        select(m.User.id, m.Device.push_token)
+        .outerjoin(m.Device, and_(m.Device.user_id == m.User.id, is_push_enabled))
+        .where(~m.User.is_deleted, is_recipient)
+        .distinct()
     )
-    users: list[m.User] = db.scalars(
-        select(m.User).where(
-            and_(
-                m.User.notification_locations.any(m.Location.id.in_(regions_ids)),
-                m.User.notification_professions.contains(profession),
-            )
-        )
-    ).all()
-    users += db.scalars(
-        select(m.User).where(
-            and_(
-                m.User.notification_locations.any(m.Location.id.in_(regions_ids)),
-                ~m.User.notification_professions.any(),
-            )
-        )
-    ).all()
-    users += db.scalars(
-        select(m.User).where(
-            and_(
-                ~m.User.notification_locations.any(),
-                m.User.notification_professions.contains(profession),
-            )
-        )
-    ).all()
 
-    devices: list[str] = list()
-    for user in users:
-        if user.is_deleted:
-            continue
 
-        notification: m.Notification = m.Notification(
-            user_id=user.id,
-            entity_id=job.id,
-            type=s.NotificationType.JOB_CREATED,
-        )
-        db.add(notification)
-        if (check_profession_notification(profession, user)) or (
-            check_location_notification(regions_ids, user)
-        ):
-            for device in user.devices:
-                devices.append(device.push_token)
+def job_created_notify(job: m.Job, db: Session) -> None:
+    recipients = db.execute(job_created_recipients_query(job)).all()
+    users_ids: set[int] = {user_id for user_id, _ in recipients}
+    devices: list[str] = list(
+        {push_token for _, push_token in recipients if push_token}
+    )
+    payload = get_notification_payload(
+        notification_type=s.NotificationType.JOB_CREATED, job=job
+    )
 
-    db.commit()
+    if users_ids:
+        db.execute(
+            insert(m.Notification),
+            [
+                dict(
+                    user_id=user_id,
+                    entity_id=job.id,
+                    type=s.NotificationType.JOB_CREATED,
+                )
+                for user_id in users_ids
+            ],
+        )
+    # firebase is called without connection
+    release_connection(db)
 
     push_handler = PushHandler()
     push_handler.send_notification(
-        s.PushNotificationMessage(
-            device_tokens=devices,
-            payload=get_notification_payload(
-                notification_type=s.NotificationType.JOB_CREATED, job=job
-            ),
-        )
+        s.PushNotificationMessage(device_tokens=devices, payload=payload)
     )
 
-    log(log.INFO, "[%d] notifications created", len(users))
+    log(log.INFO, "[%d] notifications created", len(users_ids))
     log(log.INFO, "[%d] notifications sended", len(devices))
 
 
+def _payloads_queries(
+    notifications: list[m.Notification],
+) -> tuple[sa.Select | None, sa.Select | None]:
+    """queries of jobs and applications referred by notifications"""
+    jobs_ids: set[int] = set()
+    applications_ids: set[int] = set()
+    for notification in notifications:
+        if notification.is_job_notification:
+            jobs_ids.add(notification.entity_id)
+        else:
+            applications_ids.add(notification.entity_id)
+
+    jobs_query = None
+    if jobs_ids:
+        jobs_query = (
+            select(m.Job).where(m.Job.id.in_(jobs_ids)).options(*job_load_options())
+        )
+    applications_query = None
+    if applications_ids:
+        applications_query = (
+            select(m.Application)
+            .where(m.Application.id.in_(applications_ids))
+            .options(*application_load_options())
+        )
+    return jobs_query, applications_query
+
+
+def _notifications_schemas(
+    notifications: list[m.Notification],
+    jobs: dict[int, m.Job],
+    applications: dict[int, m.Application],
+) -> list[s.NotificationJob | s.NotificationApplication]:
+    items: list[s.NotificationJob | s.NotificationApplication] = []
+    for notification in notifications:
+        if notification.is_job_notification:
+            schema, payload = s.NotificationJob, jobs.get(notification.entity_id)
+        else:
+            schema = s.NotificationApplication
+            payload = applications.get(notification.entity_id)
+        if not payload:
+            log(log.WARNING, "Notification [%d] payload not found", notification.id)
+            continue
+        items.append(
+            schema(
+                id=notification.id,
+                uuid=notification.uuid,
+                user_id=notification.user_id,
+                type=notification.type,
+                is_read=notification.is_read,
+                payload=payload,
+                created_at=notification.created_at,
+            )
+        )
+    return items
+
+
+def create_notifications_schemas(
+    notifications: list[m.Notification], db: Session
+) -> list[s.NotificationJob | s.NotificationApplication]:
+    """notifications with payloads, fetched by one query per payload type"""
+    jobs_query, applications_query = _payloads_queries(notifications)
+    jobs: dict[int, m.Job] = {}
+    if jobs_query is not None:
+        jobs = {job.id: job for job in db.scalars(jobs_query)}
+    applications: dict[int, m.Application] = {}
+    if applications_query is not None:
+        applications = {
+            application.id: application
+            for application in db.scalars(applications_query)
+        }
+    return _notifications_schemas(notifications, jobs, applications)
+
+
+async def create_notifications_schemas_async(
+    notifications: list[m.Notification], db: AsyncSession
+) -> list[s.NotificationJob | s.NotificationApplication]:
+    """create_notifications_schemas for async session"""
+    jobs_query, applications_query = _payloads_queries(notifications)
+    jobs: dict[int, m.Job] = {}
+    if jobs_query is not None:
+        jobs = {job.id: job for job in await db.scalars(jobs_query)}
+    applications: dict[int, m.Application] = {}
+    if applications_query is not None:
+        applications = {
+            application.id: application
+            for application in await db.scalars(applications_query)
+        }
+    return _notifications_schemas(notifications, jobs, applications)
+
+
 def handle_job_status_update_notification(
     current_user: m.User, job: m.Job, db: Session, initial_job: s.Job
 ) -> None:
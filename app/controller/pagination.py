@@ -1,7 +1,15 @@
+import base64
+import binascii
+
+from fastapi import HTTPException, status
 from pydantic import BaseModel
+from sqlalchemy import Select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, InstrumentedAttribute
 
 from app import schema as s
 from app.config import get_settings, Settings
+from app.logger import log
 
 settings: Settings = get_settings()
 
@@ -24,3 +32,66 @@ def create_pagination(
         per_page=page_size,
         skip=(page - 1) * page_size,
     )
+
+
+def encode_cursor(last_id: int) -> str:
+    """create opaque cursor pointing after the item with given id"""
+    return base64.urlsafe_b64encode(str(last_id).encode()).decode()
+
+
+def decode_cursor(cursor: str) -> int:
+    """get id of the last seen item from opaque cursor"""
+    try:
+        return int(base64.urlsafe_b64decode(cursor.encode()).decode())
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        log(log.INFO, "Bad cursor [%s]", cursor)
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Not valid cursor",
+        )
+
+
+def _page_query(
+    query: Select,
+    id_column: InstrumentedAttribute[int],
+    cursor: str | None,
+    page_size: int,
+) -> Select:
+    if cursor:
+        query = query.where(id_column < decode_cursor(cursor))
+    # one extra item tells if there is a next page
+    return query.order_by(id_column.desc()).limit(page_size + 1)
+
+
+def _split_page(
+    items: list, id_column: InstrumentedAttribute[int], page_size: int
+) -> tuple[list, str | None]:
+    next_cursor = None
+    if len(items) > page_size:
+        items = items[:page_size]
+        next_cursor = encode_cursor(getattr(items[-1], id_column.key))
+    return items, next_cursor
+
+
+def paginate_by_cursor(
+    db: Session,
+    query: Select,
+    id_column: InstrumentedAttribute[int],
+    cursor: str | None,
+    page_size: int,
+) -> tuple[list, str | None]:
+    """get one page of query results ordered by id desc (keyset pagination)"""
+    items = db.scalars(_page_query(query, id_column, cursor, page_size)).all()
+    return _split_page(items, id_column, page_size)
+
+
+async def paginate_by_cursor_async(
+    db: AsyncSession,
+    query: Select,
+    id_column: InstrumentedAttribute[int],
+    cursor: str | None,
+    page_size: int,
+) -> tuple[list, str | None]:
+    """paginate_by_cursor for async session"""
+    items = (await db.scalars(_page_query(query, id_column, cursor, page_size))).all()
+    return _split_page(items, id_column, page_size)
@@ -0,0 +1,59 @@
+from sqlalchemy import select, update, exists, bindparam
+from sqlalchemy.orm import Session, attributes
+from sqlalchemy.sql.elements import ColumnElement
+
+from app import model as m
+from app import schema as s
+from app.logger import log
+
+
+def payment_method_invalid() -> ColumnElement:
+    """User has a rejected platform payment, correlated to users row"""
+    return exists().where(
+        m.PlatformPayment.user_id == m.User.id,
+        m.PlatformPayment.status == s.enums.PlatformPaymentStatus.REJECTED,
+    )
+
+
+def update_users_payment_method(db: Session, user_ids: list[int] | None = None):
+    """Recalculate is_payment_method_invalid of given users (all users if user_ids is None)"""
+    if user_ids is None:
+        db.connection().execute(
+            update(m.User).values(is_payment_method_invalid=payment_method_invalid())
+        )
+        log(log.DEBUG, "Users payment method updated - all")
+        return
+
+    # core execution, so it can be called while session is flushing
+    rows = db.connection().execute(
+        select(m.User.id, payment_method_invalid()).where(m.User.id.in_(user_ids))
+    )
+    flags = {user_id: bool(is_invalid) for user_id, is_invalid in rows}
+    if not flags:
+        return
+    db.connection().execute(
+        update(m.User.__table__)
+        .where(m.User.__table__.c.id == bindparam("user_id"))
+        .values(is_payment_method_invalid=bindparam("is_invalid")),
+        [
+            {"user_id": user_id, "is_invalid": is_invalid}
+            for user_id, is_invalid in flags.items()
+        ],
+    )
+    # loaded users see the new value without reloading
+    for user_id, is_invalid in flags.items():
+        user = db.identity_map.get(db.identity_key(m.User, user_id))
+        if user:
+            attributes.set_committed_value(
+                user, "is_payment_method_invalid", is_invalid
+            )
+    log(log.DEBUG, "Users payment method updated - %s", list(flags))
+
+
+def check_users_payment_method(db: Session) -> list[int]:
+    """Ids of users whose is_payment_method_invalid differs from their payments"""
+    return db.scalars(
+        select(m.User.id).where(
+            m.User.is_payment_method_invalid != payment_method_invalid()
+        )
+    ).all()
@@ -9,7 +9,9 @@ from sqlalchemy.exc import SQLAlchemyError
 from app import model as m
 from app import schema as s
 from app.config import Settings
-from app.utility import pay_plus_headers
+from app.database import release_connection
+from .payplus_client import get_payplus_client
+from app.utility.principal_cache import principal_cache
 from app.logger import log
 
 
@@ -37,12 +39,9 @@ def create_payplus_customer(user: m.User, settings: Settings, db: Session) -> No
         phone=user.phone,
     )
 
+    release_connection(db)
     try:
-        response = httpx.post(
-            f"{settings.PAY_PLUS_API_URL}/Customers/Add",
-            headers=pay_plus_headers(settings),
-            json=request_data.dict(),
-        )
+        response = get_payplus_client().post("/Customers/Add", json=request_data.dict())
     except httpx.RequestError as e:
         log(
             log.ERROR,
@@ -105,11 +104,10 @@ def create_payplus_token(
         card_date_mmyy=iso_card_date,
     )
 
+    release_connection(db)
     try:
-        response = httpx.post(
-            f"{settings.PAY_PLUS_API_URL}/Token/{method}",
-            headers=pay_plus_headers(settings),
-            json=request_data.dict(),
+        response = get_payplus_client().post(
+            f"/Token/{method}", json=request_data.dict()
         )
     except httpx.RequestError as e:
         log(
@@ -158,6 +156,7 @@ def create_payplus_token(
             status_code=status.HTTP_409_CONFLICT, detail="Error storing user data"
         )
 
+    principal_cache.invalidate(user.id)
     log(
         log.INFO,
         "User [%s] payplus card uid created and stored",
@@ -169,7 +168,7 @@ def validate_charge_response(
     response,
     platform_payment_uuid: str,
     db: Session,
-):
+) -> s.enums.PlatformPaymentStatus:
     if response.status_code != status.HTTP_200_OK:
         log(log.ERROR, "Error sending request - status code %s", response.status_code)
 
@@ -186,6 +185,8 @@ def validate_charge_response(
 
         platform_payment.status = s.enums.PlatformPaymentStatus.REJECTED
         log(log.WARNING, "Fee rejected")
+        # charged by celery worker, principal cache of api processes is not
+        # invalidated, they see the status after PRINCIPAL_CACHE_TTL
         db.commit()
 
     if response_data.get("results", {}).get("status") == "success":
@@ -193,21 +194,23 @@ def validate_charge_response(
         db.commit()
         log(log.INFO, "Fee collected successfully")
 
+    return platform_payment.status
+
 
 def payplus_periodic_charge(
     charge_data: s.PayPlusCharge,
     platform_payment_uuid: str,
     db: Session,
     settings: Settings,
-) -> None:
+) -> s.enums.PlatformPaymentStatus:
+    # payment status set by caller is stored before the charge
+    release_connection(db)
     try:
-        response = httpx.post(
-            f"{settings.PAY_PLUS_API_URL}/Transactions/Charge",
-            headers=pay_plus_headers(settings),
-            json=charge_data.dict(),
+        response = get_payplus_client().post(
+            "/Transactions/Charge", json=charge_data.dict()
         )
         log(log.INFO, "Payplus charge response: %s", response.json())
-        validate_charge_response(response, platform_payment_uuid, db)
+        return validate_charge_response(response, platform_payment_uuid, db)
     except httpx.RequestError as e:
         log(
             log.ERROR,
@@ -217,4 +220,4 @@ def payplus_periodic_charge(
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Error occurred while charging commission",
-        )
+        ) from e
@@ -0,0 +1,146 @@
+import random
+import threading
+import time
+from functools import lru_cache
+
+import httpx
+
+from app.config import get_settings, Settings
+from app.utility import pay_plus_headers
+from app.logger import log
+
+
+class PayPlusCircuitOpen(httpx.RequestError):
+    """PayPlus failed too many times in a row, requests are not sent for a while"""
+
+
+class CircuitBreaker:
+    """Opens after `failures` consecutive failures, lets a request through after reset_seconds"""
+
+    def __init__(self, failures: int, reset_seconds: float):
+        self.failures = failures
+        self.reset_seconds = reset_seconds
+        self.failures_count = 0
+        self.opened_at: float | None = None
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self) -> bool:
+        with self._lock:
+            if self.opened_at is None:
+                return False
+            if time.monotonic() - self.opened_at >= self.reset_seconds:
+                # half open: next result decides
+                self.opened_at = None
+                self.failures_count = self.failures - 1
+                return False
+            return True
+
+    def success(self):
+        with self._lock:
+            self.failures_count = 0
+            self.opened_at = None
+
+    def failure(self):
+        with self._lock:
+            self.failures_count += 1
+            if self.failures and self.failures_count >= self.failures:
+                if self.opened_at is None:
+                    log(log.ERROR, "PayPlus circuit opened")
+                self.opened_at = time.monotonic()
+
+
+# server errors worth to retry
+RETRY_STATUS_CODES = (502, 503, 504)
+# request didn't reach PayPlus
+NOT_SENT_ERRORS = (
+    httpx.ConnectError,
+    httpx.ConnectTimeout,
+    httpx.PoolTimeout,
+    PayPlusCircuitOpen,
+)
+
+
+class PayPlusClient:
+    """PayPlus API client with keep-alive connections, timeouts, retries and circuit breaker
+
+    Requests which were not sent (connection errors) are always retried, others
+    only if idempotent, so charges are never sent twice
+    """
+
+    def __init__(
+        self,
+        settings: Settings,
+        transport: httpx.BaseTransport | None = None,
+        base_url: str | None = None,
+    ):
+        self.retries = settings.PAY_PLUS_RETRIES
+        self.backoff_seconds = settings.PAY_PLUS_RETRY_BACKOFF_SECONDS
+        self.circuit_breaker = CircuitBreaker(
+            settings.PAY_PLUS_CIRCUIT_FAILURES, settings.PAY_PLUS_CIRCUIT_RESET_SECONDS
+        )
+        self.client = httpx.Client(
+            base_url=base_url or settings.PAY_PLUS_API_URL,
+            headers=pay_plus_headers(settings),
+            timeout=httpx.Timeout(
+                settings.PAY_PLUS_TIMEOUT, connect=settings.PAY_PLUS_CONNECT_TIMEOUT
+            ),
+            limits=httpx.Limits(
+                max_connections=settings.PAY_PLUS_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.PAY_PLUS_MAX_CONNECTIONS,
+            ),
+            transport=transport,
+        )
+
+    def backoff(self, attempt: int) -> float:
+        # full jitter
+        return random.uniform(0, self.backoff_seconds * 2**attempt)
+
+    def post(self, path: str, json: dict, idempotent: bool = False) -> httpx.Response:
+        """POST to PayPlus API, path is relative to PAY_PLUS_API_URL"""
+        for attempt in range(self.retries + 1):
+            if self.circuit_breaker.is_open:
+                raise PayPlusCircuitOpen(f"PayPlus is unavailable, {path} not sent")
+            try:
+                response = self.client.post(path, json=json)
+            except NOT_SENT_ERRORS as e:
+                self.circuit_breaker.failure()
+                error = e
+            except httpx.RequestError as e:
+                self.circuit_breaker.failure()
+                if not idempotent:
+                    raise
+                error = e
+            else:
+                if response.status_code not in RETRY_STATUS_CODES:
+                    self.circuit_breaker.success()
+                    return response
+                self.circuit_breaker.failure()
+                if not idempotent:
+                    return response
+                error = None
+
+            if attempt == self.retries:
+                if error:
+                    raise error
+                return response
+            log(log.WARNING, "PayPlus %s failed, retry [%d]", path, attempt + 1)
+            time.sleep(self.backoff(attempt))
+
+    def close(self):
+        self.client.close()
+
+
+# one client and connection pool per process
+@lru_cache
+def get_payplus_client() -> PayPlusClient:
+    settings: Settings = get_settings()
+    if settings.PAY_PLUS_FAKE:
+        from .payplus_fake import FakePayPlus
+
+        fake = FakePayPlus(
+            latency_ms=settings.PAY_PLUS_FAKE_LATENCY_MS,
+            reject_rate=settings.PAY_PLUS_FAKE_REJECT_RATE,
+        )
+        return fake.client(settings)
+    return PayPlusClient(settings)
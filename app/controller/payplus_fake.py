@@ -0,0 +1,84 @@
+import json
+import random
+import threading
+import time
+
+import httpx
+
+from app.config import Settings
+from app.utility import generate_uuid
+from .payplus_client import PayPlusClient
+
+
+class FakePayPlus:
+    """In-process PayPlus server for tests and offline benchmarks
+
+    Serves the API calls made by app.controller.payplus and the payment link
+    endpoint with given latency; charges with tokens in rejected_tokens
+    (or by reject_rate chance) are declined
+    """
+
+    base_url = "http://payplus.fake/api/v1.0"
+
+    def __init__(self, latency_ms: int = 0, reject_rate: float = 0.0):
+        self.latency_ms = latency_ms
+        self.reject_rate = reject_rate
+        self.rejected_tokens: set[str] = set()
+        # charged amounts by charge key (or payment uuid if no key)
+        self.charges: dict[str, float] = {}
+        self.requests_count = 0
+        self._lock = threading.Lock()
+        self.transport = httpx.MockTransport(self.handle)
+
+    def client(self, settings: Settings) -> PayPlusClient:
+        """PayPlus client sending requests to this server"""
+        return PayPlusClient(settings, transport=self.transport, base_url=self.base_url)
+
+    def handle(self, request: httpx.Request) -> httpx.Response:
+        with self._lock:
+            self.requests_count += 1
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+        data = json.loads(request.content or b"{}")
+        path = request.url.path
+
+        if path.endswith("/Customers/Add"):
+            return self.success({"customer_uid": generate_uuid()})
+        if "/Token/" in path:
+            return self.success({"card_uid": generate_uuid()})
+        if path.endswith("/PaymentPages/generateLink"):
+            return self.success(
+                {
+                    "page_request_uid": generate_uuid(),
+                    "payment_page_link": "https://payments.payplus.co.il/fake-link",
+                }
+            )
+        if path.endswith("/Transactions/Charge"):
+            return self.charge(data)
+        return httpx.Response(404, json={"results": {"status": "error"}})
+
+    def charge(self, data: dict) -> httpx.Response:
+        if data.get("token") in self.rejected_tokens or (
+            self.reject_rate and random.random() < self.reject_rate
+        ):
+            return self.error("Card declined")
+        info = json.loads(data.get("more_info_1") or "{}")
+        key = info.get("charge_key") or info.get("platform_payment_uuid")
+        with self._lock:
+            # the same charge key is charged once
+            self.charges.setdefault(key, data["amount"])
+        return self.success({"number": generate_uuid()})
+
+    @staticmethod
+    def success(data: dict) -> httpx.Response:
+        return httpx.Response(
+            200,
+            json={"results": {"status": "success", "code": 0}, "data": data},
+        )
+
+    @staticmethod
+    def error(description: str) -> httpx.Response:
+        return httpx.Response(
+            200,
+            json={"results": {"status": "error", "description": description}},
+        )
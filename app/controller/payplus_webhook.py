@@ -0,0 +1,159 @@
+import hashlib
+import json
+from datetime import datetime
+
+from redis import RedisError
+from kombu.exceptions import OperationalError
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app import model as m
+from app import schema as s
+from app.logger import log
+
+
+def webhook_dedupe_key(data: dict, body: bytes) -> str:
+    """PayPlus resends webhooks, the same transaction is applied once"""
+    transaction = data.get("transaction")
+    number = transaction.get("number") if isinstance(transaction, dict) else None
+    if number:
+        return f"{data.get('transaction_type')}:{number}"
+    return f"sha256:{hashlib.sha256(body).hexdigest()}"
+
+
+def webhook_platform_payment_uuid(data: dict) -> str | None:
+    """uuid of platform payment sent by charge in more_info_1, if any"""
+    transaction = data.get("transaction")
+    if not isinstance(transaction, dict):
+        return None
+    try:
+        more_info = json.loads(transaction.get("more_info_1") or "{}")
+    except (TypeError, ValueError):
+        return None
+    uuid = (
+        more_info.get("platform_payment_uuid") if isinstance(more_info, dict) else None
+    )
+    return uuid[:36] if isinstance(uuid, str) else None
+
+
+async def store_webhook_event(db: AsyncSession, data: dict, body: bytes) -> int | None:
+    """Save webhook to inbox, returns id of new event or None if it is a duplicate"""
+    bind = db.get_bind()
+    dialect = postgresql if bind.dialect.name == "postgresql" else sqlite
+    query = (
+        dialect.insert(m.PayPlusWebhookEvent)
+        .values(
+            dedupe_key=webhook_dedupe_key(data, body),
+            transaction_type=data.get("transaction_type"),
+            platform_payment_uuid=webhook_platform_payment_uuid(data),
+            payload=data,
+            status=s.enums.WebhookEventStatus.RECEIVED,
+            attempts=0,
+            error="",
+            created_at=datetime.utcnow(),
+        )
+        .on_conflict_do_nothing(index_elements=[m.PayPlusWebhookEvent.dedupe_key])
+        .returning(m.PayPlusWebhookEvent.id)
+    )
+    return await db.scalar(query)
+
+
+def schedule_webhook_event(event_id: int):
+    """queue applying of stored webhook, not queued ones are applied by replay"""
+    from app.controller.celery import apply_payplus_webhook_event
+
+    try:
+        apply_payplus_webhook_event.delay(event_id)
+    except (RedisError, OperationalError) as e:
+        log(log.ERROR, "Webhook event [%s] not queued: %s", event_id, e)
+
+
+def apply_charge(db: Session, event: m.PayPlusWebhookEvent) -> str:
+    """Mark platform payment paid by Charge webhook, returns error if it can't"""
+    transaction: dict = event.payload["transaction"]
+    log(log.INFO, "Status code [%s]", transaction.get("status_code"))
+    platform_payment_uuid: str = json.loads(transaction["more_info_1"])[
+        "platform_payment_uuid"
+    ]
+    platform_payment: m.PlatformPayment = db.scalar(
+        select(m.PlatformPayment).where(m.PlatformPayment.uuid == platform_payment_uuid)
+    )
+    if not platform_payment:
+        log(log.INFO, "Platform Payment [%s] was not found", platform_payment_uuid)
+        return "Platform payment was not found"
+
+    platform_payment.transaction_number = transaction["number"]
+    platform_payment.status = s.enums.PlatformPaymentStatus.PAID
+    platform_payment.paid_at = datetime.fromisoformat(transaction["date"])
+    log(
+        log.INFO,
+        "Platform Payment details has been successfully updated - [%s]",
+        platform_payment.uuid,
+    )
+    return ""
+
+
+def apply_webhook_event(
+    db: Session, event_id: int
+) -> s.enums.WebhookEventStatus | None:
+    """Apply stored webhook, processed and ignored events are skipped"""
+    event: m.PayPlusWebhookEvent | None = db.scalar(
+        select(m.PayPlusWebhookEvent).where(m.PayPlusWebhookEvent.id == event_id)
+        # concurrent workers don't apply the same event twice
+        .with_for_update()
+    )
+    if not event:
+        log(log.WARNING, "Webhook event [%s] not found", event_id)
+        return None
+    if event.status in (
+        s.enums.WebhookEventStatus.PROCESSED,
+        s.enums.WebhookEventStatus.IGNORED,
+    ):
+        log(log.INFO, "Webhook event [%s] already applied", event_id)
+        return event.status
+
+    event.attempts += 1
+    if event.transaction_type == "Charge":
+        try:
+            event.error = apply_charge(db, event)
+        except (KeyError, TypeError, ValueError) as e:
+            log(log.ERROR, "Bad webhook event [%s]: %s", event_id, e)
+            event.error = f"Bad webhook data: {e}"[:512]
+        event.status = (
+            s.enums.WebhookEventStatus.FAILED
+            if event.error
+            else s.enums.WebhookEventStatus.PROCESSED
+        )
+    else:
+        log(log.INFO, "Webhook [%s] ignored", event.transaction_type)
+        event.status = s.enums.WebhookEventStatus.IGNORED
+    event.processed_at = datetime.utcnow()
+    db.commit()
+    log(log.INFO, "Webhook event [%s] %s", event_id, event.status.value)
+    return event.status
+
+
+def replay_webhook_events(
+    db: Session,
+    statuses: list[s.enums.WebhookEventStatus],
+    since: datetime | None = None,
+    inline: bool = False,
+) -> list[int]:
+    """Apply again events in given statuses, in place or by celery worker"""
+    query = (
+        select(m.PayPlusWebhookEvent.id)
+        .where(m.PayPlusWebhookEvent.status.in_(statuses))
+        .order_by(m.PayPlusWebhookEvent.id)
+    )
+    if since:
+        query = query.where(m.PayPlusWebhookEvent.created_at >= since)
+    event_ids = db.scalars(query).all()
+    for event_id in event_ids:
+        if inline:
+            apply_webhook_event(db, event_id)
+        else:
+            schedule_webhook_event(event_id)
+    log(log.INFO, "[%d] webhook events replayed", len(event_ids))
+    return event_ids
@@ -1,7 +1,11 @@
 import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable
 
 from fastapi import status, HTTPException
-from sqlalchemy import select, or_
+from sqlalchemy import Row, select, update, func
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import SQLAlchemyError
 
@@ -10,6 +14,9 @@ import app.schema as s
 from app.logger import log
 from app.config import get_settings, Settings
 from .payplus import payplus_periodic_charge
+from .payplus_client import NOT_SENT_ERRORS
+from .payplus_webhook import apply_webhook_event
+from .payment_method import update_users_payment_method
 
 settings: Settings = get_settings()
 
@@ -87,8 +94,9 @@ def create_application_payments(db: Session, application: m.Application):
     user_ids = [application.worker_id, application.owner_id]
     for user_id in user_ids:
         if settings.PAY_PLUS_DISABLED:
-            user = db.scalar(select(m.User).where(m.User.id == user_id))
-            if user.is_payment_method_invalid:
+            if db.scalar(
+                select(m.User.is_payment_method_invalid).where(m.User.id == user_id)
+            ):
                 log(
                     log.INFO,
                     "User [%s] payment method is invalid, skipping payment creation due to payplus disabled",
@@ -112,64 +120,340 @@ def create_application_payments(db: Session, application: m.Application):
     )
 
 
-def collect_fee():
-    from app.database import get_db
+CHARGED_STATUSES = (
+    s.enums.PlatformPaymentStatus.UNPAID,
+    s.enums.PlatformPaymentStatus.REJECTED,
+)
 
-    with get_db().__next__() as db:
-        log(log.INFO, "Collecting fee")
 
-        platform_payments: list[m.PlatformPayment] = db.scalars(
-            select(m.PlatformPayment).where(
-                or_(
-                    m.PlatformPayment.status == s.enums.PlatformPaymentStatus.UNPAID,
-                    m.PlatformPayment.status == s.enums.PlatformPaymentStatus.REJECTED,
-                )
+def claim_fee_collection(db: Session) -> m.FeeCollection:
+    """Unfinished collection run (if previous one crashed) or a new one
+
+    Payments to charge are moved to the run in PROGRESS with their charge keys
+    """
+    collection: m.FeeCollection | None = db.scalar(
+        select(m.FeeCollection)
+        .where(m.FeeCollection.finished_at.is_(None))
+        .order_by(m.FeeCollection.id)
+    )
+    if collection:
+        log(log.WARNING, "Resuming fee collection [%s]", collection.uuid)
+    else:
+        collection = m.FeeCollection()
+        db.add(collection)
+        db.flush()
+
+    # the same key for retries of the charge in resumed run
+    charge_key = m.PlatformPayment.uuid + ":" + collection.uuid
+    db.execute(
+        update(m.PlatformPayment)
+        .where(
+            m.PlatformPayment.status.in_(CHARGED_STATUSES),
+            # rejected by this run before it crashed
+            m.PlatformPayment.fee_collection_id.is_distinct_from(collection.id),
+        )
+        .values(
+            status=s.enums.PlatformPaymentStatus.PROGRESS,
+            fee_collection_id=collection.id,
+            charge_key=charge_key,
+            charge_sent_at=None,
+        )
+        .execution_options(synchronize_session=False)
+    )
+    # claimed by this run before it crashed
+    db.execute(
+        update(m.PlatformPayment)
+        .where(
+            m.PlatformPayment.fee_collection_id == collection.id,
+            m.PlatformPayment.charge_key.is_(None),
+        )
+        .values(charge_key=charge_key)
+        .execution_options(synchronize_session=False)
+    )
+    update_users_payment_method(db, collection_user_ids(db, collection))
+    db.commit()
+    return collection
+
+
+def collection_user_ids(db: Session, collection: m.FeeCollection) -> list[int]:
+    return db.scalars(
+        select(m.PlatformPayment.user_id)
+        .where(m.PlatformPayment.fee_collection_id == collection.id)
+        .distinct()
+    ).all()
+
+
+def fee_charges_query(collection: m.FeeCollection):
+    """Payments of the run left to charge, with summed up jobs payments"""
+    return (
+        select(
+            m.PlatformPayment.uuid,
+            m.PlatformPayment.charge_key,
+            m.PlatformPayment.charge_sent_at,
+            m.User.payplus_card_uid,
+            m.User.payplus_customer_uid,
+            func.coalesce(func.sum(m.Job.payment), 0).label("jobs_payment"),
+        )
+        .join(m.User, m.User.id == m.PlatformPayment.user_id)
+        .outerjoin(
+            m.PlatformCommission,
+            m.PlatformCommission.platform_payment_id == m.PlatformPayment.id,
+        )
+        .outerjoin(m.Job, m.Job.id == m.PlatformCommission.job_id)
+        .where(
+            m.PlatformPayment.fee_collection_id == collection.id,
+            m.PlatformPayment.status == s.enums.PlatformPaymentStatus.PROGRESS,
+        )
+        .group_by(m.PlatformPayment.id, m.User.id)
+    )
+
+
+def charge_fee(charge: Row) -> s.enums.PlatformPaymentStatus | None:
+    """Charge one platform payment, runs in worker thread with its own session"""
+    from app.database import db
+
+    payplus_charge_data = s.PayPlusCharge(
+        terminal_uid=settings.PAY_PLUS_TERMINAL_ID,
+        cashier_uid=settings.PAY_PLUS_CASHIERS_ID,
+        amount=charge.jobs_payment
+        * settings.VAT_COEFFICIENT
+        * settings.COMMISSION_COEFFICIENT,
+        currency_code=settings.PAYPLUS_CURRENCY_CODE,
+        use_token=True,
+        token=charge.payplus_card_uid,
+        more_info_1=json.dumps(
+            {"platform_payment_uuid": charge.uuid, "charge_key": charge.charge_key}
+        ),
+        customer_uid=charge.payplus_customer_uid,
+    )
+    with db.Session() as session:
+        # from now on the charge may reach PayPlus, a crashed run doesn't resend it
+        set_charge_sent_at(session, charge.uuid, datetime.utcnow())
+        try:
+            return payplus_periodic_charge(
+                payplus_charge_data, charge.uuid, session, settings
             )
+        except HTTPException as e:
+            # logged by payplus_periodic_charge
+            if isinstance(e.__cause__, NOT_SENT_ERRORS):
+                set_charge_sent_at(session, charge.uuid, None)
+            return None
+        except (ValueError, KeyError) as e:
+            # not a PayPlus response (5xx page etc.), the charge result is unknown
+            log(log.ERROR, "Bad PayPlus charge response [%s]: %s", charge.uuid, e)
+            return None
+
+
+def set_charge_sent_at(
+    db: Session, platform_payment_uuid: str, sent_at: datetime | None
+):
+    db.execute(
+        update(m.PlatformPayment)
+        .where(m.PlatformPayment.uuid == platform_payment_uuid)
+        .values(charge_sent_at=sent_at)
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+
+
+def confirm_sent_charge(db: Session, charge: Row) -> s.enums.PlatformPaymentStatus:
+    """Result of a charge sent by crashed run, by stored PayPlus webhook
+
+    Charge is not sent again: without webhook the payment stays in PROGRESS
+    for reconciliation
+    """
+    event_id = db.scalar(
+        select(m.PayPlusWebhookEvent.id)
+        .where(
+            m.PayPlusWebhookEvent.transaction_type == "Charge",
+            m.PayPlusWebhookEvent.status.in_(
+                (
+                    s.enums.WebhookEventStatus.RECEIVED,
+                    s.enums.WebhookEventStatus.FAILED,
+                )
+            ),
+            m.PayPlusWebhookEvent.platform_payment_uuid == charge.uuid,
+        )
+        .order_by(m.PayPlusWebhookEvent.id.desc())
+        .limit(1)
+    )
+    if event_id:
+        apply_webhook_event(db, event_id)
+    status = db.scalar(
+        select(m.PlatformPayment.status).where(m.PlatformPayment.uuid == charge.uuid)
+    )
+    if status == s.enums.PlatformPaymentStatus.PROGRESS:
+        log(
+            log.WARNING,
+            "Charge of platform payment [%s] was sent, result unknown - not charged again",
+            charge.uuid,
+        )
+    return status
+
+
+def reconcile_sent_charges(db: Session) -> list[str]:
+    """Confirm sent charges without result by webhooks stored since, returns uuids
+    of charges still unconfirmed
+
+    Their result has to be checked by operator in PayPlus and set by
+    resolve_sent_charge
+    """
+    charges = db.execute(
+        select(m.PlatformPayment.uuid)
+        .where(
+            m.PlatformPayment.status == s.enums.PlatformPaymentStatus.PROGRESS,
+            m.PlatformPayment.charge_sent_at.is_not(None),
+            # not by running collection
+            m.PlatformPayment.fee_collection_id.in_(
+                select(m.FeeCollection.id).where(
+                    m.FeeCollection.finished_at.is_not(None)
+                )
+            ),
+        )
+        .order_by(m.PlatformPayment.id)
+    ).all()
+    unconfirmed = [
+        charge.uuid
+        for charge in charges
+        if confirm_sent_charge(db, charge) == s.enums.PlatformPaymentStatus.PROGRESS
+    ]
+    if unconfirmed:
+        log(
+            log.ERROR,
+            "[%d] sent fee charges without result, check them in PayPlus: %s",
+            len(unconfirmed),
+            ", ".join(unconfirmed),
+        )
+    return unconfirmed
+
+
+def resolve_sent_charge(
+    db: Session,
+    platform_payment_uuid: str,
+    is_paid: bool,
+    transaction_number: str | None = None,
+) -> m.PlatformPayment | None:
+    """Set result of sent charge checked in PayPlus, not paid one is charged
+    by the next collection"""
+    platform_payment: m.PlatformPayment | None = db.scalar(
+        select(m.PlatformPayment).where(
+            m.PlatformPayment.uuid == platform_payment_uuid,
+            m.PlatformPayment.status == s.enums.PlatformPaymentStatus.PROGRESS,
+            m.PlatformPayment.charge_sent_at.is_not(None),
+        )
+    )
+    if not platform_payment:
+        log(log.WARNING, "Sent charge [%s] not found", platform_payment_uuid)
+        return None
+    if is_paid:
+        platform_payment.status = s.enums.PlatformPaymentStatus.PAID
+        platform_payment.paid_at = datetime.utcnow()
+        platform_payment.transaction_number = transaction_number
+    else:
+        platform_payment.status = s.enums.PlatformPaymentStatus.UNPAID
+        platform_payment.charge_sent_at = None
+    db.commit()
+    log(
+        log.INFO,
+        "Sent charge [%s] resolved - %s",
+        platform_payment_uuid,
+        platform_payment.status.value,
+    )
+    return platform_payment
+
+
+def finish_fee_collection(db: Session, collection: m.FeeCollection):
+    """Not charged payments go back to UNPAID for the next run, sent ones without
+    result stay in PROGRESS till their webhook comes"""
+    db.execute(
+        update(m.PlatformPayment)
+        .where(
+            m.PlatformPayment.fee_collection_id == collection.id,
+            m.PlatformPayment.status == s.enums.PlatformPaymentStatus.PROGRESS,
+            m.PlatformPayment.charge_sent_at.is_(None),
+        )
+        .values(status=s.enums.PlatformPaymentStatus.UNPAID)
+        .execution_options(synchronize_session=False)
+    )
+    update_users_payment_method(db, collection_user_ids(db, collection))
+
+    counts = dict(
+        db.execute(
+            select(m.PlatformPayment.status, func.count(m.PlatformPayment.id))
+            .where(m.PlatformPayment.fee_collection_id == collection.id)
+            .group_by(m.PlatformPayment.status)
         ).all()
-        if not platform_payments:
+    )
+    collection.paid_count = counts.get(s.enums.PlatformPaymentStatus.PAID, 0)
+    collection.rejected_count = counts.get(s.enums.PlatformPaymentStatus.REJECTED, 0)
+    collection.failed_count = counts.get(s.enums.PlatformPaymentStatus.UNPAID, 0)
+    collection.unconfirmed_count = counts.get(s.enums.PlatformPaymentStatus.PROGRESS, 0)
+    collection.payments_count = sum(counts.values())
+    collection.finished_at = datetime.utcnow()
+    db.commit()
+
+
+def collect_fee(report_progress: Callable[[dict], None] | None = None) -> dict:
+    """Charge unpaid and rejected platform payments of all users
+
+    Charges are sent by PAY_PLUS_CHARGE_CONCURRENCY threads, every result is
+    committed at once, so a crashed run is continued by the next call. Charges
+    sent by the crashed run are confirmed by webhooks, never sent again.
+    Progress is passed to report_progress
+    """
+    from app.database import db as dbo
+
+    log(log.INFO, "Collecting fee")
+    started = time.monotonic()
+    with dbo.Session() as db:
+        collection = claim_fee_collection(db)
+        charges = db.execute(fee_charges_query(collection)).all()
+        db.commit()
+        sent_charges = [charge for charge in charges if charge.charge_sent_at]
+        charges = [charge for charge in charges if not charge.charge_sent_at]
+
+        progress = dict(
+            collection=collection.uuid,
+            total=len(charges),
+            done=0,
+            paid=0,
+            rejected=0,
+            failed=0,
+            unconfirmed=0,
+        )
+        for charge in sent_charges:
+            if (
+                confirm_sent_charge(db, charge)
+                == s.enums.PlatformPaymentStatus.PROGRESS
+            ):
+                progress["unconfirmed"] += 1
+        if not charges:
             log(log.INFO, "No fee to collect")
-            return
 
-        for platform_payment in platform_payments:
-            log(
-                log.INFO,
-                "Collecting fee for platform payment - [%s]",
-                platform_payment.id,
-            )
-            commission_amount: list = []  # list of commission amounts
-            platform_payment.status = (
-                s.enums.PlatformPaymentStatus.PROGRESS
-            )  # settings status to progress
-            platform_commissions: list[m.PlatformCommission] = db.scalars(
-                select(m.PlatformCommission).where(
-                    m.PlatformCommission.platform_payment_id == platform_payment.id,
-                )
-            ).all()  # getting all platform comissions for this platform payment
-            for pc in platform_commissions:
-                commission_amount.append(
-                    pc.job.payment
-                    * settings.VAT_COEFFICIENT
-                    * settings.COMMISSION_COEFFICIENT
-                )  # calculating commission amount
-
-            payplus_charge_data: s.PayPlusCharge = s.PayPlusCharge(
-                terminal_uid=settings.PAY_PLUS_TERMINAL_ID,
-                cashier_uid=settings.PAY_PLUS_CASHIERS_ID,
-                amount=sum(commission_amount),
-                currency_code=settings.PAYPLUS_CURRENCY_CODE,
-                use_token=True,
-                token=platform_payment.user.payplus_card_uid,
-                more_info_1=json.dumps(
-                    {"platform_payment_uuid": platform_payment.uuid}
-                ),
-                customer_uid=platform_payment.user.payplus_customer_uid,
-            )
+        with ThreadPoolExecutor(
+            max_workers=settings.PAY_PLUS_CHARGE_CONCURRENCY
+        ) as executor:
+            for result in executor.map(charge_fee, charges):
+                progress["done"] += 1
+                if result == s.enums.PlatformPaymentStatus.PAID:
+                    progress["paid"] += 1
+                elif result == s.enums.PlatformPaymentStatus.REJECTED:
+                    progress["rejected"] += 1
+                else:
+                    progress["failed"] += 1
+                seconds = time.monotonic() - started
+                progress["charges_per_second"] = round(progress["done"] / seconds, 2)
+                if report_progress:
+                    report_progress(progress)
 
-            payplus_periodic_charge(
-                payplus_charge_data,
-                platform_payment.uuid,
-                db,
-                settings,
-            )
+        finish_fee_collection(db, collection)
 
-    log(log.INFO, "Collecting fee ended")
+    log(
+        log.INFO,
+        "Collecting fee ended: [%d] paid, [%d] rejected, [%d] failed in %.1f seconds",
+        progress["paid"],
+        progress["rejected"],
+        progress["failed"],
+        time.monotonic() - started,
+    )
+    return progress
@@ -1,63 +1,224 @@
 import firebase_admin
+import redis
 
-from fastapi import status, HTTPException
+from celery.utils.time import get_exponential_backoff_interval
 from firebase_admin import credentials
 from firebase_admin import messaging
-from firebase_admin.exceptions import FirebaseError
+from firebase_admin.exceptions import (
+    FirebaseError,
+    InternalError,
+    InvalidArgumentError,
+    UnavailableError,
+)
+from kombu.exceptions import OperationalError
+from sqlalchemy import delete
 
+from app import model as m
 from app import schema as s
+from app.config import get_settings, Settings
 from app.logger import log
+from app.utility import generate_uuid
+
+# FCM limit of tokens per one multicast message
+MULTICAST_TOKENS_LIMIT = 500
+
+# per-token errors meaning the token will never be valid again
+INVALID_TOKEN_ERRORS = (messaging.UnregisteredError, InvalidArgumentError)
+# per-token errors worth to retry
+RETRY_TOKEN_ERRORS = (messaging.QuotaExceededError, UnavailableError, InternalError)
+
+# deletes device key if it still points to the given message, missing key means
+# there is no newer message to deliver instead
+COMPARE_AND_DELETE_SCRIPT = """
+local latest = redis.call('get', KEYS[1])
+if not latest then
+    return 1
+end
+if latest == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+# redis hash with total counters of sent and pruned tokens
+PUSH_STATS_KEY = "push:stats"
+
+settings: Settings = get_settings()
 
 
 class PushHandler:
     _is_initialized = False
+    _redis: redis.Redis | None = None
 
-    def __init__(self):
+    @classmethod
+    def initialize_firebase(cls):
         if PushHandler._is_initialized:
-            log(log.INFO, "Firebase was initialized")
             return
 
         cred = credentials.Certificate("firebase_credentials.json")
         firebase_admin.initialize_app(cred)
         PushHandler._is_initialized = True
+        log(log.INFO, "Firebase was initialized")
+
+    @classmethod
+    def get_redis(cls) -> redis.Redis:
+        if not PushHandler._redis:
+            PushHandler._redis = redis.Redis.from_url(settings.REDIS_URL)
+        return PushHandler._redis
+
+    @staticmethod
+    def device_key(device_token: str, collapse_key: str) -> str:
+        return f"push:device:{device_token}:{collapse_key}"
+
+    @staticmethod
+    def collapse_key(payload: s.PushNotificationPayload) -> str:
+        """notifications of the same type about the same job replace each other"""
+        return f"{payload.notification_type.value}:{payload.job_uuid}"
 
     def send_notification(self, message_data: s.PushNotificationMessage):
+        """queue push notification to be sent by celery worker
+
+        The same notification (see collapse_key) to the same device within
+        PUSH_COALESCE_SECONDS is coalesced, only the latest one is delivered
+        """
+        from app.controller.celery import send_push_notification
+
         if not message_data.device_tokens:
             log(log.INFO, "User has no tokens to push")
             return
 
-        message = messaging.MulticastMessage(
-            tokens=message_data.device_tokens,
-            data=message_data.payload.dict(),
-            android=messaging.AndroidConfig(
-                ttl=3600,
-                priority="high",
-            ),
-            apns=messaging.APNSConfig(
-                payload=messaging.APNSPayload(
-                    aps=messaging.Aps(
-                        content_available=True,
-                        mutable_content=True,
+        device_tokens = list(dict.fromkeys(message_data.device_tokens))
+        message_id = collapse_key = None
+        # device keys live until the task expires, so a late task finds its key
+        expires = settings.PUSH_COALESCE_SECONDS + settings.PUSH_EXPIRES_SECONDS
+        try:
+            if settings.PUSH_COALESCE_SECONDS:
+                message_id = generate_uuid()
+                collapse_key = self.collapse_key(message_data.payload)
+                pipeline = self.get_redis().pipeline()
+                for device_token in device_tokens:
+                    pipeline.set(
+                        self.device_key(device_token, collapse_key),
+                        message_id,
+                        ex=expires,
+                    )
+                pipeline.execute()
+
+            send_push_notification.apply_async(
+                (device_tokens, message_data.payload.dict(), message_id, collapse_key),
+                countdown=settings.PUSH_COALESCE_SECONDS,
+                expires=expires,
+            )
+        except (redis.RedisError, OperationalError) as e:
+            log(log.ERROR, "Push notification was not queued: %s", e)
+            return
+
+        log(log.INFO, "Notification queued for [%d] devices", len(device_tokens))
+
+    def pop_latest_tokens(
+        self, message_id: str, collapse_key: str, device_tokens: list[str]
+    ) -> list[str]:
+        """filter out devices which got a newer same notification meanwhile"""
+        compare_and_delete = self.get_redis().register_script(COMPARE_AND_DELETE_SCRIPT)
+        pipeline = self.get_redis().pipeline()
+        for device_token in device_tokens:
+            compare_and_delete(
+                keys=[self.device_key(device_token, collapse_key)],
+                args=[message_id],
+                client=pipeline,
+            )
+        deleted = pipeline.execute()
+        return [token for token, is_latest in zip(device_tokens, deleted) if is_latest]
+
+    def send_multicast(self, device_tokens: list[str], data: dict) -> list[str]:
+        """send message to devices by chunks, returns tokens to retry
+
+        Devices with invalid tokens are deleted
+        """
+        self.initialize_firebase()
+
+        failed_tokens: list[str] = []
+        invalid_tokens: list[str] = []
+        for start in range(0, len(device_tokens), MULTICAST_TOKENS_LIMIT):
+            end = start + MULTICAST_TOKENS_LIMIT
+            tokens = device_tokens[start:end]
+            message = messaging.MulticastMessage(
+                tokens=tokens,
+                data=data,
+                android=messaging.AndroidConfig(
+                    ttl=3600,
+                    priority="high",
+                ),
+                apns=messaging.APNSConfig(
+                    payload=messaging.APNSPayload(
+                        aps=messaging.Aps(
+                            content_available=True,
+                            mutable_content=True,
+                        ),
+                        headers={"apns-priority": "5"},
                     ),
-                    headers={"apns-priority": "5"},
                 ),
-            ),
-        )
-
-        try:
-            messaging.send_multicast(multicast_message=message)
-            log(log.INFO, "Notification sended")
-            return {"status": "should be done"}
-
-        except FirebaseError as e:
-            log(log.ERROR, "FirebaseError while sending message: \n %s", e)
-            raise HTTPException(
-                status_code=status.HTTP_409_CONFLICT,
-                detail="FirebaseError while sending message",
             )
 
-        except (ValueError, TypeError):
-            log(log.ERROR, "Message arguments invalid")
-            raise HTTPException(
-                status_code=status.HTTP_409_CONFLICT, detail="Message arguments invalid"
+            try:
+                response = messaging.send_multicast(multicast_message=message)
+                log(
+                    log.INFO,
+                    "Notification sended: [%d] success, [%d] failure",
+                    response.success_count,
+                    response.failure_count,
+                )
+                for token, result in zip(tokens, response.responses):
+                    if isinstance(result.exception, INVALID_TOKEN_ERRORS):
+                        invalid_tokens.append(token)
+                    elif isinstance(result.exception, RETRY_TOKEN_ERRORS):
+                        failed_tokens.append(token)
+
+            except FirebaseError as e:
+                log(log.ERROR, "FirebaseError while sending message: \n %s", e)
+                failed_tokens += tokens
+
+            except (ValueError, TypeError):
+                log(log.ERROR, "Message arguments invalid")
+
+        self.prune_devices(invalid_tokens)
+        self.count_stats(sent=len(device_tokens), pruned=len(invalid_tokens))
+        return failed_tokens
+
+    def prune_devices(self, invalid_tokens: list[str]):
+        from app.database import db
+
+        if not invalid_tokens:
+            return
+
+        with db.Session() as session:
+            session.execute(
+                delete(m.Device).where(m.Device.push_token.in_(invalid_tokens))
             )
+            session.commit()
+        log(log.INFO, "Devices with [%d] invalid tokens deleted", len(invalid_tokens))
+
+    def count_stats(self, sent: int, pruned: int):
+        """update push stats, prune rate = pruned / sent"""
+        log(
+            log.INFO,
+            "Pruned [%d] of [%d] tokens (%.1f%%)",
+            pruned,
+            sent,
+            pruned / sent * 100 if sent else 0,
+        )
+        try:
+            pipeline = self.get_redis().pipeline()
+            pipeline.hincrby(PUSH_STATS_KEY, "sent", sent)
+            pipeline.hincrby(PUSH_STATS_KEY, "pruned", pruned)
+            pipeline.execute()
+        except redis.RedisError as e:
+            log(log.WARNING, "Push stats were not saved: %s", e)
+
+    @staticmethod
+    def retry_countdown(retries: int) -> int:
+        return get_exponential_backoff_interval(
+            factor=settings.PUSH_RETRY_BACKOFF_SECONDS,
+            retries=retries,
+            maximum=settings.PUSH_RETRY_BACKOFF_MAX_SECONDS,
+            full_jitter=True,
+        )
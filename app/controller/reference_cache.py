@@ -0,0 +1,108 @@
+import hashlib
+import json
+import threading
+import time
+from typing import Awaitable, Callable, NamedTuple
+
+from fastapi import Response, status
+from pydantic.json import pydantic_encoder
+
+from app.config import get_settings, Settings
+from app.logger import log
+
+settings: Settings = get_settings()
+
+PROFESSIONS_CACHE_KEY = "professions"
+LOCATIONS_CACHE_KEY = "locations"
+POPULAR_TAGS_CACHE_KEY = "popular_tags"
+
+
+class CachedResponse(NamedTuple):
+    body: bytes
+    etag: str
+    expires_at: float
+
+
+class ReferenceCache:
+    """Process-local cache of serialized reference data (professions, locations, tags)
+
+    Entries expire after ttl seconds, so changes made by other processes are seen
+    after ttl at most. Changes made in this process should call invalidate()
+    """
+
+    def __init__(self, ttl: int):
+        self.ttl = ttl
+        self._entries: dict[str, CachedResponse] = {}
+        self._lock = threading.Lock()
+
+    def _fresh_entry(self, key: str) -> CachedResponse | None:
+        entry = self._entries.get(key)
+        if entry and entry.expires_at > time.monotonic():
+            return entry
+        return None
+
+    def _store(self, key: str, body: bytes) -> CachedResponse:
+        entry = CachedResponse(
+            body=body,
+            etag=f'"{hashlib.sha1(body).hexdigest()}"',
+            expires_at=time.monotonic() + self.ttl,
+        )
+        self._entries[key] = entry
+        log(log.DEBUG, "Reference cache [%s] loaded", key)
+        return entry
+
+    def get(self, key: str, load: Callable[[], bytes]) -> CachedResponse:
+        with self._lock:
+            return self._fresh_entry(key) or self._store(key, load())
+
+    async def get_async(
+        self, key: str, load: Callable[[], Awaitable[bytes]]
+    ) -> CachedResponse:
+        """get with async loader
+
+        Lock is not held while loading, concurrent misses may load the entry twice
+        """
+        entry = self._fresh_entry(key)
+        if entry:
+            return entry
+        body = await load()
+        with self._lock:
+            return self._store(key, body)
+
+    def invalidate(self, *keys: str):
+        """drop given entries, all if no keys given"""
+        with self._lock:
+            for key in keys or list(self._entries):
+                self._entries.pop(key, None)
+        log(log.INFO, "Reference cache [%s] invalidated", ",".join(keys) or "all")
+
+
+reference_cache = ReferenceCache(ttl=settings.REFERENCE_CACHE_TTL)
+
+
+def serialize(data) -> bytes:
+    return json.dumps(data, default=pydantic_encoder, ensure_ascii=False).encode()
+
+
+def _etag_response(entry: CachedResponse, if_none_match: str | None) -> Response:
+    headers = {"ETag": entry.etag, "Cache-Control": "no-cache"}
+    if if_none_match and (
+        if_none_match.strip() == "*"
+        or entry.etag in [etag.strip() for etag in if_none_match.split(",")]
+    ):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=entry.body, media_type="application/json", headers=headers)
+
+
+def cached_json_response(
+    key: str, load: Callable[[], bytes], if_none_match: str | None
+) -> Response:
+    """JSON response from reference cache, 304 if client has the same version"""
+    return _etag_response(reference_cache.get(key, load), if_none_match)
+
+
+async def cached_json_response_async(
+    key: str, load: Callable[[], Awaitable[bytes]], if_none_match: str | None
+) -> Response:
+    """cached_json_response with async loader"""
+    return _etag_response(await reference_cache.get_async(key, load), if_none_match)
@@ -0,0 +1,276 @@
+import hashlib
+import hmac
+import os
+import time
+from abc import ABC, abstractmethod
+from datetime import timedelta
+from typing import BinaryIO, NamedTuple
+from urllib.parse import quote, unquote, urlencode
+
+from google.api_core.exceptions import NotFound
+from google.cloud import storage
+from google.cloud.exceptions import GoogleCloudError
+
+from app.config import Settings
+from app.logger import log
+
+
+class StorageError(Exception):
+    """Raised when storage backend fails to save or delete a file"""
+
+
+class StoredObject(NamedTuple):
+    size: int
+    content_type: str | None
+
+
+class StorageBackend(ABC):
+    """Files storage, paths are relative to the bucket root"""
+
+    @abstractmethod
+    def upload(
+        self, path: str, data: bytes | BinaryIO, content_type: str | None = None
+    ) -> str:
+        """save file, returns its public url"""
+
+    @abstractmethod
+    def download(self, path: str) -> bytes:
+        """content of file, raises StorageError if file is missing"""
+
+    @abstractmethod
+    def delete(self, path: str) -> None:
+        """delete file, missing file is not an error"""
+
+    @abstractmethod
+    def exists(self, path: str) -> bool:
+        ...
+
+    @abstractmethod
+    def public_url(self, path: str) -> str:
+        ...
+
+    @abstractmethod
+    def stat(self, path: str) -> StoredObject | None:
+        """size and content type of stored file, None if file is missing"""
+
+    def path_from_url(self, url: str | None) -> str | None:
+        """path of file by its public url, None if url is not of this storage"""
+        base_url = self.public_url("")
+        if not url or not url.startswith(base_url):
+            return None
+        return unquote(url.removeprefix(base_url))
+
+    @abstractmethod
+    def signed_upload_url(self, path: str, content_type: str, expires_in: int) -> str:
+        """url to upload file by client directly with PUT request"""
+
+
+class GoogleStorageBackend(StorageBackend):
+    """Google Cloud Storage bucket, one client per process"""
+
+    def __init__(self, settings: Settings):
+        self.client = storage.Client.from_service_account_json(
+            json_credentials_path=settings.GOOGLE_SERVICE_ACCOUNT_PATH
+        )
+        # bucket handle without metadata request
+        self.bucket = self.client.bucket(settings.GOOGLE_STORAGE_BUCKET_NAME)
+
+    def upload(
+        self, path: str, data: bytes | BinaryIO, content_type: str | None = None
+    ) -> str:
+        blob = self.bucket.blob(path)
+        try:
+            if isinstance(data, bytes):
+                blob.upload_from_string(data, content_type=content_type)
+            else:
+                blob.upload_from_file(data, content_type=content_type)
+        except GoogleCloudError as e:
+            raise StorageError(e)
+        return blob.public_url
+
+    def download(self, path: str) -> bytes:
+        try:
+            return self.bucket.blob(path).download_as_bytes()
+        except GoogleCloudError as e:
+            raise StorageError(e)
+
+    def delete(self, path: str) -> None:
+        try:
+            self.bucket.blob(path).delete()
+        except NotFound:
+            log(log.INFO, "File %s not found in google cloud storage", path)
+        except GoogleCloudError as e:
+            raise StorageError(e)
+
+    def exists(self, path: str) -> bool:
+        try:
+            return self.bucket.blob(path).exists()
+        except GoogleCloudError as e:
+            raise StorageError(e)
+
+    def public_url(self, path: str) -> str:
+        return self.bucket.blob(path).public_url
+
+    def stat(self, path: str) -> StoredObject | None:
+        try:
+            blob = self.bucket.get_blob(path)
+        except GoogleCloudError as e:
+            raise StorageError(e)
+        if not blob:
+            return None
+        return StoredObject(size=blob.size, content_type=blob.content_type)
+
+    def signed_upload_url(self, path: str, content_type: str, expires_in: int) -> str:
+        return self.bucket.blob(path).generate_signed_url(
+            version="v4",
+            expiration=timedelta(seconds=expires_in),
+            method="PUT",
+            content_type=content_type,
+        )
+
+
+class AppUploadStorageBackend(StorageBackend):
+    """Storage receiving direct uploads through the app: PUT /api/files/storage/{path}
+
+    Upload urls are signed with HMAC of path, content type and expiration time
+    """
+
+    def __init__(self, upload_url: str, secret: str):
+        self.upload_url = upload_url.rstrip("/")
+        self.secret = secret.encode()
+
+    def _signature(self, path: str, content_type: str, expires: int) -> str:
+        message = f"{path}\n{content_type}\n{expires}".encode()
+        return hmac.new(self.secret, message, hashlib.sha256).hexdigest()
+
+    def signed_upload_url(self, path: str, content_type: str, expires_in: int) -> str:
+        expires = int(time.time()) + expires_in
+        query = urlencode(
+            dict(
+                expires=expires, signature=self._signature(path, content_type, expires)
+            )
+        )
+        return f"{self.upload_url}/{quote(path)}?{query}"
+
+    def verify_upload_signature(
+        self, path: str, content_type: str, expires: int, signature: str
+    ) -> bool:
+        return expires >= time.time() and hmac.compare_digest(
+            signature, self._signature(path, content_type, expires)
+        )
+
+
+class LocalStorageBackend(AppUploadStorageBackend):
+    """Directory on local disk, files are served by the app on LOCAL_STORAGE_URL
+
+    Content type of files is not kept
+    """
+
+    def __init__(self, root: str, base_url: str, upload_url: str, secret: str):
+        super().__init__(upload_url, secret)
+        self.root = os.path.abspath(root)
+        self.base_url = base_url.rstrip("/")
+        os.makedirs(self.root, exist_ok=True)
+
+    def _full_path(self, path: str) -> str:
+        full_path = os.path.abspath(os.path.join(self.root, path))
+        if not full_path.startswith(self.root + os.sep):
+            raise StorageError(f"Path [{path}] is outside of storage")
+        return full_path
+
+    def upload(
+        self, path: str, data: bytes | BinaryIO, content_type: str | None = None
+    ) -> str:
+        full_path = self._full_path(path)
+        try:
+            os.makedirs(os.path.dirname(full_path), exist_ok=True)
+            with open(full_path, "wb") as f:
+                f.write(data if isinstance(data, bytes) else data.read())
+        except OSError as e:
+            raise StorageError(e)
+        return self.public_url(path)
+
+    def download(self, path: str) -> bytes:
+        try:
+            with open(self._full_path(path), "rb") as f:
+                return f.read()
+        except OSError as e:
+            raise StorageError(e)
+
+    def delete(self, path: str) -> None:
+        try:
+            os.remove(self._full_path(path))
+        except FileNotFoundError:
+            log(log.INFO, "File %s not found in local storage", path)
+        except OSError as e:
+            raise StorageError(e)
+
+    def exists(self, path: str) -> bool:
+        return os.path.isfile(self._full_path(path))
+
+    def public_url(self, path: str) -> str:
+        return f"{self.base_url}/{quote(path)}"
+
+    def stat(self, path: str) -> StoredObject | None:
+        if not self.exists(path):
+            return None
+        return StoredObject(
+            size=os.path.getsize(self._full_path(path)), content_type=None
+        )
+
+
+class MemoryStorageBackend(AppUploadStorageBackend):
+    """Files kept in process memory, for tests"""
+
+    def __init__(
+        self, upload_url: str, secret: str, base_url: str = "https://storage.memory"
+    ):
+        super().__init__(upload_url, secret)
+        self.base_url = base_url.rstrip("/")
+        self.files: dict[str, bytes] = {}
+        self.content_types: dict[str, str | None] = {}
+
+    def upload(
+        self, path: str, data: bytes | BinaryIO, content_type: str | None = None
+    ) -> str:
+        self.files[path] = data if isinstance(data, bytes) else data.read()
+        self.content_types[path] = content_type
+        return self.public_url(path)
+
+    def download(self, path: str) -> bytes:
+        if path not in self.files:
+            raise StorageError(f"File [{path}] not found")
+        return self.files[path]
+
+    def delete(self, path: str) -> None:
+        self.content_types.pop(path, None)
+        if self.files.pop(path, None) is None:
+            log(log.INFO, "File %s not found in memory storage", path)
+
+    def exists(self, path: str) -> bool:
+        return path in self.files
+
+    def public_url(self, path: str) -> str:
+        return f"{self.base_url}/{quote(path)}"
+
+    def stat(self, path: str) -> StoredObject | None:
+        if path not in self.files:
+            return None
+        return StoredObject(
+            size=len(self.files[path]), content_type=self.content_types[path]
+        )
+
+
+def create_storage_backend(settings: Settings) -> StorageBackend:
+    if settings.STORAGE_BACKEND == "gcs":
+        return GoogleStorageBackend(settings)
+    if settings.STORAGE_BACKEND == "local":
+        return LocalStorageBackend(
+            settings.LOCAL_STORAGE_PATH,
+            settings.LOCAL_STORAGE_URL,
+            settings.STORAGE_UPLOAD_URL,
+            settings.JWT_SECRET,
+        )
+    if settings.STORAGE_BACKEND == "memory":
+        return MemoryStorageBackend(settings.STORAGE_UPLOAD_URL, settings.JWT_SECRET)
+    raise ValueError(f"Unknown storage backend [{settings.STORAGE_BACKEND}]")
@@ -3,9 +3,10 @@ import datetime
 from fastapi import HTTPException, status
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import SQLAlchemyError
-from sqlalchemy import select, or_, and_
+from sqlalchemy import Select, select, or_, and_, func
 
 from app.logger import log
+from app.utility.principal_cache import principal_cache
 from app import schema as s
 from app import model as m
 
@@ -153,5 +154,51 @@ def delete_user_view(device: s.LogoutIn, current_user: m.User, db: Session):
         raise HTTPException(
             status_code=status.HTTP_409_CONFLICT, detail="Error deleting user"
         )
+    principal_cache.invalidate(current_user.id)
     log(log.INFO, "User [%s] deleted successfully", current_user.id)
     return current_user
+
+
+def payments_tab_query(user_id: int) -> Select:
+    """All totals of user payments tab, by conditional sums over user jobs"""
+
+    def total(column, *conditions):
+        return func.coalesce(func.sum(column).filter(and_(*conditions)), 0)
+
+    is_worker = m.Job.worker_id == user_id
+    is_owner = m.Job.owner_id == user_id
+    return select(
+        total(
+            m.Job.payment, is_worker, m.Job.payment_status == s.enums.PaymentStatus.PAID
+        ).label("total_earnings"),
+        total(
+            m.Job.payment,
+            is_worker,
+            m.Job.payment_status == s.enums.PaymentStatus.UNPAID,
+        ).label("unpaid_payments"),
+        total(
+            m.Job.payment,
+            is_worker,
+            m.Job.payment_status == s.enums.PaymentStatus.REQUESTED,
+        ).label("approve_payments"),
+        total(
+            m.Job.payment,
+            is_owner,
+            m.Job.payment_status == s.enums.PaymentStatus.REQUESTED,
+        ).label("send_payments"),
+        total(
+            m.Job.commission,
+            is_worker,
+            m.Job.commission_status == s.enums.CommissionStatus.UNPAID,
+        ).label("unpaid_commissions"),
+        total(
+            m.Job.commission,
+            is_worker,
+            m.Job.commission_status == s.enums.CommissionStatus.REQUESTED,
+        ).label("approve_commissions"),
+        total(
+            m.Job.commission,
+            is_owner,
+            m.Job.commission_status == s.enums.CommissionStatus.REQUESTED,
+        ).label("send_commissions"),
+    ).where(or_(is_worker, is_owner))
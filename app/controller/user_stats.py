@@ -0,0 +1,71 @@
+from sqlalchemy import select, func, and_, true
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.elements import ColumnElement
+
+from app import model as m
+from app import schema as s
+from app.database import lock_keys
+from app.logger import log
+
+# advisory locks namespace of user stats rows, by user id
+USER_STATS_LOCK = 1
+
+
+def _count(model, *conditions) -> ColumnElement:
+    return select(func.count(model.id)).where(and_(*conditions)).scalar_subquery()
+
+
+def users_stats_query(user_ids: list[int] | None = None):
+    """Select user stats calculated from jobs and reviews"""
+    query = select(
+        m.User.id,
+        _count(m.Job, m.Job.owner_id == m.User.id),
+        _count(
+            m.Job,
+            m.Job.worker_id == m.User.id,
+            m.Job.status == s.enums.JobStatus.JOB_IS_FINISHED,
+        ),
+        _count(m.Job, m.Job.worker_id == m.User.id, m.Job.is_deleted.is_(True)),
+        *[
+            _count(m.Review, m.Review.evaluates_id == m.User.id, m.Review.rate == rate)
+            for rate in (
+                s.BaseRate.RateStatus.POSITIVE,
+                s.BaseRate.RateStatus.NEGATIVE,
+                s.BaseRate.RateStatus.NEUTRAL,
+            )
+        ],
+    )
+    if user_ids is not None:
+        return query.where(m.User.id.in_(user_ids))
+    # sqlite needs WHERE in "INSERT ... SELECT ... ON CONFLICT"
+    return query.where(true())
+
+
+STATS_COLUMNS = [
+    "user_id",
+    "jobs_posted_count",
+    "jobs_completed_count",
+    "jobs_canceled_count",
+    "positive_rates_count",
+    "negative_rates_count",
+    "neutral_rates_count",
+]
+
+
+def update_users_stats(db: Session, user_ids: list[int] | None = None) -> None:
+    """Recalculate stats of given users (all users if user_ids is None)"""
+    # core execution, so it can be called while session is flushing
+    connection = db.connection()
+    # stats are read after concurrent changes of these users are committed
+    lock_keys(connection, USER_STATS_LOCK, user_ids)
+    dialect = postgresql if db.get_bind().dialect.name == "postgresql" else sqlite
+    query = dialect.insert(m.UserStats).from_select(
+        STATS_COLUMNS, users_stats_query(user_ids)
+    )
+    query = query.on_conflict_do_update(
+        index_elements=[m.UserStats.user_id],
+        set_={column: query.excluded[column] for column in STATS_COLUMNS[1:]},
+    )
+    connection.execute(query)
+    log(log.DEBUG, "Users stats updated - %s", user_ids or "all")
@@ -1,25 +1,258 @@
+import threading
+import time
+from collections import defaultdict
+from contextvars import ContextVar
 from functools import lru_cache
-from typing import Generator
+from typing import AsyncGenerator, Generator, Iterable
 
-# from alchemical.aio import Alchemical
 from alchemical import Alchemical
-from sqlalchemy import Engine, create_engine
+from sqlalchemy import URL, Connection, Engine, event, func, make_url, select
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
 from sqlalchemy.orm import Session
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, Pool, QueuePool
 
 from app.config import get_settings, Settings
+from app.logger import log
 
 settings: Settings = get_settings()
 
 
-db = Alchemical(settings.DATABASE_URI, session_options={"autoflush": False})
+class DurationStats:
+    """Number, total and max duration of some operation"""
+
+    def __init__(self):
+        self.count = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def add(self, seconds: float):
+        with self._lock:
+            self.count += 1
+            self.total_seconds += seconds
+            self.max_seconds = max(self.max_seconds, seconds)
+
+
+class TimedPoolMixin:
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # time spent by checkouts waiting for a connection
+        self.wait_stats = DurationStats()
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            self.wait_stats.add(time.perf_counter() - start)
+
+
+class TimedQueuePool(TimedPoolMixin, QueuePool):
+    pass
+
+
+class TimedAsyncQueuePool(TimedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+# scope of the request being handled, set by middleware
+request_scope: ContextVar[dict | None] = ContextVar("request_scope", default=None)
+# how long connections are kept checked out, by endpoint
+connection_hold_stats: dict[str, DurationStats] = defaultdict(DurationStats)
+
+
+def get_endpoint_label(scope: dict | None) -> str:
+    if not scope:
+        return "background"
+    endpoint = scope.get("endpoint")
+    name = getattr(endpoint, "__name__", None) if endpoint else scope.get("path")
+    return f"{scope.get('method')} {name or type(endpoint).__name__}"
+
+
+@event.listens_for(Pool, "checkout")
+def on_connection_checkout(dbapi_connection, connection_record, connection_proxy):
+    connection_record.info["checked_out"] = (time.perf_counter(), request_scope.get())
+
+
+@event.listens_for(Pool, "checkin")
+def on_connection_checkin(dbapi_connection, connection_record):
+    checked_out = connection_record and connection_record.info.pop("checked_out", None)
+    if not checked_out:
+        return
+    start, scope = checked_out
+    seconds = time.perf_counter() - start
+    # route is known only after the connection was checked out
+    label = get_endpoint_label(scope)
+    connection_hold_stats[label].add(seconds)
+    if (
+        settings.DB_CONNECTION_HOLD_WARNING_MS
+        and seconds * 1000 > settings.DB_CONNECTION_HOLD_WARNING_MS
+    ):
+        log(log.WARNING, "Connection held by [%s] for %.3f seconds", label, seconds)
+
+
+def release_connection(db: Session):
+    """End transaction of the session, so its connection goes back to the pool
+
+    Call before slow outbound I/O (PayPlus, Firebase, storage). Pending changes are
+    committed, loaded objects are expired and reloaded on the next access
+    """
+    if db.in_transaction():
+        db.commit()
+
+
+# key of advisory lock over all keys of a namespace
+ALL_KEYS = -1
+
+
+def lock_keys(connection: Connection, namespace: int, keys: Iterable[int] | None):
+    """Take postgres advisory locks of keys until the end of transaction
+
+    Transactions recalculating rows of the same keys wait for each other, so a row
+    is never overwritten by an aggregate of an outdated snapshot. keys None locks
+    the whole namespace. SQLite serializes writing transactions itself
+    """
+    if connection.dialect.name != "postgresql":
+        return
+    if keys is None:
+        connection.execute(select(func.pg_advisory_xact_lock(namespace, ALL_KEYS)))
+        return
+    connection.execute(select(func.pg_advisory_xact_lock_shared(namespace, ALL_KEYS)))
+    # the same order in all transactions, so they don't deadlock
+    for key in sorted(set(keys)):
+        connection.execute(select(func.pg_advisory_xact_lock(namespace, key)))
+
+
+@event.listens_for(Engine, "begin")
+def set_transaction_statement_timeout(connection):
+    # PgBouncer doesn't keep session settings of server connections
+    if (
+        settings.DB_PGBOUNCER
+        and settings.DB_STATEMENT_TIMEOUT_MS
+        and connection.dialect.name == "postgresql"
+    ):
+        connection.exec_driver_sql(
+            f"SET LOCAL statement_timeout = {int(settings.DB_STATEMENT_TIMEOUT_MS)}"
+        )
+
+
+def get_connect_args(settings: Settings, is_async: bool) -> dict:
+    if make_url(settings.DATABASE_URI).get_backend_name() != "postgresql":
+        return {}
+    connect_args = {}
+    if settings.DB_PGBOUNCER:
+        if is_async:
+            # prepared statements don't survive switching of server connections
+            connect_args.update(statement_cache_size=0, prepared_statement_cache_size=0)
+    # with PgBouncer statement timeout is set by set_transaction_statement_timeout
+    elif settings.DB_STATEMENT_TIMEOUT_MS:
+        if is_async:
+            connect_args["server_settings"] = {
+                "statement_timeout": str(settings.DB_STATEMENT_TIMEOUT_MS)
+            }
+        else:
+            connect_args[
+                "options"
+            ] = f"-c statement_timeout={settings.DB_STATEMENT_TIMEOUT_MS}"
+    return connect_args
+
+
+def get_engine_options(settings: Settings, is_async: bool = False) -> dict:
+    """create_engine arguments of sync and async engines, pools are sized apart"""
+    options = dict(
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+        connect_args=get_connect_args(settings, is_async),
+    )
+    if settings.DB_PGBOUNCER:
+        options["poolclass"] = NullPool
+    else:
+        options.update(
+            poolclass=TimedAsyncQueuePool if is_async else TimedQueuePool,
+            pool_size=(
+                settings.DB_ASYNC_POOL_SIZE if is_async else settings.DB_POOL_SIZE
+            ),
+            max_overflow=(
+                settings.DB_ASYNC_MAX_OVERFLOW if is_async else settings.DB_MAX_OVERFLOW
+            ),
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+            pool_recycle=settings.DB_POOL_RECYCLE,
+        )
+    return options
+
+
+def get_pool_stats(pool: Pool) -> dict:
+    stats = dict(pool_class=type(pool).__name__)
+    if isinstance(pool, QueuePool):
+        stats.update(
+            size=pool.size(),
+            checked_in=pool.checkedin(),
+            checked_out=pool.checkedout(),
+            # negative while pool is not filled up to its size
+            overflow=pool.overflow(),
+        )
+    if isinstance(pool, TimedPoolMixin):
+        stats.update(
+            checkouts=pool.wait_stats.count,
+            wait_seconds_total=pool.wait_stats.total_seconds,
+            wait_seconds_max=pool.wait_stats.max_seconds,
+        )
+    return stats
+
+
+# the only sync engine of the process: api, admin and celery
+db = Alchemical(
+    settings.DATABASE_URI,
+    engine_options=get_engine_options(settings),
+    session_options={"autoflush": False},
+)
 
 
-@lru_cache
 def get_engine() -> Engine:
-    settings: Settings = get_settings()
-    return create_engine(settings.DATABASE_URI)
+    return db.get_engine()
 
 
 def get_db() -> Generator[Session, None, None]:
     with db.Session() as session:
         yield session
+
+
+# async drivers for sync database urls of settings
+ASYNC_DRIVERS = {
+    "postgresql": "asyncpg",
+    "sqlite": "aiosqlite",
+}
+
+
+def get_async_database_url(database_uri: str) -> URL:
+    """postgresql+psycopg2://... -> postgresql+asyncpg://..."""
+    url = make_url(database_uri)
+    backend = url.get_backend_name()
+    return url.set(drivername=f"{backend}+{ASYNC_DRIVERS[backend]}")
+
+
+@lru_cache
+def get_async_engine() -> AsyncEngine:
+    settings: Settings = get_settings()
+    return create_async_engine(
+        get_async_database_url(settings.DATABASE_URI),
+        **get_engine_options(settings, is_async=True),
+    )
+
+
+@lru_cache
+def get_async_session_factory() -> async_sessionmaker[AsyncSession]:
+    # objects stay readable after commit, lazy loads are not possible in async code
+    return async_sessionmaker(
+        get_async_engine(), autoflush=False, expire_on_commit=False
+    )
+
+
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    """async session for read endpoints, relationships have to be loaded eagerly"""
+    async with get_async_session_factory()() as session:
+        yield session
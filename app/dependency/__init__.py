@@ -1,6 +1,14 @@
 # flake8: noqa F401
-from .user import get_current_user, get_user, get_payplus_verified_user
-from .controller import get_mail_client, get_google_storage_client
+from .user import (
+    get_current_principal,
+    get_current_principal_async,
+    get_current_user,
+    get_current_user_async,
+    get_user,
+    get_user_async,
+    get_payplus_verified_user,
+)
+from .controller import get_mail_client, get_storage
 from .job import get_job_by_uuid
 from .attachment import get_current_attachment
 from .file import get_file_by_uuid
@@ -1,3 +1,3 @@
 # flake8: noqa F401
 from .mail_client import get_mail_client
-from .google_cloud_client import get_google_storage_client
+from .storage import get_storage
@@ -0,0 +1,10 @@
+from functools import lru_cache
+
+from app.controller.storage import StorageBackend, create_storage_backend
+from app.config import get_settings
+
+
+# one storage client per process
+@lru_cache
+def get_storage() -> StorageBackend:
+    return create_storage_backend(get_settings())
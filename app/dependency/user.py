@@ -1,13 +1,16 @@
 from fastapi import Depends, HTTPException, status, Request
 from fastapi.security import OAuth2PasswordBearer
 
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, selectinload
+import sqlalchemy as sa
 from sqlalchemy import select
 
 from app.oauth2 import verify_access_token, INVALID_CREDENTIALS_EXCEPTION
-from app.database import get_db
+from app.database import get_db, get_async_db
 from app.logger import log
 from app.config import get_settings, Settings
+from app.utility.principal_cache import principal_cache
 import app.model as m
 import app.schema as s
 
@@ -15,12 +18,70 @@ oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login")
 settings: Settings = get_settings()
 
 
-def get_current_user(
+def principal_query(user_id: int) -> sa.Select:
+    return select(
+        m.User.id,
+        m.User.is_deleted,
+        m.User.is_verified,
+        m.User.payplus_card_uid.is_not(None).label("has_payment_method"),
+        m.User.is_payment_method_invalid,
+    ).where(m.User.id == user_id)
+
+
+def verify_token(token: str) -> tuple[int, str]:
+    """user id and signature of access token"""
+    token_data: s.TokenData = verify_access_token(token, INVALID_CREDENTIALS_EXCEPTION)
+    return int(token_data.user_id), token.rsplit(".", 1)[-1]
+
+
+def get_current_principal(
     token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)
+) -> s.Principal:
+    """Authenticated user flags, users table is queried once per cache ttl at most
+
+    For endpoints which don't need the user itself
+    """
+    user_id, signature = verify_token(token)
+    principal = principal_cache.get(user_id, signature)
+    if not principal:
+        row = db.execute(principal_query(user_id)).first()
+        if row:
+            principal = principal_cache.store(signature, s.Principal(**row._mapping))
+    return check_current_user(principal)
+
+
+async def get_current_principal_async(
+    token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)
+) -> s.Principal:
+    """get_current_principal for async endpoints"""
+    user_id, signature = verify_token(token)
+    principal = principal_cache.get(user_id, signature)
+    if not principal:
+        row = (await db.execute(principal_query(user_id))).first()
+        if row:
+            principal = principal_cache.store(signature, s.Principal(**row._mapping))
+    return check_current_user(principal)
+
+
+def get_current_user(
+    principal: s.Principal = Depends(get_current_principal),
+    db: Session = Depends(get_db),
 ) -> m.User:
     """Raises an exception if the current user is not authenticated"""
-    token: s.TokenData = verify_access_token(token, INVALID_CREDENTIALS_EXCEPTION)
-    user = db.query(m.User).filter_by(id=token.user_id).first()
+    return check_current_user(db.get(m.User, principal.id))
+
+
+async def get_current_user_async(
+    principal: s.Principal = Depends(get_current_principal_async),
+    db: AsyncSession = Depends(get_async_db),
+) -> m.User:
+    """get_current_user for async endpoints"""
+    return check_current_user(await db.get(m.User, principal.id))
+
+
+def check_current_user(
+    user: m.User | s.Principal | None,
+) -> m.User | s.Principal:
     if not user:
         log(log.INFO, "User wasn`t authorized")
         raise HTTPException(
@@ -53,16 +114,36 @@ def get_user(request: Request, db: Session = Depends(get_db)) -> m.User | None:
         return user
 
 
+async def get_user_async(
+    request: Request, db: AsyncSession = Depends(get_async_db)
+) -> m.User | None:
+    """get_user for async endpoints, user professions and locations are loaded"""
+    auth_header: str = request.headers.get("Authorization")
+    if auth_header:
+        token: s.TokenData = verify_access_token(
+            auth_header.split(" ")[1], INVALID_CREDENTIALS_EXCEPTION
+        )
+        return await db.scalar(
+            select(m.User)
+            .where(
+                m.User.id == token.user_id,
+                m.User.is_deleted.is_(False),
+            )
+            .options(selectinload(m.User.professions), selectinload(m.User.locations))
+        )
+
+
 def get_payplus_verified_user(
-    db: Session = Depends(get_db), current_user: m.User = Depends(get_current_user)
+    principal: s.Principal = Depends(get_current_principal),
+    current_user: m.User = Depends(get_current_user),
 ) -> m.User:
     """Raises an exception if the current user is not authenticated in payplus"""
     # Don`t check payplus if it`s disabled
     if settings.PAY_PLUS_DISABLED:
         return current_user
 
-    if (not current_user.payplus_card_uid) or current_user.is_payment_method_invalid:
-        log(log.INFO, "User [%s] doesn`t have payplus customer uid", current_user.id)
+    if not principal.has_payment_method or principal.is_payment_method_invalid:
+        log(log.INFO, "User [%s] doesn`t have payplus customer uid", principal.id)
         raise HTTPException(
             status_code=status.HTTP_409_CONFLICT,
             detail="User doesn`t have payplus customer uid",
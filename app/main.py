@@ -7,10 +7,12 @@ from fastapi.responses import HTMLResponse
 
 from fastapi import FastAPI, Request, Depends
 from fastapi.responses import RedirectResponse
+from fastapi.staticfiles import StaticFiles
 from sqladmin import Admin
 
-from app.database import get_engine
-from app.router import router
+from app.database import get_engine, get_async_engine, request_scope
+from app.controller.payplus_client import get_payplus_client
+from app.router import router, health_router
 from app.admin import authentication_backend, pages
 from app.logger import log
 from app.schema.enums import DevicePlatform
@@ -29,12 +31,43 @@ admin: Admin = Admin(
 
 
 app.include_router(router)
+# outside of /api, for load balancers and monitoring
+app.include_router(health_router)
+if get_settings().STORAGE_BACKEND == "local":
+    # files of local storage backend, see LocalStorageBackend
+    app.mount(
+        "/storage",
+        StaticFiles(directory=get_settings().LOCAL_STORAGE_PATH, check_dir=False),
+        name="storage",
+    )
 templates = Jinja2Templates(directory="app/templates")
 views = [pages.UserAdmin, pages.RateAdmin, pages.ProfessionAdmin, pages.JobAdmin]
 for view in views:
     admin.add_view(view)
 
 
+@app.on_event("shutdown")
+async def dispose_async_engine():
+    # async connections are bound to the event loop of the worker
+    await get_async_engine().dispose()
+
+
+@app.on_event("shutdown")
+def close_payplus_client():
+    if get_payplus_client.cache_info().currsize:
+        get_payplus_client().close()
+
+
+@app.middleware("http")
+async def label_db_connections(request: Request, call_next):
+    # connections checked out while handling request are counted by its endpoint
+    token = request_scope.set(request.scope)
+    try:
+        return await call_next(request)
+    finally:
+        request_scope.reset(token)
+
+
 @app.middleware("http")
 async def add_process_time_header(request: Request, call_next):
     start_time = time.time()
@@ -17,7 +17,9 @@ from .device import Device
 
 from .notification import Notification
 from .platform_commission import PlatformCommission
+from .fee_collection import FeeCollection
 from .platform_payment import PlatformPayment
+from .payplus_webhook_event import PayPlusWebhookEvent
 from .attachment import Attachment
 from .file import File
 from .commission import Commission
@@ -25,6 +27,8 @@ from .payment import Payment
 from .tag import Tag
 from .review import Review
 from .app_review import AppReview
+from .user_stats import UserStats
+from .job_price_stats import JobPriceStats
 
 
 from app.database import db
@@ -0,0 +1,39 @@
+from datetime import datetime
+
+import sqlalchemy as sa
+from sqlalchemy import orm
+
+from app.database import db
+from app.utility import generate_uuid
+
+
+class FeeCollection(db.Model):
+    """Weekly fee collection run, checkpoint of charged platform payments
+
+    Unfinished run is resumed by the next collect_fee call
+    """
+
+    __tablename__ = "fee_collections"
+
+    id: orm.Mapped[int] = orm.mapped_column(sa.Integer, primary_key=True)
+    uuid: orm.Mapped[str] = orm.mapped_column(
+        sa.String(36),
+        unique=True,
+        default=generate_uuid,
+    )
+    created_at: orm.Mapped[datetime] = orm.mapped_column(
+        sa.DateTime(), default=datetime.utcnow
+    )
+    finished_at: orm.Mapped[datetime | None] = orm.mapped_column(
+        sa.DateTime(), nullable=True
+    )
+
+    payments_count: orm.Mapped[int] = orm.mapped_column(sa.Integer, default=0)
+    paid_count: orm.Mapped[int] = orm.mapped_column(sa.Integer, default=0)
+    rejected_count: orm.Mapped[int] = orm.mapped_column(sa.Integer, default=0)
+    failed_count: orm.Mapped[int] = orm.mapped_column(sa.Integer, default=0)
+    # sent charges without result, left in PROGRESS till webhook or reconciliation
+    unconfirmed_count: orm.Mapped[int] = orm.mapped_column(sa.Integer, default=0)
+
+    def __repr__(self):
+        return f"<FeeCollection {self.id} - {self.created_at}>"
@@ -43,6 +43,24 @@ class File(db.Model):
         default=False,
     )
 
+    # direct uploads: file is pending until the client confirms the upload
+    is_uploaded: orm.Mapped[bool] = orm.mapped_column(
+        sa.Boolean, nullable=False, default=True, server_default=sa.true()
+    )
+    path: orm.Mapped[str | None] = orm.mapped_column(sa.String(512), nullable=True)
+    size: orm.Mapped[int | None] = orm.mapped_column(sa.BigInteger, nullable=True)
+    content_type: orm.Mapped[str | None] = orm.mapped_column(
+        sa.String(128), nullable=True
+    )
+    # hex SHA-256 of file content
+    content_hash: orm.Mapped[str | None] = orm.mapped_column(
+        sa.String(64), nullable=True, index=True
+    )
+    # urls of resized copies of image file, by variant name
+    variants: orm.Mapped[dict[str, str] | None] = orm.mapped_column(
+        sa.JSON, nullable=True
+    )
+
     # user: orm.Mapped["User"] = orm.relationship(  # noqa: F821
     #     "User",
     #     back_populates="files",
@@ -50,6 +68,8 @@ class File(db.Model):
 
     @property
     def storage_path(self) -> str:
+        if self.path:
+            return self.path
         return f"attachments/{self.user.uuid}/{self.original_filename}"
 
     @property
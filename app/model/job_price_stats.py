@@ -0,0 +1,67 @@
+import sqlalchemy as sa
+from sqlalchemy import orm
+
+from app.database import db
+from .jobs import Job
+from .job_location import JobLocation
+
+
+class JobPriceStats(db.Model):
+    """Prices of pending jobs by location, profession and price bucket,
+    maintained by app.controller.job_price_stats
+
+    Rows with location_id or profession_id 0 are stats over all locations or professions
+    """
+
+    __tablename__ = "job_price_stats"
+
+    location_id: orm.Mapped[int] = orm.mapped_column(
+        sa.Integer, primary_key=True, autoincrement=False
+    )
+    profession_id: orm.Mapped[int] = orm.mapped_column(
+        sa.Integer, primary_key=True, autoincrement=False
+    )
+    # payment // JOB_PRICE_BUCKET_SIZE
+    bucket: orm.Mapped[int] = orm.mapped_column(
+        sa.Integer, primary_key=True, autoincrement=False
+    )
+    jobs_count: orm.Mapped[int] = orm.mapped_column(sa.Integer, default=0)
+    min_price: orm.Mapped[int] = orm.mapped_column(sa.Integer)
+    max_price: orm.Mapped[int] = orm.mapped_column(sa.Integer)
+
+    def __repr__(self):
+        return f"<JobPriceStats {self.location_id}:{self.profession_id}:{self.bucket}>"
+
+
+JOB_PRICE_FIELDS = ("payment", "profession_id", "status", "is_deleted")
+
+
+@sa.event.listens_for(orm.Session, "after_flush")
+def refresh_job_price_stats(session: orm.Session, flush_context):
+    """Recalculate price stats touched by jobs or job regions changed in this flush"""
+    from app.controller.job_price_stats import update_jobs_price_stats
+
+    job_ids = set()
+    # previous values, current ones are read from db
+    payments, profession_ids, location_ids = set(), set(), set()
+    for obj in session.new | session.dirty | session.deleted:
+        if isinstance(obj, JobLocation):
+            job_ids.add(obj.job_id)
+            location_ids.add(obj.location_id)
+        elif isinstance(obj, Job):
+            state = sa.inspect(obj)
+            if obj in session.dirty and not any(
+                state.attrs[field].history.has_changes() for field in JOB_PRICE_FIELDS
+            ):
+                continue
+            job_ids.add(obj.id)
+            payments.update(state.attrs.payment.history.deleted)
+            profession_ids.update(state.attrs.profession_id.history.deleted)
+            if obj in session.deleted:
+                payments.add(obj.payment)
+                profession_ids.add(obj.profession_id)
+    job_ids.discard(None)
+    if job_ids:
+        update_jobs_price_stats(
+            session, list(job_ids), payments, profession_ids, location_ids
+        )
@@ -3,6 +3,7 @@ from typing import TYPE_CHECKING
 
 import sqlalchemy as sa
 from sqlalchemy import orm
+from sqlalchemy.dialects import postgresql
 
 
 from app.database import db
@@ -10,7 +11,7 @@ from app.exceptions import ValueDownGradeForbidden
 from app.utility import generate_uuid
 from app import schema as s
 from app.model.applications import Application
-from .job_location import jobs_locations
+from .job_location import jobs_locations, JobLocation
 from .payment import Payment
 from .commission import Commission
 from .job_status import JobStatus
@@ -25,6 +26,14 @@ if TYPE_CHECKING:
 
 class Job(db.Model):
     __tablename__ = "jobs"
+    __table_args__ = (
+        sa.Index("ix_jobs_search_vector", "search_vector", postgresql_using="gin"),
+        # payments tab totals and lists
+        sa.Index("ix_jobs_worker_id_payment_status", "worker_id", "payment_status"),
+        sa.Index("ix_jobs_owner_id_payment_status", "owner_id", "payment_status"),
+        # price stats recalculation by price bucket
+        sa.Index("ix_jobs_status_payment", "status", "payment"),
+    )
 
     id: orm.Mapped[int] = orm.mapped_column(sa.Integer, primary_key=True)
     uuid: orm.Mapped[str] = orm.mapped_column(
@@ -35,10 +44,10 @@ class Job(db.Model):
     )
 
     owner_id: orm.Mapped[int] = orm.mapped_column(
-        sa.ForeignKey("users.id"), nullable=False
+        sa.ForeignKey("users.id"), nullable=False, index=True
     )
     worker_id: orm.Mapped[int] = orm.mapped_column(
-        sa.ForeignKey("users.id"), nullable=True
+        sa.ForeignKey("users.id"), nullable=True, index=True
     )
 
     profession_id: orm.Mapped[int] = orm.mapped_column(
@@ -97,6 +106,13 @@ class Job(db.Model):
         sa.DateTime, default=datetime.utcnow
     )
 
+    # full text search document, maintained by app.controller.job_search (postgres only)
+    search_vector: orm.Mapped[str] = orm.mapped_column(
+        sa.Text().with_variant(postgresql.TSVECTOR(), "postgresql"),
+        nullable=True,
+        deferred=True,
+    )
+
     payments: orm.Mapped[list["Payment"]] = orm.relationship()
     commissions: orm.Mapped[list["Commission"]] = orm.relationship()
     statuses: orm.Mapped[list["JobStatus"]] = orm.relationship()
@@ -235,3 +251,25 @@ class Job(db.Model):
             if attachment.created_by_id == self.worker_id:
                 result.append(attachment)
         return result
+
+
+SEARCH_FIELDS = ("name", "description", "city", "profession_id")
+
+
+@sa.event.listens_for(orm.Session, "after_flush")
+def refresh_jobs_search_vector(session: orm.Session, flush_context):
+    """Keep jobs search vector up to date on every jobs or job regions change"""
+    from app.controller.job_search import update_jobs_search_vector as update
+
+    job_ids = set()
+    for obj in session.new | session.dirty | session.deleted:
+        if isinstance(obj, JobLocation):
+            job_ids.add(obj.job_id)
+        elif isinstance(obj, Job) and obj not in session.deleted:
+            state = sa.inspect(obj)
+            if obj in session.new or any(
+                state.attrs[field].history.has_changes() for field in SEARCH_FIELDS
+            ):
+                job_ids.add(obj.id)
+    if job_ids:
+        update(session, list(job_ids))
@@ -1,7 +1,7 @@
 import sqlalchemy as sa
 
 from datetime import datetime
-from sqlalchemy import orm, select
+from sqlalchemy import orm
 
 import app.schema as s
 
@@ -11,6 +11,17 @@ from app.utility import generate_uuid
 
 class Notification(db.Model):
     __tablename__ = "notifications"
+    __table_args__ = (
+        # user's notifications feed is paged by id desc
+        sa.Index("ix_notifications_user_id_id", "user_id", sa.text("id DESC")),
+        # unread notifications are counted for badge
+        sa.Index(
+            "ix_notifications_user_id_unread",
+            "user_id",
+            postgresql_where=sa.text("NOT is_read"),
+            sqlite_where=sa.text("NOT is_read"),
+        ),
+    )
 
     id: orm.Mapped[int] = orm.mapped_column(sa.Integer, primary_key=True)
     uuid: orm.Mapped[str] = orm.mapped_column(
@@ -28,35 +39,18 @@ class Notification(db.Model):
     user_id: orm.Mapped[int] = orm.mapped_column(
         sa.ForeignKey("users.id"), nullable=True
     )
+    is_read: orm.Mapped[bool] = orm.mapped_column(
+        sa.Boolean, default=False, server_default=sa.false(), nullable=False
+    )
 
     user = orm.relationship("User", backref="notifications")
 
     def __repr__(self):
         return f"<Notification {self.id} - Type [{self.type}]>"
 
-    def create_schema(
-        self, session: orm.Session
-    ) -> s.NotificationJob | s.NotificationApplication:
-        from app.model import Job, Application
-
-        if s.NotificationType.get_index(self.type) < s.NotificationType.get_index(
+    @property
+    def is_job_notification(self) -> bool:
+        """payload of notification is job, otherwise application"""
+        return s.NotificationType.get_index(self.type) < s.NotificationType.get_index(
             s.NotificationType.MAX_JOB_TYPE
-        ):
-            return s.NotificationJob(
-                id=self.id,
-                uuid=self.uuid,
-                user_id=self.user_id,
-                type=self.type,
-                payload=session.scalar(select(Job).filter(Job.id == self.entity_id)),
-                created_at=self.created_at,
-            )
-        return s.NotificationApplication(
-            id=self.id,
-            uuid=self.uuid,
-            user_id=self.user_id,
-            type=self.type,
-            payload=session.scalar(
-                select(Application).filter(Application.id == self.entity_id),
-            ),
-            created_at=self.created_at,
         )
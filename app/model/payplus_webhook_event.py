@@ -0,0 +1,41 @@
+from datetime import datetime
+
+import sqlalchemy as sa
+from sqlalchemy import orm
+
+from app.database import db
+from app import schema as s
+
+
+class PayPlusWebhookEvent(db.Model):
+    """Raw PayPlus webhook, stored on receive and applied by celery worker"""
+
+    __tablename__ = "payplus_webhook_events"
+
+    id: orm.Mapped[int] = orm.mapped_column(sa.Integer, primary_key=True)
+    # transaction type and number, hash of the body if there is no number
+    dedupe_key: orm.Mapped[str] = orm.mapped_column(sa.String(128), unique=True)
+    transaction_type: orm.Mapped[str | None] = orm.mapped_column(
+        sa.String(64), nullable=True
+    )
+    # platform payment charged by the transaction, from payload
+    platform_payment_uuid: orm.Mapped[str | None] = orm.mapped_column(
+        sa.String(36), nullable=True, index=True
+    )
+    payload: orm.Mapped[dict] = orm.mapped_column(sa.JSON)
+    status: orm.Mapped[s.enums.WebhookEventStatus] = orm.mapped_column(
+        sa.Enum(s.enums.WebhookEventStatus),
+        default=s.enums.WebhookEventStatus.RECEIVED,
+        index=True,
+    )
+    attempts: orm.Mapped[int] = orm.mapped_column(sa.Integer, default=0)
+    error: orm.Mapped[str] = orm.mapped_column(sa.String(512), default="")
+    created_at: orm.Mapped[datetime] = orm.mapped_column(
+        sa.DateTime(), default=datetime.utcnow
+    )
+    processed_at: orm.Mapped[datetime | None] = orm.mapped_column(
+        sa.DateTime(), nullable=True
+    )
+
+    def __repr__(self):
+        return f"<PayPlusWebhookEvent {self.id} - {self.dedupe_key}>"
@@ -27,7 +27,7 @@ class PlatformPayment(db.Model):
         sa.String(64), nullable=True
     )
     user_id: orm.Mapped[int] = orm.mapped_column(
-        sa.ForeignKey("users.id"), nullable=False
+        sa.ForeignKey("users.id"), nullable=False, index=True
     )  # payer_id
     status: orm.Mapped[s.enums.PlatformPaymentStatus] = orm.mapped_column(
         sa.Enum(s.enums.PlatformPaymentStatus),
@@ -41,6 +41,15 @@ class PlatformPayment(db.Model):
     rejected_at: orm.Mapped[sa.DateTime] = orm.mapped_column(
         sa.DateTime(), nullable=True
     )
+    # collection run charging the payment, idempotency key of the charge
+    fee_collection_id: orm.Mapped[int | None] = orm.mapped_column(
+        sa.ForeignKey("fee_collections.id"), nullable=True, index=True
+    )
+    charge_key: orm.Mapped[str | None] = orm.mapped_column(sa.String(80), nullable=True)
+    # charge may have reached PayPlus, its result comes with response or webhook
+    charge_sent_at: orm.Mapped[datetime | None] = orm.mapped_column(
+        sa.DateTime(), nullable=True
+    )
 
     user: orm.Mapped[User] = orm.relationship(
         "User", foreign_keys=[user_id], backref="platform_payments"
@@ -48,3 +57,27 @@ class PlatformPayment(db.Model):
 
     def __repr__(self):
         return f"<PlatformPayment {self.id} - {self.status}>"
+
+
+@sa.event.listens_for(orm.Session, "after_flush")
+def refresh_users_payment_method(session: orm.Session, flush_context):
+    """Recalculate is_payment_method_invalid of users whose payments or cards changed"""
+    from app.controller.payment_method import update_users_payment_method
+
+    user_ids = set()
+    for obj in session.new | session.dirty | session.deleted:
+        if isinstance(obj, PlatformPayment):
+            state = sa.inspect(obj)
+            if obj in session.dirty and not any(
+                state.attrs[field].history.has_changes()
+                for field in ("user_id", "status")
+            ):
+                continue
+            user_ids.add(obj.user_id)
+            user_ids.update(state.attrs.user_id.history.deleted)
+        elif isinstance(obj, User) and obj in session.dirty:
+            if sa.inspect(obj).attrs.payplus_card_uid.history.has_changes():
+                user_ids.add(obj.id)
+    user_ids.discard(None)
+    if user_ids:
+        update_users_payment_method(session, list(user_ids))
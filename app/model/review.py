@@ -20,7 +20,7 @@ class Review(db.Model):
         sa.ForeignKey("users.id"), nullable=False
     )
     evaluates_id: orm.Mapped[int] = orm.mapped_column(
-        sa.ForeignKey("users.id"), nullable=False
+        sa.ForeignKey("users.id"), nullable=False, index=True
     )
 
     job_id: orm.Mapped[int] = orm.mapped_column(
@@ -6,7 +6,6 @@ from sqlalchemy import orm
 
 from app.hash_utils import hash_verify
 from app.database import db
-from app import schema as s
 from app.logger import log
 from app.config import get_settings, Settings
 
@@ -22,6 +21,7 @@ if TYPE_CHECKING:
     from .location import Location
     from .attachment import Attachment
     from .applications import Application
+    from .user_stats import UserStats
 
 
 class User(db.Model, BaseUser):
@@ -68,6 +68,15 @@ class User(db.Model, BaseUser):
     )
 
     card_name: orm.Mapped[str] = orm.mapped_column(sa.String(64), nullable=True)
+    # user has a rejected platform payment, maintained by
+    # app.controller.payment_method
+    is_payment_method_invalid: orm.Mapped[bool] = orm.mapped_column(
+        sa.Boolean, default=False, server_default=sa.false()
+    )
+    # urls of resized copies of picture, by variant name
+    picture_variants: orm.Mapped[dict[str, str] | None] = orm.mapped_column(
+        sa.JSON, nullable=True
+    )
     attachments: orm.Mapped["Attachment"] = orm.relationship(
         "Attachment",
         backref="user",
@@ -83,14 +92,9 @@ class User(db.Model, BaseUser):
         backref="user",
     )
 
-    @property
-    def is_payment_method_invalid(self) -> bool:
-        return any(
-            [
-                pp.status == s.enums.PlatformPaymentStatus.REJECTED
-                for pp in self.platform_payments
-            ]
-        )
+    stats: orm.Mapped["UserStats"] = orm.relationship(
+        "UserStats", lazy="joined", uselist=False, viewonly=True
+    )
 
     @classmethod
     def authenticate_with_phone(
@@ -129,35 +133,27 @@ class User(db.Model, BaseUser):
 
     @property
     def jobs_posted_count(self) -> int:
-        return len(self.jobs_owned)
+        return self.stats.jobs_posted_count if self.stats else 0
 
     @property
     def jobs_completed_count(self) -> int:
-        return sum(
-            [job.status == s.enums.JobStatus.JOB_IS_FINISHED for job in self.jobs_to_do]
-        )
+        return self.stats.jobs_completed_count if self.stats else 0
 
     @property
     def jobs_canceled_count(self) -> int:
-        return sum([job.is_deleted for job in self.jobs_to_do])
+        return self.stats.jobs_canceled_count if self.stats else 0
 
     @property
     def positive_rates_count(self) -> int:
-        return sum(
-            [rate.rate == s.BaseRate.RateStatus.POSITIVE for rate in self.owned_rates]
-        )
+        return self.stats.positive_rates_count if self.stats else 0
 
     @property
     def negative_rates_count(self) -> int:
-        return sum(
-            [rate.rate == s.BaseRate.RateStatus.NEGATIVE for rate in self.owned_rates]
-        )
+        return self.stats.negative_rates_count if self.stats else 0
 
     @property
     def neutral_rates_count(self) -> int:
-        return sum(
-            [rate.rate == s.BaseRate.RateStatus.NEUTRAL for rate in self.owned_rates]
-        )
+        return self.stats.neutral_rates_count if self.stats else 0
 
     @property
     def is_new_user(self) -> bool:
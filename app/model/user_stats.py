@@ -0,0 +1,60 @@
+import sqlalchemy as sa
+from sqlalchemy import orm
+
+from app.database import db
+from .jobs import Job
+from .review import Review
+
+
+class UserStats(db.Model):
+    """Denormalized user profile counters, maintained by app.controller.user_stats"""
+
+    __tablename__ = "user_stats"
+
+    user_id: orm.Mapped[int] = orm.mapped_column(
+        sa.ForeignKey("users.id"), primary_key=True
+    )
+    jobs_posted_count: orm.Mapped[int] = orm.mapped_column(sa.Integer, default=0)
+    jobs_completed_count: orm.Mapped[int] = orm.mapped_column(sa.Integer, default=0)
+    jobs_canceled_count: orm.Mapped[int] = orm.mapped_column(sa.Integer, default=0)
+    positive_rates_count: orm.Mapped[int] = orm.mapped_column(sa.Integer, default=0)
+    negative_rates_count: orm.Mapped[int] = orm.mapped_column(sa.Integer, default=0)
+    neutral_rates_count: orm.Mapped[int] = orm.mapped_column(sa.Integer, default=0)
+
+    def __repr__(self):
+        return f"<UserStats {self.user_id}>"
+
+
+JOB_STATS_FIELDS = ("owner_id", "worker_id", "status", "is_deleted")
+REVIEW_STATS_FIELDS = ("evaluates_id", "rate")
+
+
+def _changed_user_ids(
+    session: orm.Session, obj: Job | Review, fields: tuple[str, ...]
+) -> set[int]:
+    state = sa.inspect(obj)
+    if obj in session.dirty and not any(
+        state.attrs[field].history.has_changes() for field in fields
+    ):
+        return set()
+    user_fields = [field for field in fields if field.endswith("_id")]
+    user_ids = {getattr(obj, field) for field in user_fields}
+    for field in user_fields:
+        user_ids.update(state.attrs[field].history.deleted)
+    return user_ids
+
+
+@sa.event.listens_for(orm.Session, "after_flush")
+def refresh_users_stats(session: orm.Session, flush_context):
+    """Recalculate stats of users whose jobs or reviews were changed in this flush"""
+    from app.controller.user_stats import update_users_stats
+
+    user_ids = set()
+    for obj in session.new | session.dirty | session.deleted:
+        if isinstance(obj, Job):
+            user_ids |= _changed_user_ids(session, obj, JOB_STATS_FIELDS)
+        elif isinstance(obj, Review):
+            user_ids |= _changed_user_ids(session, obj, REVIEW_STATS_FIELDS)
+    user_ids.discard(None)
+    if user_ids:
+        update_users_stats(session, list(user_ids))
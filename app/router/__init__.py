@@ -18,6 +18,7 @@ from .file import file_router
 from .review import review_router
 from .tag import tag_router
 from .app_review import app_review_router
+from .health import health_router
 
 # from .notify import notification_test_router
 
@@ -5,7 +5,7 @@ from sqlalchemy.exc import SQLAlchemyError
 
 from app.database import get_db
 from app.logger import log
-from app.dependency import get_current_user
+from app.dependency import get_current_principal
 import app.schema as s
 import app.model as m
 
@@ -39,10 +39,10 @@ def get_app_review(
 def create_app_review(
     app_review: s.AppReviewIn,
     db: Session = Depends(get_db),
-    current_user: m.User = Depends(get_current_user),
+    principal: s.Principal = Depends(get_current_principal),
 ):
     app_review = m.AppReview(
-        user_id=current_user.id,
+        user_id=principal.id,
         stars_count=app_review.stars_count,
         review=app_review.review,
     )
@@ -147,6 +147,7 @@ def update_application(
 
     application.status = s.Application.ApplicationStatus(application_data.status)
     job = application.job
+    messages: list[s.PushNotificationMessage] = []
 
     if application.status == s.BaseApplication.ApplicationStatus.ACCEPTED:
         pending_applications: list[m.Application] = db.scalars(
@@ -164,8 +165,7 @@ def update_application(
                 )
                 db.add(notification)
 
-                push_handler = PushHandler()
-                push_handler.send_notification(
+                messages.append(
                     s.PushNotificationMessage(
                         device_tokens=[
                             device.push_token
@@ -195,8 +195,7 @@ def update_application(
             type=notification_type,
         )
         db.add(notification)
-        push_handler = PushHandler()
-        push_handler.send_notification(
+        messages.append(
             s.PushNotificationMessage(
                 device_tokens=[device.push_token for device in user.devices],
                 payload=get_notification_payload(
@@ -213,6 +212,11 @@ def update_application(
             status_code=status.HTTP_409_CONFLICT, detail="Error updating application"
         )
 
+    # firebase is called after the connection went back to pool
+    push_handler = PushHandler()
+    for message in messages:
+        push_handler.send_notification(message)
+
     log(log.INFO, "Application updated successfully - [%s]", application.id)
     return s.ApplicationOut.from_orm(application)
 
@@ -272,6 +276,7 @@ def patch_application(
         application.status = s.Application.ApplicationStatus(application_data.status)
 
     job = application.job
+    messages: list[s.PushNotificationMessage] = []
 
     if (
         s.Application.ApplicationStatus(application_data.status)
@@ -292,8 +297,7 @@ def patch_application(
                 )
                 db.add(notification)
 
-                push_handler = PushHandler()
-                push_handler.send_notification(
+                messages.append(
                     s.PushNotificationMessage(
                         device_tokens=[
                             device.push_token
@@ -324,8 +328,7 @@ def patch_application(
         )
         db.add(notification)
 
-        push_handler = PushHandler()
-        push_handler.send_notification(
+        messages.append(
             s.PushNotificationMessage(
                 device_tokens=[device.push_token for device in user.devices],
                 payload=get_notification_payload(
@@ -342,5 +345,10 @@ def patch_application(
             status_code=status.HTTP_409_CONFLICT, detail="Error patching application"
         )
 
+    # firebase is called after the connection went back to pool
+    push_handler = PushHandler()
+    for message in messages:
+        push_handler.send_notification(message)
+
     log(log.INFO, "Application patched successfully - [%s]", application.id)
     return s.ApplicationOut.from_orm(application)
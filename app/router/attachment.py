@@ -13,7 +13,6 @@ import app.model as m
 import app.schema as s
 
 from app.logger import log
-from app.dependency import get_google_storage_client
 from app.config import get_settings, Settings
 
 attachment_router = APIRouter(prefix="/attachments", tags=["Attachments"])
@@ -64,11 +63,8 @@ def create_attachment(
 def delete_attachment(
     attachment_uuid: str,
     db: Session = Depends(get_db),
-    google_storage_client=Depends(get_google_storage_client),
-    settings: Settings = Depends(get_settings),
     attachment: m.Attachment = Depends(get_current_attachment),
 ):
-    # deleting from bucket
     attachment.is_deleted = True
     try:
         db.commit()
@@ -14,6 +14,7 @@ from app.oauth2 import create_access_token
 from app.logger import log
 from app.controller import create_payplus_customer, delete_device
 from app.config import get_settings, Settings
+from app.utility.principal_cache import principal_cache
 
 auth_router = APIRouter(prefix="/auth", tags=["Authentication"])
 
@@ -130,6 +131,7 @@ def verify(
             status_code=status.HTTP_409_CONFLICT, detail="Error while signing up"
         )
 
+    principal_cache.invalidate(current_user.id)
     log(log.INFO, "User [%s] is verified", current_user.phone)
 
     return current_user
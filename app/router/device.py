@@ -2,7 +2,7 @@ from fastapi import Depends, APIRouter, status
 from sqlalchemy import and_, select
 from sqlalchemy.orm import Session
 
-from app.dependency import get_current_user
+from app.dependency import get_current_principal
 import app.model as m
 import app.schema as s
 from app.logger import log
@@ -16,19 +16,19 @@ device_router = APIRouter(prefix="/devices", tags=["Devices"])
 def add_device_to_user(
     device: s.DeviceIn,
     db: Session = Depends(get_db),
-    user: m.User = Depends(get_current_user),
+    principal: s.Principal = Depends(get_current_principal),
 ):
     current_device = db.scalar(
         select(m.Device).where(
             and_(
                 m.Device.uuid == device.uuid,
-                m.Device.user_id == user.id,
+                m.Device.user_id == principal.id,
             )
         )
     )
 
     if current_device:
-        log(log.INFO, f"Device already exists for user: {user.id}")
+        log(log.INFO, f"Device already exists for user: {principal.id}")
         current_device.push_token = device.push_token
         db.commit()
         return
@@ -37,9 +37,9 @@ def add_device_to_user(
         m.Device(
             uuid=device.uuid,
             push_token=device.push_token,
-            user_id=user.id,
+            user_id=principal.id,
         )
     )
     db.commit()
 
-    log(log.INFO, f"Device added to user: {user.id}")
+    log(log.INFO, f"Device added to user: {principal.id}")
@@ -1,19 +1,95 @@
-from fastapi import APIRouter, Depends, HTTPException, status, File, UploadFile
+from fastapi import APIRouter, Depends, HTTPException, Request, status, File, UploadFile
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy import and_, select
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import SQLAlchemyError
 
-from app.controller import AttachmentController
-from app.database import get_db
+from app.controller import AttachmentController, ImageController
+from app.database import get_db, release_connection
 from app.logger import log
-from app.dependency import get_google_storage_client, get_file_by_uuid, get_current_user
+from app.controller.storage import AppUploadStorageBackend, StorageBackend
 from app.config import get_settings, Settings
+from app.dependency import get_storage, get_file_by_uuid, get_current_user
 import app.schema as s
 import app.model as m
 
 file_router = APIRouter(prefix="/files", tags=["Files"])
 
 
+@file_router.post(
+    "/upload-slot",
+    response_model=s.FileUploadOut,
+    status_code=status.HTTP_201_CREATED,
+)
+def create_upload_slot(
+    data: s.FileUploadIn,
+    db: Session = Depends(get_db),
+    current_user: m.User = Depends(get_current_user),
+    storage: StorageBackend = Depends(get_storage),
+    settings: Settings = Depends(get_settings),
+):
+    """Create pending file and signed url to upload its content directly to storage
+
+    Upload has to be confirmed by POST /files/{file_uuid}/confirm
+    """
+    return AttachmentController.create_upload_slot(
+        data, current_user, db, storage, settings
+    )
+
+
+@file_router.post(
+    "/{file_uuid}/confirm",
+    response_model=s.FileOut,
+    status_code=status.HTTP_200_OK,
+)
+def confirm_upload(
+    db: Session = Depends(get_db),
+    current_user: m.User = Depends(get_current_user),
+    storage: StorageBackend = Depends(get_storage),
+    settings: Settings = Depends(get_settings),
+    file: m.File = Depends(get_file_by_uuid),
+):
+    return AttachmentController.confirm_upload(
+        file, current_user, db, storage, settings
+    )
+
+
+@file_router.put("/storage/{path:path}", status_code=status.HTTP_200_OK)
+async def upload_to_storage(
+    path: str,
+    expires: int,
+    signature: str,
+    request: Request,
+    storage: StorageBackend = Depends(get_storage),
+    settings: Settings = Depends(get_settings),
+):
+    """Signed upload urls target of local and memory storage backends"""
+    content_type = request.headers.get("Content-Type", "")
+    if not isinstance(
+        storage, AppUploadStorageBackend
+    ) or not storage.verify_upload_signature(path, content_type, expires, signature):
+        log(log.INFO, "Upload to [%s] is not allowed", path)
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Upload is not allowed",
+        )
+
+    content = bytearray()
+    async for chunk in request.stream():
+        content += chunk
+        # upload is checked against the declared size on confirm
+        if len(content) > settings.FILE_MAX_SIZE:
+            log(log.INFO, "Upload to [%s] exceeds size limit", path)
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail="File is too large",
+            )
+
+    await run_in_threadpool(storage.upload, path, bytes(content), content_type)
+    log(log.INFO, "File uploaded to [%s]", path)
+    return status.HTTP_200_OK
+
+
 @file_router.get(
     "/{file_uuid}",
     response_model=s.FileOut,
@@ -36,7 +112,7 @@ def upload_file(
     file: UploadFile = File(...),
     db: Session = Depends(get_db),
     current_user: m.User = Depends(get_current_user),
-    google_storage_client=Depends(get_google_storage_client),
+    storage: StorageBackend = Depends(get_storage),
     settings: Settings = Depends(get_settings),
 ):
     # uploading file to google cloud bucket
@@ -47,18 +123,31 @@ def upload_file(
             detail="File not found",
         )
 
-    destination_blob_name = f"attachments/{current_user.uuid}/{file.filename}"
-    blob = AttachmentController.upload_file_to_google_cloud_storage(
-        filename=file.filename,
+    content_hash = AttachmentController.get_content_hash(file)
+    user_file = AttachmentController.get_user_file_by_content_hash(
+        content_hash, current_user, db
+    )
+    if user_file:
+        log(log.INFO, "File %s with same content already uploaded", user_file)
+        return user_file
+
+    if file.size is not None:
+        AttachmentController.check_user_quota(file.size, current_user, db, settings)
+
+    # folder by content hash, so files with same names don't overwrite
+    destination_blob_name = (
+        f"attachments/{current_user.uuid}/{content_hash}/{file.filename}"
+    )
+    release_connection(db)
+    file_url = AttachmentController.upload_file_to_storage(
         file=file,
         destination_filename=destination_blob_name,
-        google_storage_client=google_storage_client,
-        settings=settings,
+        storage=storage,
     )
     user_file = db.scalar(
         select(m.File).where(
             and_(
-                m.File.url == blob.public_url,
+                m.File.url == file_url,
                 m.File.user_id == current_user.id,
             )
         )
@@ -68,7 +157,11 @@ def upload_file(
         new_file = m.File(
             user_id=current_user.id,
             original_filename=file.filename,
-            url=blob.public_url,
+            url=file_url,
+            path=destination_blob_name,
+            size=file.size,
+            content_type=file.content_type,
+            content_hash=content_hash,
         )
         log(log.INFO, "File %s uploaded", new_file)
         db.add(new_file)
@@ -83,6 +176,7 @@ def upload_file(
                 detail="Failed to upload file",
             )
         log(log.INFO, "New file created - %s, url - %s", new_file, new_file.url)
+        ImageController.schedule_file_variants(new_file)
         return new_file
     else:
         log(log.INFO, "File %s already exists", user_file)
@@ -93,16 +187,13 @@ def upload_file(
 def delete_file(
     file_uuid: str,
     db: Session = Depends(get_db),
-    google_storage_client=Depends(get_google_storage_client),
-    settings: Settings = Depends(get_settings),
+    storage: StorageBackend = Depends(get_storage),
     file: m.File = Depends(get_file_by_uuid),
 ):
+    path = file.storage_path
+    release_connection(db)
     # deleting from bucket
-    AttachmentController.delete_file_from_google_cloud_storage(
-        filename=file.storage_path,
-        google_storage_client=google_storage_client,
-        settings=settings,
-    )
+    AttachmentController.delete_file_from_storage(filename=path, storage=storage)
     db.delete(file)
     try:
         db.commit()
@@ -0,0 +1,42 @@
+from fastapi import APIRouter, Response, status
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+
+import app.schema as s
+from app.database import (
+    connection_hold_stats,
+    get_engine,
+    get_async_engine,
+    get_pool_stats,
+)
+from app.logger import log
+
+health_router = APIRouter(prefix="/health", tags=["Health"])
+
+
+@health_router.get("/db", status_code=status.HTTP_200_OK, response_model=s.DBHealth)
+async def db_health(response: Response):
+    """Database availability and connection pools usage of this worker process"""
+    async_engine = get_async_engine()
+    is_alive = True
+    try:
+        async with async_engine.connect() as connection:
+            await connection.execute(text("SELECT 1"))
+    except SQLAlchemyError as e:
+        log(log.ERROR, "Database is not available - %s", e)
+        is_alive = False
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+
+    return s.DBHealth(
+        is_alive=is_alive,
+        sync_pool=get_pool_stats(get_engine().pool),
+        async_pool=get_pool_stats(async_engine.pool),
+        connection_hold={
+            label: s.DBConnectionHold(
+                count=stats.count,
+                seconds_total=stats.total_seconds,
+                seconds_max=stats.max_seconds,
+            )
+            for label, stats in list(connection_hold_stats.items())
+        },
+    )
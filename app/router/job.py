@@ -3,6 +3,7 @@ from typing import Annotated
 
 from fastapi import Depends, APIRouter, status, HTTPException, Query
 from sqlalchemy import select, or_, and_
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import SQLAlchemyError
 from app.controller.notification import (
@@ -13,8 +14,9 @@ from app.controller.notification import (
 from app.controller.attachment import AttachmentController
 
 from app.dependency import (
+    get_current_principal,
     get_current_user,
-    get_user,
+    get_user_async,
     get_job_by_uuid,
     get_payplus_verified_user,
 )
@@ -22,10 +24,17 @@ from app.exceptions import ValueDownGradeForbidden
 import app.model as m
 import app.schema as s
 from app.logger import log
-from app.database import get_db
+from app.database import get_db, get_async_db
 from app.utility import time_measurement
 from app.utility.get_pending_jobs_query import get_pending_jobs_query_for_user
-from app.controller import PushHandler, job_created_notify
+from app.utility.load_options import job_load_options, search_job_load_options
+from app.controller import (
+    PushHandler,
+    job_created_notify,
+    paginate_by_cursor_async,
+    filter_jobs_by_search_query,
+)
+from app.config import get_settings, Settings
 from app.utility.notification import get_notification_payload
 
 
@@ -41,16 +50,23 @@ def get_status_list():
 
 @job_router.get("", status_code=status.HTTP_200_OK, response_model=s.ListJobSearch)
 @time_measurement
-def get_jobs(
+async def get_jobs(
     profession_id: int = None,
     cities: Annotated[list[str] | None, Query()] = None,
     min_price: int = None,
     max_price: int = None,
-    db: Session = Depends(get_db),
-    user: m.User | None = Depends(get_user),
+    db: AsyncSession = Depends(get_async_db),
+    user: m.User | None = Depends(get_user_async),
     q: str | None = Query(default="", strip_whitespace=True),
+    paginated: bool = False,
+    cursor: str | None = None,
+    limit: int | None = Query(default=None, ge=1),
+    settings: Settings = Depends(get_settings),
 ) -> s.ListJobSearch:
-    query = get_pending_jobs_query_for_user(db, user)
+    """Get pending jobs feed, paged by cursor only if `paginated` is set"""
+    query = get_pending_jobs_query_for_user(db, user).options(
+        *search_job_load_options()
+    )
 
     locations = [] if not user else user.locations
     professions = [] if not user else user.professions
@@ -65,19 +81,13 @@ def get_jobs(
                 "getting job by ID - %s",
             )
             return s.ListJobSearch(
-                jobs=db.scalars(query.order_by(m.Job.id.desc())).all(),
+                jobs=(await db.scalars(query.order_by(m.Job.id.desc()))).all(),
                 locations=locations,
                 professions=professions,
             )
         else:
-            query = query.where(
-                or_(
-                    m.Job.name.icontains(f"%{q}%"),
-                    m.Job.description.icontains(f"%{q}%"),
-                    m.Job.city.icontains(f"%{q}%"),
-                    m.Job.regions.any(m.Location.name_en.icontains(f"%{q}%")),
-                )
-            )
+            # ranking by relevance is not compatible with cursor by job id
+            query = filter_jobs_by_search_query(db, query, q, ranked=not paginated)
             log(log.INFO, "Job filtered by [%s] containing", q)
 
     if user is None or any([profession_id, cities, min_price, max_price]):
@@ -147,21 +157,37 @@ def get_jobs(
         else:
             log(log.INFO, "Job returned with no filters")
 
-    jobs: s.ListJobSearch = s.ListJobSearch(
-        jobs=db.scalars(query.order_by(m.Job.id.desc())).all(),
-        locations=locations,
-        professions=professions,
-    )
+    if paginated:
+        page_size = min(limit or settings.JOBS_PAGE_SIZE, settings.JOBS_MAX_PAGE_SIZE)
+        jobs_page, next_cursor = await paginate_by_cursor_async(
+            db, query, m.Job.id, cursor, page_size
+        )
+        jobs: s.ListJobSearch = s.ListJobSearch(
+            jobs=jobs_page,
+            locations=locations,
+            professions=professions,
+            next_cursor=next_cursor,
+        )
+    else:
+        jobs: s.ListJobSearch = s.ListJobSearch(
+            jobs=(await db.scalars(query.order_by(m.Job.id.desc()))).all(),
+            locations=locations,
+            professions=professions,
+        )
     log(log.INFO, "Job [%s] at all got", len(jobs.jobs))
     return jobs
 
 
 @job_router.get("/{job_uuid}", status_code=status.HTTP_200_OK, response_model=s.Job)
-def get_job(
+async def get_job(
     job_uuid: str,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ) -> s.Job:
-    job: m.Job | None = db.scalars(select(m.Job).where(m.Job.uuid == job_uuid)).first()
+    job: m.Job | None = (
+        await db.scalars(
+            select(m.Job).where(m.Job.uuid == job_uuid).options(*job_load_options())
+        )
+    ).first()
     if not job:
         log(log.INFO, "Job wasn`t found [%s]", job_uuid)
         raise HTTPException(
@@ -489,7 +515,7 @@ def delete_job(
 )
 def get_job_payments(
     db: Session = Depends(get_db),
-    current_user: m.User = Depends(get_current_user),
+    principal: s.Principal = Depends(get_current_principal),
     job: m.Job = Depends(get_job_by_uuid),
 ):
     payments: s.PaymentList = s.PaymentList(payments=job.payments)
@@ -504,7 +530,7 @@ def get_job_payments(
 )
 def get_job_commissions(
     db: Session = Depends(get_db),
-    current_user: m.User = Depends(get_current_user),
+    principal: s.Principal = Depends(get_current_principal),
     job: m.Job = Depends(get_job_by_uuid),
 ):
     commissions: s.CommissionList = s.CommissionList(commissions=job.commissions)
@@ -519,7 +545,7 @@ def get_job_commissions(
 )
 def get_job_statuses(
     db: Session = Depends(get_db),
-    current_user: m.User = Depends(get_current_user),
+    principal: s.Principal = Depends(get_current_principal),
     job: m.Job = Depends(get_job_by_uuid),
 ):
     statuses: s.JobStatusList = s.JobStatusList(statuses=job.statuses)
@@ -1,20 +1,29 @@
-from fastapi import Depends, APIRouter, status
+from fastapi import Depends, APIRouter, Header, status
 from sqlalchemy import select
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 import app.model as m
 import app.schema as s
 
 from app.logger import log
-from app.database import get_db
+from app.database import get_async_db
+from app.controller import cached_json_response_async, serialize, LOCATIONS_CACHE_KEY
 
 location_router = APIRouter(prefix="/locations", tags=["Location"])
 
 
 @location_router.get("", status_code=status.HTTP_200_OK, response_model=s.LocationList)
-def get_locations(db: Session = Depends(get_db)):
-    locations: list[m.Location] = db.scalars(
-        select(m.Location).order_by(m.Location.id)
-    ).all()
-    log(log.INFO, "Locations list (%s) returned", len(locations))
-    return s.LocationList(locations=locations)
+async def get_locations(
+    db: AsyncSession = Depends(get_async_db),
+    if_none_match: str | None = Header(default=None),
+):
+    async def load_locations() -> bytes:
+        locations: list[m.Location] = (
+            await db.scalars(select(m.Location).order_by(m.Location.id))
+        ).all()
+        log(log.INFO, "Locations list (%s) loaded", len(locations))
+        return serialize(s.LocationList(locations=locations))
+
+    return await cached_json_response_async(
+        LOCATIONS_CACHE_KEY, load_locations, if_none_match
+    )
@@ -1,12 +1,18 @@
-from fastapi import Depends, APIRouter, status
-from sqlalchemy import select
+from fastapi import Depends, APIRouter, Query, status
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from app.dependency import get_current_user
+from app.dependency import get_current_principal, get_current_principal_async
 import app.model as m
 import app.schema as s
+from app.config import get_settings, Settings
+from app.controller import (
+    create_notifications_schemas_async,
+    paginate_by_cursor_async,
+)
 from app.logger import log
-from app.database import get_db
+from app.database import get_db, get_async_db
 
 
 notification_router = APIRouter(prefix="/notifications", tags=["Notifications"])
@@ -15,17 +21,74 @@ notification_router = APIRouter(prefix="/notifications", tags=["Notifications"])
 @notification_router.get(
     "", status_code=status.HTTP_200_OK, response_model=s.NotificationList
 )
-def get_notifications(
-    db: Session = Depends(get_db), user: m.User = Depends(get_current_user)
+async def get_notifications(
+    paginated: bool = False,
+    cursor: str | None = None,
+    limit: int | None = Query(default=None, ge=1),
+    db: AsyncSession = Depends(get_async_db),
+    principal: s.Principal = Depends(get_current_principal_async),
+    settings: Settings = Depends(get_settings),
 ):
-    notifications: list[m.Notification] = db.scalars(
-        select(m.Notification)
-        .filter(m.Notification.user_id == user.id)
-        .order_by(m.Notification.id.desc())
-    ).all()
+    """Get user notifications, paged by cursor only if `paginated` is set"""
+    query = select(m.Notification).filter(m.Notification.user_id == principal.id)
+
+    next_cursor = None
+    if paginated:
+        page_size = min(
+            limit or settings.NOTIFICATIONS_PAGE_SIZE,
+            settings.NOTIFICATIONS_MAX_PAGE_SIZE,
+        )
+        notifications, next_cursor = await paginate_by_cursor_async(
+            db, query, m.Notification.id, cursor, page_size
+        )
+    else:
+        notifications: list[m.Notification] = (
+            await db.scalars(query.order_by(m.Notification.id.desc()))
+        ).all()
 
     log(log.INFO, "Notifications list (%s) returned", len(notifications))
 
     return s.NotificationList(
-        items=[notification.create_schema(db) for notification in notifications]
+        items=await create_notifications_schemas_async(notifications, db),
+        next_cursor=next_cursor,
+    )
+
+
+@notification_router.get(
+    "/unread-count",
+    status_code=status.HTTP_200_OK,
+    response_model=s.NotificationsUnreadCount,
+)
+def get_unread_notifications_count(
+    db: Session = Depends(get_db),
+    principal: s.Principal = Depends(get_current_principal),
+):
+    count: int = db.scalar(
+        select(func.count(m.Notification.id)).where(
+            m.Notification.user_id == principal.id, ~m.Notification.is_read
+        )
     )
+    log(log.INFO, "User [%d] has [%d] unread notifications", principal.id, count)
+    return s.NotificationsUnreadCount(count=count)
+
+
+@notification_router.patch(
+    "/read",
+    status_code=status.HTTP_200_OK,
+    response_model=s.NotificationsUnreadCount,
+)
+def mark_notifications_read(
+    data: s.NotificationsRead,
+    db: Session = Depends(get_db),
+    principal: s.Principal = Depends(get_current_principal),
+):
+    query = update(m.Notification).where(
+        m.Notification.user_id == principal.id, ~m.Notification.is_read
+    )
+    if data.uuids is not None:
+        query = query.where(m.Notification.uuid.in_(data.uuids))
+    result = db.execute(query.values(is_read=True))
+    db.commit()
+    log(log.INFO, "[%d] notifications marked read", result.rowcount)
+
+    return get_unread_notifications_count(db, principal)
@@ -1,18 +1,21 @@
-from datetime import datetime
 import json
 
 import httpx
 from fastapi import Depends, APIRouter, status, HTTPException, Request
-from sqlalchemy.orm import Session
-from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.dependency import get_current_user, get_job_by_uuid
 import app.model as m
 import app.schema as s
 from app.logger import log
-from app.database import get_db
+from app.database import get_async_db
 from app.config import get_settings, Settings
-from app.utility.platform_payment_utils import pay_plus_headers
+from app.controller.payplus_client import get_payplus_client
+from app.controller.payplus_webhook import (
+    store_webhook_event,
+    schedule_webhook_event,
+    webhook_dedupe_key,
+)
 
 payment_router = APIRouter(prefix="/payment", tags=["Payment"])
 
@@ -38,10 +41,9 @@ def get_url(
         ),
     )
     try:
-        response = httpx.post(
-            f"{settings.PAY_PLUS_API_URL}/PaymentPages/generateLink",
-            headers=pay_plus_headers(settings),
-            json=request_data.dict(),
+        # link generation has no side effects, safe to retry
+        response = get_payplus_client().post(
+            "/PaymentPages/generateLink", json=request_data.dict(), idempotent=True
         )
     except httpx.RequestError as e:
         log(
@@ -65,43 +67,31 @@ def get_url(
 @payment_router.post("/webhook", status_code=status.HTTP_200_OK)
 async def pay_platform_commission(
     request: Request,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
+    """Store webhook and acknowledge it, it is applied by celery worker"""
+    body = await request.body()
     try:
-        request_data = await request.json()
-        log(log.INFO, "Webhook data:\n %s", request_data)
+        request_data = json.loads(body)
     except json.JSONDecodeError as e:
         log(log.ERROR, "Bad request data:\n%s", e)
         raise HTTPException(
             status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
             detail="Not valid data",
         )
-    if request_data.get("transaction_type") == "Charge":
-        log(log.INFO, "transaction_type is  Charge")
-        transaction = request_data["transaction"]
-        status_code = transaction.get("status_code")
-        log(log.INFO, "Status code [%s]", status_code)
-        platform_payment_uuid: str = json.loads(transaction["more_info_1"])[
-            "platform_payment_uuid"
-        ]
-        platform_payment: m.PlatformPayment = db.scalar(
-            select(m.PlatformPayment).where(
-                m.PlatformPayment.uuid == platform_payment_uuid
-            )
+    if not isinstance(request_data, dict):
+        log(log.ERROR, "Bad request data:\n%s", request_data)
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Not valid data",
         )
-        if not platform_payment:
-            log(log.INFO, "Platform Payment [%s] was not found", platform_payment_uuid)
-            raise HTTPException(
-                status_code=status.HTTP_409_CONFLICT,
-                detail="Platform payment was not found",
-            )
-        platform_payment.transaction_number = transaction["number"]
-        platform_payment.status = s.enums.PlatformPaymentStatus.PAID
-        platform_payment.paid_at = datetime.fromisoformat(transaction["date"])
+    log(log.DEBUG, "Webhook data:\n %s", request_data)
 
-        db.commit()
-        log(
-            log.INFO,
-            "Platform Payment details has been successfully updated - [%s]",
-            platform_payment.uuid,
-        )
+    event_id = await store_webhook_event(db, request_data, body)
+    await db.commit()
+    if not event_id:
+        dedupe_key = webhook_dedupe_key(request_data, body)
+        log(log.INFO, "Webhook [%s] already received", dedupe_key)
+        return
+    schedule_webhook_event(event_id)
+    log(log.INFO, "Webhook event [%s] stored", event_id)
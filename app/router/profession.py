@@ -1,12 +1,13 @@
-from fastapi import Depends, APIRouter, status
+from fastapi import Depends, APIRouter, Header, status
 from sqlalchemy import select
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 import app.model as m
 import app.schema as s
 
 from app.logger import log
-from app.database import get_db
+from app.database import get_async_db
+from app.controller import cached_json_response_async, serialize, PROFESSIONS_CACHE_KEY
 
 profession_router = APIRouter(prefix="/professions", tags=["Jobs"])
 
@@ -14,11 +15,21 @@ profession_router = APIRouter(prefix="/professions", tags=["Jobs"])
 @profession_router.get(
     "", status_code=status.HTTP_200_OK, response_model=s.ProfessionList
 )
-def get_professions(db: Session = Depends(get_db)):
-    professions: list[m.Profession] = db.scalars(
-        select(m.Profession)
-        .where(m.Profession.is_deleted == False)  # noqa E712
-        .order_by(m.Profession.id)
-    ).all()
-    log(log.INFO, "Professions list (%s) returned", len(professions))
-    return s.ProfessionList(professions=professions)
+async def get_professions(
+    db: AsyncSession = Depends(get_async_db),
+    if_none_match: str | None = Header(default=None),
+):
+    async def load_professions() -> bytes:
+        professions: list[m.Profession] = (
+            await db.scalars(
+                select(m.Profession)
+                .where(m.Profession.is_deleted == False)  # noqa E712
+                .order_by(m.Profession.id)
+            )
+        ).all()
+        log(log.INFO, "Professions list (%s) loaded", len(professions))
+        return serialize(s.ProfessionList(professions=professions))
+
+    return await cached_json_response_async(
+        PROFESSIONS_CACHE_KEY, load_professions, if_none_match
+    )
@@ -8,7 +8,7 @@ import app.schema as s
 from app.logger import log
 from app.database import get_db
 from app.controller import create_rate_controller
-from app.dependency import get_current_user
+from app.dependency import get_current_principal
 
 
 rate_router = APIRouter(prefix="/rates", tags=["Rate"])
@@ -35,7 +35,7 @@ def get_rate(
 def create_rate(
     rate_data: s.BaseRate,
     db: Session = Depends(get_db),
-    current_user: m.User = Depends(get_current_user),
+    principal: s.Principal = Depends(get_current_principal),
 ):
     rate = create_rate_controller(rate_data, db)
     return rate
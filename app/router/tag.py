@@ -1,4 +1,4 @@
-from fastapi import Depends, APIRouter, status, HTTPException, Query
+from fastapi import Depends, APIRouter, status, HTTPException, Header, Query
 from sqlalchemy import func, select
 from sqlalchemy.orm import Session
 
@@ -7,6 +7,7 @@ import app.schema as s
 from app.database import get_db
 from app.config import Settings, get_settings
 from app.dependency import get_current_user
+from app.controller import cached_json_response, serialize, POPULAR_TAGS_CACHE_KEY
 from app.logger import log
 
 tag_router = APIRouter(prefix="/tags", tags=["Tags"])
@@ -48,15 +49,21 @@ def search_tags(
 def get_popular_tags(
     db: Session = Depends(get_db),
     settings: Settings = Depends(get_settings),
+    if_none_match: str | None = Header(default=None),
 ):
-    tags = db.scalars(
-        select(m.Tag, func.count(m.Review.tag_id))
-        .join(m.Review)
-        .group_by(m.Tag.id)
-        .order_by(func.count(m.Review.tag_id).desc())
-        .limit(settings.POPULAR_TAGS_LIMIT)
-    ).all()
-    return tags
+    def load_popular_tags() -> bytes:
+        tags = db.scalars(
+            select(m.Tag, func.count(m.Review.tag_id))
+            .join(m.Review)
+            .group_by(m.Tag.id)
+            .order_by(func.count(m.Review.tag_id).desc())
+            .limit(settings.POPULAR_TAGS_LIMIT)
+        ).all()
+        return serialize([s.TagOut.from_orm(tag) for tag in tags])
+
+    return cached_json_response(
+        POPULAR_TAGS_CACHE_KEY, load_popular_tags, if_none_match
+    )
 
 
 @tag_router.get("/", status_code=status.HTTP_200_OK, response_model=list[s.TagOut])
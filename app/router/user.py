@@ -1,25 +1,28 @@
 import datetime
 import base64
-import io
 
 from fastapi import HTTPException, Depends, APIRouter, status, Query
 from sqlalchemy import select, or_, and_, desc
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import SQLAlchemyError
-from PIL import Image
 
 import app.model as m
 import app.schema as s
 from app.logger import log
-from app.controller import AttachmentController
+from app.controller import AttachmentController, ImageController, ImageError
+from app.controller.storage import StorageBackend
 from app.config import get_settings, Settings
-from app.dependency import get_current_user, get_google_storage_client
-from app.database import get_db
+from app.dependency import get_current_principal, get_current_user, get_storage
+from app.database import get_db, release_connection
+from app.utility import generate_uuid
+from app.utility.load_options import job_load_options
 from app.hash_utils import hash_verify
 from app.controller import (
     manage_tab_controller,
     create_payplus_token,
     delete_user_view,
+    paginate_by_cursor,
+    payments_tab_query,
 )
 
 
@@ -38,9 +41,44 @@ def patch_user(
     data: s.UserUpdateIn,
     db: Session = Depends(get_db),
     current_user: m.User = Depends(get_current_user),
-    settings: Settings = Depends(get_settings),
-    google_storage_client=Depends(get_google_storage_client),
+    storage: StorageBackend = Depends(get_storage),
 ):
+    if data.picture:
+        if not AttachmentController.is_valid_image_filename(data.picture_filename):
+            log(log.ERROR, "Image filename is bad - %", data.picture_filename)
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="Please,provide valid image",
+            )
+        decoded_picture = base64.b64decode(data.picture)
+        try:
+            ImageController.verify_image(decoded_picture)
+            picture = ImageController.make_picture(decoded_picture)
+        except ImageError as e:
+            log(log.ERROR, "Image of user [%s] is bad - %s", current_user.id, e)
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="Please,provide valid image",
+            )
+
+        # original is stored as is for resized variants made by celery worker,
+        # picture is its JPEG copy for clients not aware of variants
+        picture_path = (
+            f"profile/{current_user.uuid}/{generate_uuid()}/{data.picture_filename}"
+        )
+        # upload runs before any change, connection is not held meanwhile
+        release_connection(db)
+        AttachmentController.upload_user_profile_picture(
+            file=decoded_picture,
+            destination_filename=picture_path,
+            storage=storage,
+        )
+        image_url = AttachmentController.upload_user_profile_picture(
+            file=picture,
+            destination_filename=ImageController.picture_path(picture_path),
+            storage=storage,
+        )
+
     if data.first_name:
         current_user.username = data.username
         log(
@@ -70,31 +108,12 @@ def patch_user(
         current_user.email = data.email
         log(log.INFO, "User [%s] email updated - [%s]", current_user.id, data.email)
     if data.picture:
-        if not AttachmentController.is_valid_image_filename(data.picture_filename):
-            log(log.ERROR, "Image filename is bad - %", data.picture_filename)
-            raise HTTPException(
-                status_code=status.HTTP_409_CONFLICT,
-                detail="Please,provide valid image",
-            )
-        decoded_picture = base64.b64decode(data.picture)
-        image = Image.open(io.BytesIO(decoded_picture))
-        image = image.convert("RGB")
-        compressed_image_bytes_io = io.BytesIO()
-        image.save(
-            compressed_image_bytes_io,
-            format="JPEG",
-            optimize=True,
-            quality=50,
-        )
-
-        image_url = AttachmentController.upload_user_profile_picture(
-            filename=f"{data.picture_filename}",
-            file=compressed_image_bytes_io.getvalue(),
-            destination_filename=f"profile/{current_user.uuid}/{data.picture_filename}",
-            google_storage_client=google_storage_client,
-            settings=settings,
-        )
+        replaced_pictures = [
+            current_user.picture,
+            *(current_user.picture_variants or {}).values(),
+        ]
         current_user.picture = image_url
+        current_user.picture_variants = None
         log(log.INFO, "User [%s] picture updated", current_user.id)
 
     if data.phone:
@@ -158,10 +177,18 @@ def patch_user(
         db.commit()
     except SQLAlchemyError as e:
         log(log.INFO, "Error while updating user [%s] - %s", current_user.id, e)
+        if data.picture:
+            ImageController.delete_images(
+                [storage.public_url(picture_path), image_url], storage
+            )
         raise HTTPException(
             status_code=status.HTTP_409_CONFLICT, detail="Error updating user"
         )
 
+    if data.picture:
+        ImageController.delete_images(replaced_pictures, storage)
+        ImageController.schedule_user_picture_variants(current_user, picture_path)
+
     log(log.INFO, "User [%s] updated successfully", current_user.id)
     return current_user
 
@@ -259,48 +286,11 @@ def change_password(
 )
 def get_user_payments_tab(
     db: Session = Depends(get_db),
-    current_user: m.User = Depends(get_current_user),
-    settings: Settings = Depends(get_settings),
+    principal: s.Principal = Depends(get_current_principal),
 ):
     # TODO: check for payment currency
-    total_earnings: float = sum(
-        db.scalars(
-            select(m.Job.payment).where(
-                and_(
-                    m.Job.worker_id == current_user.id,
-                    m.Job.payment_status == s.enums.PaymentStatus.PAID,
-                )
-            )
-        ).all()
-    )
-    unpaid_payments, unpaid_commissions = 0, 0
-    approve_payments, approve_commissions = 0, 0
-    for job in current_user.jobs_to_do:
-        if job.payment_status == s.enums.PaymentStatus.UNPAID:
-            unpaid_payments += job.payment
-        elif job.payment_status == s.enums.PaymentStatus.REQUESTED:
-            approve_payments += job.payment
-        if job.commission_status == s.enums.CommissionStatus.REQUESTED:
-            approve_commissions += job.commission
-        elif job.commission_status == s.enums.CommissionStatus.UNPAID:
-            unpaid_commissions += job.commission
-
-    send_payments, send_commissions = 0, 0
-    for job in current_user.jobs_owned:
-        if job.payment_status == s.enums.PaymentStatus.REQUESTED:
-            send_payments += job.payment
-        if job.commission_status == s.enums.CommissionStatus.REQUESTED:
-            send_commissions += job.commission
-
-    return s.PaymentTab(
-        total_earnings=total_earnings,
-        unpaid_commissions=unpaid_commissions,
-        unpaid_payments=unpaid_payments,
-        approve_commissions=approve_commissions,
-        approve_payments=approve_payments,
-        send_commissions=send_commissions,
-        send_payments=send_payments,
-    )
+    totals = db.execute(payments_tab_query(principal.id)).one()
+    return s.PaymentTab(**totals._mapping)
 
 
 @user_router.get(
@@ -311,9 +301,14 @@ def get_user_payments_tab(
 def get_user_payments(
     tab_type: s.PaymentsTab,
     additional_info_tab: s.enums.AdditionalInfoTab,
+    paginated: bool = False,
+    cursor: str | None = None,
+    limit: int | None = Query(default=None, ge=1),
     db: Session = Depends(get_db),
-    current_user: m.User = Depends(get_current_user),
+    principal: s.Principal = Depends(get_current_principal),
+    settings: Settings = Depends(get_settings),
 ):
+    """Jobs of payments tab, paged by cursor only if `paginated` is set"""
     if tab_type == s.enums.PaymentsTab.PAYMENT:
         status_field = "payment_status"
     elif tab_type == s.enums.PaymentsTab.COMMISSION:
@@ -322,7 +317,7 @@ def get_user_payments(
     if additional_info_tab == s.enums.AdditionalInfoTab.UNPAID:
         query = select(m.Job).where(
             and_(
-                m.Job.worker_id == current_user.id,
+                m.Job.worker_id == principal.id,
                 getattr(m.Job, status_field) == s.enums.PaymentStatus.UNPAID,
             )
         )
@@ -330,7 +325,7 @@ def get_user_payments(
     elif additional_info_tab == s.enums.AdditionalInfoTab.APPROVE:
         query = select(m.Job).where(
             and_(
-                m.Job.worker_id == current_user.id,
+                m.Job.worker_id == principal.id,
                 getattr(m.Job, status_field) == s.enums.PaymentStatus.REQUESTED,
             )
         )
@@ -338,12 +333,19 @@ def get_user_payments(
     elif additional_info_tab == s.enums.AdditionalInfoTab.SEND:
         query = select(m.Job).where(
             and_(
-                m.Job.owner_id == current_user.id,
+                m.Job.owner_id == principal.id,
                 getattr(m.Job, status_field) == s.enums.PaymentStatus.REQUESTED,
             )
         )
 
-    data: list[m.Job] = db.scalars(query).all()
+    next_cursor = None
+    if paginated:
+        page_size = min(
+            limit or settings.PAYMENTS_PAGE_SIZE, settings.PAYMENTS_MAX_PAGE_SIZE
+        )
+        data, next_cursor = paginate_by_cursor(db, query, m.Job.id, cursor, page_size)
+    else:
+        data: list[m.Job] = db.scalars(query.order_by(m.Job.id.desc())).all()
     return s.PaymentTabOutList(
         data=[
             s.PaymentTabData(
@@ -354,7 +356,8 @@ def get_user_payments(
                 status=getattr(job, status_field),
             )
             for job in data
-        ]
+        ],
+        next_cursor=next_cursor,
     )
 
 
@@ -427,7 +430,9 @@ def get_user_jobs(
         query = query.where(m.Job.created_at >= start_date)
     if end_date:
         query = query.where(m.Job.created_at <= end_date)
-    jobs: list[m.Job] = db.scalars(query.order_by(m.Job.created_at.desc())).all()
+    jobs: list[m.Job] = db.scalars(
+        query.options(*job_load_options()).order_by(m.Job.created_at.desc())
+    ).all()
     log(
         log.INFO,
         "User [%s] with id (%s) got [%s] jobs total",
@@ -464,7 +469,9 @@ def get_user_postings(
     """Get list of jobs where current user is a owner"""
     query = select(m.Job).where(m.Job.owner_id == current_user.id)
 
-    jobs: list[m.Job] = db.scalars(query.order_by(m.Job.created_at.desc())).all()
+    jobs: list[m.Job] = db.scalars(
+        query.options(*job_load_options()).order_by(m.Job.created_at.desc())
+    ).all()
     log(
         log.INFO,
         "User [%s] with id (%s) have [%s] jobs owning",
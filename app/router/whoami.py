@@ -2,7 +2,7 @@ from fastapi import APIRouter, status, Depends
 
 import app.model as m
 import app.schema as s
-from app.dependency import get_current_user
+from app.dependency import get_current_user_async
 from app.logger import log
 from app.config import get_settings, Settings
 
@@ -13,8 +13,8 @@ settings: Settings = get_settings()
 
 
 @whoami_router.get("/user", status_code=status.HTTP_200_OK, response_model=s.WhoAmIOut)
-def whoami(
-    current_user: m.User = Depends(get_current_user),
+async def whoami(
+    current_user: m.User = Depends(get_current_user_async),
     app_version: str | None = None,
 ):
     if app_version:
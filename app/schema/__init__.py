@@ -17,7 +17,7 @@ from .user import (
     UserProfile,
     UserExists,
 )
-from .token import Token, TokenData, PreValidate
+from .token import Token, TokenData, Principal, PreValidate
 from .profession import BaseProfession, Profession, ProfessionList
 from .location import BaseLocation, Location, LocationList
 from .job import (
@@ -65,6 +65,8 @@ from .notification import (
     NotificationJob,
     NotificationApplication,
     NotificationList,
+    NotificationsRead,
+    NotificationsUnreadCount,
 )
 
 from .platform_payment import (
@@ -77,10 +79,10 @@ from .card import CardIn
 from .payplus import PayplusCardIn, PayplusCustomerIn, PayPlusCharge
 from .platform_commission import PlatformCommission
 
-from .option import PriceOption
+from .option import PriceOption, PriceBucket
 
 from .attachment import AttachmentIn, AttachmentOut
-from .file import FileOut
+from .file import FileOut, FileUploadIn, FileUploadOut, ImageVariants
 from .payments import (
     PaymentTab,
     PaymentTabData,
@@ -89,3 +91,4 @@ from .payments import (
 from .review import ReviewIn, ReviewOut, ReviewsOut
 from .tag import TagIn, TagOut, ListTagOut
 from .app_review import AppReviewIn, AppReviewOut
+from .health import DBPoolStats, DBConnectionHold, DBHealth
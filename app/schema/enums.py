@@ -77,6 +77,13 @@ class PlatformPaymentStatus(enum.Enum):
     PROGRESS = "PROGRESS"
 
 
+class WebhookEventStatus(enum.Enum):
+    RECEIVED = "RECEIVED"
+    PROCESSED = "PROCESSED"
+    IGNORED = "IGNORED"
+    FAILED = "FAILED"
+
+
 class AttachmentType(enum.Enum):
     IMAGE = "image"
     DOCUMENT = "document"
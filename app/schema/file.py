@@ -1,7 +1,7 @@
 from datetime import datetime
 import pytz
 
-from pydantic import BaseModel, validator
+from pydantic import BaseModel, Field, validator
 
 from .enums import AttachmentType
 
@@ -10,12 +10,21 @@ class BaseFile(BaseModel):
     filename: str
 
 
+class ImageVariants(BaseModel):
+    thumbnail: str
+    medium: str
+    full: str
+
+
 class FileOut(BaseFile):
     uuid: str
     original_filename: str
     extension: str
     url: str
     type: AttachmentType
+    is_uploaded: bool = True
+    # set for images when resized copies are ready
+    variants: ImageVariants | None
     created_at: datetime | None
 
     @validator("created_at")
@@ -28,3 +37,26 @@ class FileOut(BaseFile):
     class Config:
         orm_mode = True
         use_enum_values = True
+
+
+class FileUploadIn(BaseModel):
+    filename: str = Field(min_length=1, max_length=255)
+    content_type: str
+    size: int = Field(gt=0)
+    # hex SHA-256 of file content, to skip upload of already uploaded content
+    content_hash: str | None = Field(default=None, regex="^[0-9a-f]{64}$")
+
+    @validator("filename")
+    def filename_without_path(cls, value: str) -> str:
+        # filename is a part of storage path
+        if "/" in value or "\\" in value or ".." in value or value == ".":
+            raise ValueError("Filename must not contain path")
+        return value
+
+
+class FileUploadOut(BaseModel):
+    file: FileOut
+    # client uploads file content by PUT request with given headers,
+    # not set if the same content is already uploaded
+    upload_url: str | None
+    headers: dict[str, str]
@@ -0,0 +1,29 @@
+from pydantic import BaseModel
+
+
+class DBPoolStats(BaseModel):
+    pool_class: str
+    # not set for pools without limits, like NullPool of PgBouncer mode
+    size: int | None
+    checked_in: int | None
+    checked_out: int | None
+    overflow: int | None
+    # time spent by checkouts to get a connection, including connecting
+    checkouts: int | None
+    wait_seconds_total: float | None
+    wait_seconds_max: float | None
+
+
+class DBConnectionHold(BaseModel):
+    # how long connections were kept out of pool, from checkout to checkin
+    count: int
+    seconds_total: float
+    seconds_max: float
+
+
+class DBHealth(BaseModel):
+    is_alive: bool
+    sync_pool: DBPoolStats
+    async_pool: DBPoolStats
+    # by endpoint, "background" for celery tasks and startup
+    connection_hold: dict[str, DBConnectionHold]
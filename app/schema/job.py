@@ -180,6 +180,7 @@ class ListJobSearch(BaseModel):
     jobs: list[SearchJob]
     professions: list[Profession]
     locations: list[Location]
+    next_cursor: str | None  # set only for paginated requests
 
 
 class ListJob(BaseModel):
@@ -13,6 +13,7 @@ class NotificationBase(BaseModel):
     id: int
     user_id: int
     uuid: str
+    is_read: bool
     created_at: datetime | str
 
     @validator("created_at")
@@ -39,3 +40,13 @@ class NotificationApplication(NotificationBase):
 
 class NotificationList(BaseModel):
     items: list[NotificationJob | NotificationApplication]
+    next_cursor: str | None  # set only for paginated requests
+
+
+class NotificationsRead(BaseModel):
+    # all user notifications are marked if not set
+    uuids: list[str] | None
+
+
+class NotificationsUnreadCount(BaseModel):
+    count: int
@@ -1,6 +1,13 @@
 from pydantic import BaseModel
 
 
+class PriceBucket(BaseModel):
+    price_from: int
+    price_to: int  # exclusive
+    jobs_count: int
+
+
 class PriceOption(BaseModel):
     max_price: float | None
     min_price: float | None
+    buckets: list[PriceBucket] | None  # set only if histogram requested
@@ -26,3 +26,4 @@ class PaymentTabData(BaseModel):
 
 class PaymentTabOutList(BaseModel):
     data: list[PaymentTabData]
+    next_cursor: str | None  # set only for paginated requests
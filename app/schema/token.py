@@ -14,6 +14,16 @@ class TokenData(BaseModel):
     user_id: str = None
 
 
+class Principal(BaseModel):
+    """Authenticated user flags checked by dependencies, cached between requests"""
+
+    id: int
+    is_deleted: bool
+    is_verified: bool
+    has_payment_method: bool
+    is_payment_method_invalid: bool
+
+
 class PreValidate(BaseModel):
     isExist: bool
     message: str
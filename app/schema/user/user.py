@@ -8,6 +8,7 @@ from app.schema.location import Location
 from app.config import get_settings
 from app.schema.review import ReviewsOut
 from app.schema.attachment import AttachmentOut
+from app.schema.file import ImageVariants
 
 settings = get_settings()
 
@@ -98,6 +99,7 @@ class UserCollaboration(BaseModel):
     first_name: str
     last_name: str
     picture: str = settings.DEFAULT_AVATAR_PROFILE_URL
+    picture_variants: ImageVariants | None
 
     class Config:
         orm_mode = True
@@ -132,6 +134,7 @@ class User(BaseUser):
     is_verified: bool
     professions: list[Profession]
     picture: str = settings.DEFAULT_AVATAR_PROFILE_URL
+    picture_variants: ImageVariants | None
     locations: list[Location]
     is_auth_by_google: bool
     card_name: str | None
@@ -163,6 +166,7 @@ class UserPicture(BaseUser):
     id: int
     uuid: str
     picture: str = settings.DEFAULT_AVATAR_PROFILE_URL
+    picture_variants: ImageVariants | None
 
     class Config:
         orm_mode = True
@@ -0,0 +1,67 @@
+from functools import lru_cache
+
+from sqlalchemy import orm
+from sqlalchemy.orm.interfaces import ORMOption
+
+from app import model as m
+
+
+# Loader options bundles, one per response schema.
+# Each bundle loads everything the schema serializes in a fixed number of queries
+
+
+@lru_cache
+def user_load_options() -> tuple[ORMOption, ...]:
+    """Relationships used by s.User"""
+    orm.configure_mappers()
+    return (
+        orm.selectinload(m.User.professions),
+        orm.selectinload(m.User.locations),
+        orm.selectinload(m.User.notification_professions),
+        orm.selectinload(m.User.notification_locations),
+    )
+
+
+@lru_cache
+def search_job_load_options() -> tuple[ORMOption, ...]:
+    """Relationships used by s.SearchJob"""
+    return (
+        orm.selectinload(m.Job.profession),
+        orm.selectinload(m.Job.regions),
+        orm.joinedload(m.Job.owner),
+    )
+
+
+@lru_cache
+def job_load_options() -> tuple[ORMOption, ...]:
+    """Relationships used by s.Job"""
+    user_options = user_load_options()
+    return (
+        orm.selectinload(m.Job.profession),
+        orm.selectinload(m.Job.regions),
+        orm.selectinload(m.Job.owner).options(*user_options),
+        orm.selectinload(m.Job.worker).options(*user_options),
+        orm.selectinload(m.Job.applications).options(
+            orm.selectinload(m.Application.owner).options(*user_options),
+            orm.selectinload(m.Application.worker).options(*user_options),
+        ),
+        orm.selectinload(m.Job.platform_commissions)
+        .selectinload(m.PlatformCommission.user)
+        .options(*user_options),
+        orm.selectinload(m.Job.payments),
+        orm.selectinload(m.Job.commissions),
+        orm.selectinload(m.Job.attachments).selectinload(m.Attachment.file),
+        orm.selectinload(m.Job.rates),
+        orm.selectinload(m.Job.reviews),
+    )
+
+
+@lru_cache
+def application_load_options() -> tuple[ORMOption, ...]:
+    """Relationships used by s.ApplicationOut"""
+    user_options = user_load_options()
+    return (
+        orm.selectinload(m.Application.owner).options(*user_options),
+        orm.selectinload(m.Application.worker).options(*user_options),
+        orm.joinedload(m.Application.job),
+    )
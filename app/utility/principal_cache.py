@@ -0,0 +1,73 @@
+import threading
+import time
+from typing import NamedTuple
+
+from app import schema as s
+from app.config import get_settings, Settings
+from app.logger import log
+
+settings: Settings = get_settings()
+
+
+class CachedPrincipal(NamedTuple):
+    principal: s.Principal
+    expires_at: float
+
+
+class PrincipalCache:
+    """Process-local cache of authenticated principals by user id and token signature
+
+    Entries expire after ttl seconds, so changes made by other processes are seen
+    after ttl at most. Writes to the cached flags (user deletion, card token)
+    made by api should call invalidate(). Payment statuses are changed by celery
+    worker (fee collection, webhooks), api processes see them after ttl
+    """
+
+    def __init__(self, ttl: int):
+        self.ttl = ttl
+        # user id -> token signature -> entry, a user may be logged in on devices
+        self._entries: dict[int, dict[str, CachedPrincipal]] = {}
+        self._lock = threading.Lock()
+        # expired entries of rotated tokens are dropped by sweep
+        self._sweep_at = time.monotonic() + ttl
+
+    def get(self, user_id: int, signature: str) -> s.Principal | None:
+        entry = self._entries.get(user_id, {}).get(signature)
+        if entry and entry.expires_at > time.monotonic():
+            return entry.principal
+        return None
+
+    def store(self, signature: str, principal: s.Principal) -> s.Principal:
+        if self.ttl:
+            now = time.monotonic()
+            with self._lock:
+                if now >= self._sweep_at:
+                    self._sweep(now)
+                self._entries.setdefault(principal.id, {})[signature] = CachedPrincipal(
+                    principal, now + self.ttl
+                )
+        return principal
+
+    def _sweep(self, now: float):
+        """drop expired entries, called under lock once per ttl"""
+        for user_id in list(self._entries):
+            entries = {
+                signature: entry
+                for signature, entry in self._entries[user_id].items()
+                if entry.expires_at > now
+            }
+            if entries:
+                self._entries[user_id] = entries
+            else:
+                del self._entries[user_id]
+        self._sweep_at = now + self.ttl
+
+    def invalidate(self, *user_ids: int):
+        """drop entries of given users, all if no users given"""
+        with self._lock:
+            for user_id in user_ids or list(self._entries):
+                self._entries.pop(user_id, None)
+        log(log.DEBUG, "Principal cache of users %s invalidated", user_ids or "all")
+
+
+principal_cache = PrincipalCache(ttl=settings.PRINCIPAL_CACHE_TTL)
@@ -1,3 +1,4 @@
+import inspect
 import sys
 import time
 from functools import wraps
@@ -5,22 +6,36 @@ from functools import wraps
 from app.logger import log
 
 
+def log_time_measurement(func, kwargs: dict, start_time: float, result):
+    total_time = time.perf_counter() - start_time
+    response_size = sys.getsizeof(result.json())
+    log(
+        log.INFO,
+        "Function [%s] %s took {%s} seconds and the json file is {%s} kb long",
+        func.__name__,
+        kwargs,
+        str(total_time)[:5],
+        response_size / 8000,
+    )
+
+
 def time_measurement(func):
+    if inspect.iscoroutinefunction(func):
+
+        @wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            start_time = time.perf_counter()
+            result = await func(*args, **kwargs)
+            log_time_measurement(func, kwargs, start_time, result)
+            return result
+
+        return async_wrapper
+
     @wraps(func)
     def wrapper(*args, **kwargs):
         start_time = time.perf_counter()
         result = func(*args, **kwargs)
-        end_time = time.perf_counter()
-        response_size = sys.getsizeof(result.json())
-        total_time = end_time - start_time
-        log(
-            log.INFO,
-            "Function [%s] %s took {%s} seconds and the json file is {%s} kb long",
-            func.__name__,
-            kwargs,
-            str(total_time)[:5],
-            response_size / 8000,
-        )
+        log_time_measurement(func, kwargs, start_time, result)
         return result
 
     return wrapper
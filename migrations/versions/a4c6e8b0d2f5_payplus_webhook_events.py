@@ -0,0 +1,59 @@
+"""payplus webhook events
+
+Revision ID: a4c6e8b0d2f5
+Revises: f3b5d7e9a2c4
+Create Date: 2026-10-18 20:31:44.512086
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "a4c6e8b0d2f5"
+down_revision = "f3b5d7e9a2c4"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "payplus_webhook_events",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("dedupe_key", sa.String(length=128), nullable=False),
+        sa.Column("transaction_type", sa.String(length=64), nullable=True),
+        sa.Column("payload", sa.JSON(), nullable=False),
+        sa.Column(
+            "status",
+            sa.Enum(
+                "RECEIVED",
+                "PROCESSED",
+                "IGNORED",
+                "FAILED",
+                name="webhookeventstatus",
+            ),
+            nullable=False,
+        ),
+        sa.Column("attempts", sa.Integer(), nullable=False),
+        sa.Column("error", sa.String(length=512), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("processed_at", sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint("id", name=op.f("pk_payplus_webhook_events")),
+        sa.UniqueConstraint(
+            "dedupe_key", name=op.f("uq_payplus_webhook_events_dedupe_key")
+        ),
+    )
+    op.create_index(
+        op.f("ix_payplus_webhook_events_status"),
+        "payplus_webhook_events",
+        ["status"],
+        unique=False,
+    )
+
+
+def downgrade():
+    op.drop_index(
+        op.f("ix_payplus_webhook_events_status"), table_name="payplus_webhook_events"
+    )
+    op.drop_table("payplus_webhook_events")
+    op.execute("DROP TYPE webhookeventstatus")
@@ -0,0 +1,37 @@
+"""notifications is_read
+
+Revision ID: a7c9e1b3d5f2
+Revises: f1a3c5e7b9d2
+Create Date: 2026-10-18 15:31:09.214877
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "a7c9e1b3d5f2"
+down_revision = "f1a3c5e7b9d2"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # existing notifications are read, so badges don't count the whole inbox
+    op.add_column(
+        "notifications",
+        sa.Column("is_read", sa.Boolean(), server_default=sa.true(), nullable=False),
+    )
+    op.alter_column("notifications", "is_read", server_default=sa.false())
+    op.create_index(
+        "ix_notifications_user_id_unread",
+        "notifications",
+        ["user_id"],
+        unique=False,
+        postgresql_where=sa.text("NOT is_read"),
+    )
+
+
+def downgrade():
+    op.drop_index("ix_notifications_user_id_unread", table_name="notifications")
+    op.drop_column("notifications", "is_read")
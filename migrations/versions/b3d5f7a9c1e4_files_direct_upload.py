@@ -0,0 +1,37 @@
+"""files direct upload
+
+Revision ID: b3d5f7a9c1e4
+Revises: a7c9e1b3d5f2
+Create Date: 2026-10-18 16:12:40.337120
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "b3d5f7a9c1e4"
+down_revision = "a7c9e1b3d5f2"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column(
+        "files",
+        sa.Column(
+            "is_uploaded", sa.Boolean(), server_default=sa.true(), nullable=False
+        ),
+    )
+    op.add_column("files", sa.Column("path", sa.String(length=512), nullable=True))
+    op.add_column("files", sa.Column("size", sa.BigInteger(), nullable=True))
+    op.add_column(
+        "files", sa.Column("content_type", sa.String(length=128), nullable=True)
+    )
+
+
+def downgrade():
+    op.drop_column("files", "content_type")
+    op.drop_column("files", "size")
+    op.drop_column("files", "path")
+    op.drop_column("files", "is_uploaded")
@@ -0,0 +1,35 @@
+"""jobs payment status indexes
+
+Revision ID: b7d9f1a3c5e6
+Revises: a4c6e8b0d2f5
+Create Date: 2026-10-18 21:02:37.940612
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "b7d9f1a3c5e6"
+down_revision = "a4c6e8b0d2f5"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index(
+        "ix_jobs_worker_id_payment_status",
+        "jobs",
+        ["worker_id", "payment_status"],
+        unique=False,
+    )
+    op.create_index(
+        "ix_jobs_owner_id_payment_status",
+        "jobs",
+        ["owner_id", "payment_status"],
+        unique=False,
+    )
+
+
+def downgrade():
+    op.drop_index("ix_jobs_owner_id_payment_status", table_name="jobs")
+    op.drop_index("ix_jobs_worker_id_payment_status", table_name="jobs")
@@ -0,0 +1,76 @@
+"""jobs_search_vector
+
+Revision ID: beeac7a2477f
+Revises: 1d72bf335675
+Create Date: 2026-10-18 10:12:41.315204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = "beeac7a2477f"
+down_revision = "1d72bf335675"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column(
+        "jobs", sa.Column("search_vector", postgresql.TSVECTOR(), nullable=True)
+    )
+    op.create_index(
+        "ix_jobs_search_vector",
+        "jobs",
+        ["search_vector"],
+        unique=False,
+        postgresql_using="gin",
+    )
+    # filling search vector for existing jobs
+    # (same document as app.controller.job_search.job_search_vector)
+    op.execute(
+        """
+        UPDATE jobs SET search_vector =
+            setweight(
+                to_tsvector('english', coalesce(jobs.name, ''))
+                || to_tsvector('simple', coalesce(jobs.name, '')),
+                'A'
+            )
+            || setweight(
+                to_tsvector('english', coalesce(jobs.city, '') || ' ' || coalesce(p.names, '') || ' ' || coalesce(r.names, ''))
+                || to_tsvector('simple', coalesce(jobs.city, '') || ' ' || coalesce(p.names, '') || ' ' || coalesce(r.names, '')),
+                'B'
+            )
+            || setweight(
+                to_tsvector('english', coalesce(jobs.description, ''))
+                || to_tsvector('simple', coalesce(jobs.description, '')),
+                'C'
+            )
+        FROM jobs AS j
+        LEFT JOIN (
+            SELECT professions.id,
+                coalesce(professions.name_en, '') || ' '
+                || coalesce(professions.name_hebrew, '') AS names
+            FROM professions
+        ) AS p ON p.id = j.profession_id
+        LEFT JOIN (
+            SELECT jobs_locations.job_id,
+                string_agg(
+                    coalesce(locations.name_en, '') || ' '
+                    || coalesce(locations.name_hebrew, ''),
+                    ' '
+                ) AS names
+            FROM jobs_locations
+            JOIN locations ON locations.id = jobs_locations.location_id
+            GROUP BY jobs_locations.job_id
+        ) AS r ON r.job_id = j.id
+        WHERE j.id = jobs.id
+        """
+    )
+
+
+def downgrade():
+    op.drop_index("ix_jobs_search_vector", table_name="jobs")
+    op.drop_column("jobs", "search_vector")
@@ -0,0 +1,30 @@
+"""files content_hash
+
+Revision ID: c5e7a9b1d3f6
+Revises: b3d5f7a9c1e4
+Create Date: 2026-10-18 16:58:21.604532
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "c5e7a9b1d3f6"
+down_revision = "b3d5f7a9c1e4"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column(
+        "files", sa.Column("content_hash", sa.String(length=64), nullable=True)
+    )
+    op.create_index(
+        op.f("ix_files_content_hash"), "files", ["content_hash"], unique=False
+    )
+
+
+def downgrade():
+    op.drop_index(op.f("ix_files_content_hash"), table_name="files")
+    op.drop_column("files", "content_hash")
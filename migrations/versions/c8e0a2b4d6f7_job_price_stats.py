@@ -0,0 +1,79 @@
+"""job_price_stats
+
+Revision ID: c8e0a2b4d6f7
+Revises: b7d9f1a3c5e6
+Create Date: 2026-10-18 22:14:51.306227
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "c8e0a2b4d6f7"
+down_revision = "b7d9f1a3c5e6"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "job_price_stats",
+        sa.Column("location_id", sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column("profession_id", sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column("bucket", sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column("jobs_count", sa.Integer(), nullable=False),
+        sa.Column("min_price", sa.Integer(), nullable=False),
+        sa.Column("max_price", sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint(
+            "location_id", "profession_id", "bucket", name=op.f("pk_job_price_stats")
+        ),
+    )
+    op.create_index(
+        "ix_jobs_status_payment", "jobs", ["status", "payment"], unique=False
+    )
+    # filling stats for existing jobs with default JOB_PRICE_BUCKET_SIZE (100),
+    # run "invoke update-job-price-stats" for other bucket size
+    # (same as app.controller.job_price_stats.update_job_price_stats)
+    op.execute(
+        """
+        INSERT INTO job_price_stats (
+            location_id,
+            profession_id,
+            bucket,
+            jobs_count,
+            min_price,
+            max_price
+        )
+        SELECT 0, 0, jobs.payment / 100,
+            count(jobs.id), min(jobs.payment), max(jobs.payment)
+        FROM jobs
+        WHERE NOT jobs.is_deleted AND jobs.status = 'PENDING'
+        GROUP BY jobs.payment / 100
+        UNION ALL
+        SELECT 0, jobs.profession_id, jobs.payment / 100,
+            count(jobs.id), min(jobs.payment), max(jobs.payment)
+        FROM jobs
+        WHERE NOT jobs.is_deleted AND jobs.status = 'PENDING'
+            AND jobs.profession_id IS NOT NULL
+        GROUP BY jobs.payment / 100, jobs.profession_id
+        UNION ALL
+        SELECT jobs_locations.location_id, 0, jobs.payment / 100,
+            count(jobs.id), min(jobs.payment), max(jobs.payment)
+        FROM jobs JOIN jobs_locations ON jobs_locations.job_id = jobs.id
+        WHERE NOT jobs.is_deleted AND jobs.status = 'PENDING'
+        GROUP BY jobs.payment / 100, jobs_locations.location_id
+        UNION ALL
+        SELECT jobs_locations.location_id, jobs.profession_id, jobs.payment / 100,
+            count(jobs.id), min(jobs.payment), max(jobs.payment)
+        FROM jobs JOIN jobs_locations ON jobs_locations.job_id = jobs.id
+        WHERE NOT jobs.is_deleted AND jobs.status = 'PENDING'
+            AND jobs.profession_id IS NOT NULL
+        GROUP BY jobs.payment / 100, jobs_locations.location_id, jobs.profession_id
+        """
+    )
+
+
+def downgrade():
+    op.drop_index("ix_jobs_status_payment", table_name="jobs")
+    op.drop_table("job_price_stats")
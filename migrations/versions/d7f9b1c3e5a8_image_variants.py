@@ -0,0 +1,26 @@
+"""image variants
+
+Revision ID: d7f9b1c3e5a8
+Revises: c5e7a9b1d3f6
+Create Date: 2026-10-18 18:12:47.381920
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "d7f9b1c3e5a8"
+down_revision = "c5e7a9b1d3f6"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column("files", sa.Column("variants", sa.JSON(), nullable=True))
+    op.add_column("users", sa.Column("picture_variants", sa.JSON(), nullable=True))
+
+
+def downgrade():
+    op.drop_column("users", "picture_variants")
+    op.drop_column("files", "variants")
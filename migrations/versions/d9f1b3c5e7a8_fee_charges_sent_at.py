@@ -0,0 +1,34 @@
+"""fee charges sent at
+
+Revision ID: d9f1b3c5e7a8
+Revises: c8e0a2b4d6f7
+Create Date: 2026-10-18 23:05:12.518340
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "d9f1b3c5e7a8"
+down_revision = "c8e0a2b4d6f7"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column(
+        "platform_payments",
+        sa.Column("charge_sent_at", sa.DateTime(), nullable=True),
+    )
+    op.add_column(
+        "fee_collections",
+        sa.Column(
+            "unconfirmed_count", sa.Integer(), nullable=False, server_default="0"
+        ),
+    )
+
+
+def downgrade():
+    op.drop_column("fee_collections", "unconfirmed_count")
+    op.drop_column("platform_payments", "charge_sent_at")
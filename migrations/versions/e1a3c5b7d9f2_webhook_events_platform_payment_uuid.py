@@ -0,0 +1,67 @@
+"""webhook events platform payment uuid
+
+Revision ID: e1a3c5b7d9f2
+Revises: d9f1b3c5e7a8
+Create Date: 2026-10-19 10:12:40.318525
+
+"""
+import json
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "e1a3c5b7d9f2"
+down_revision = "d9f1b3c5e7a8"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column(
+        "payplus_webhook_events",
+        sa.Column("platform_payment_uuid", sa.String(length=36), nullable=True),
+    )
+    op.create_index(
+        op.f("ix_payplus_webhook_events_platform_payment_uuid"),
+        "payplus_webhook_events",
+        ["platform_payment_uuid"],
+        unique=False,
+    )
+    # filling uuids of stored charges
+    # (same as app.controller.payplus_webhook.webhook_platform_payment_uuid)
+    events = sa.table(
+        "payplus_webhook_events",
+        sa.column("id", sa.Integer),
+        sa.column("transaction_type", sa.String),
+        sa.column("payload", sa.JSON),
+        sa.column("platform_payment_uuid", sa.String),
+    )
+    connection = op.get_bind()
+    rows = connection.execute(
+        sa.select(events.c.id, events.c.payload).where(
+            events.c.transaction_type == "Charge"
+        )
+    ).all()
+    for event_id, payload in rows:
+        try:
+            more_info = json.loads(payload["transaction"]["more_info_1"] or "{}")
+            uuid = more_info["platform_payment_uuid"]
+        except (KeyError, TypeError, ValueError):
+            continue
+        if not isinstance(uuid, str):
+            continue
+        connection.execute(
+            events.update()
+            .where(events.c.id == event_id)
+            .values(platform_payment_uuid=uuid[:36])
+        )
+
+
+def downgrade():
+    op.drop_index(
+        op.f("ix_payplus_webhook_events_platform_payment_uuid"),
+        table_name="payplus_webhook_events",
+    )
+    op.drop_column("payplus_webhook_events", "platform_payment_uuid")
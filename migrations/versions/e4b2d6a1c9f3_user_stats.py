@@ -0,0 +1,74 @@
+"""user_stats
+
+Revision ID: e4b2d6a1c9f3
+Revises: beeac7a2477f
+Create Date: 2026-10-18 11:40:02.918311
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "e4b2d6a1c9f3"
+down_revision = "beeac7a2477f"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "user_stats",
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("jobs_posted_count", sa.Integer(), nullable=False),
+        sa.Column("jobs_completed_count", sa.Integer(), nullable=False),
+        sa.Column("jobs_canceled_count", sa.Integer(), nullable=False),
+        sa.Column("positive_rates_count", sa.Integer(), nullable=False),
+        sa.Column("negative_rates_count", sa.Integer(), nullable=False),
+        sa.Column("neutral_rates_count", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(
+            ["user_id"], ["users.id"], name=op.f("fk_user_stats_user_id_users")
+        ),
+        sa.PrimaryKeyConstraint("user_id", name=op.f("pk_user_stats")),
+    )
+    op.create_index(op.f("ix_jobs_owner_id"), "jobs", ["owner_id"], unique=False)
+    op.create_index(op.f("ix_jobs_worker_id"), "jobs", ["worker_id"], unique=False)
+    op.create_index(
+        op.f("ix_reviews_evaluates_id"), "reviews", ["evaluates_id"], unique=False
+    )
+    # filling stats for existing users
+    # (same as app.controller.user_stats.users_stats_query)
+    op.execute(
+        """
+        INSERT INTO user_stats (
+            user_id,
+            jobs_posted_count,
+            jobs_completed_count,
+            jobs_canceled_count,
+            positive_rates_count,
+            negative_rates_count,
+            neutral_rates_count
+        )
+        SELECT
+            users.id,
+            (SELECT count(*) FROM jobs WHERE jobs.owner_id = users.id),
+            (SELECT count(*) FROM jobs
+                WHERE jobs.worker_id = users.id AND jobs.status = 'JOB_IS_FINISHED'),
+            (SELECT count(*) FROM jobs
+                WHERE jobs.worker_id = users.id AND jobs.is_deleted),
+            (SELECT count(*) FROM reviews
+                WHERE reviews.evaluates_id = users.id AND reviews.rate = 'POSITIVE'),
+            (SELECT count(*) FROM reviews
+                WHERE reviews.evaluates_id = users.id AND reviews.rate = 'NEGATIVE'),
+            (SELECT count(*) FROM reviews
+                WHERE reviews.evaluates_id = users.id AND reviews.rate = 'NEUTRAL')
+        FROM users
+        """
+    )
+
+
+def downgrade():
+    op.drop_index(op.f("ix_reviews_evaluates_id"), table_name="reviews")
+    op.drop_index(op.f("ix_jobs_worker_id"), table_name="jobs")
+    op.drop_index(op.f("ix_jobs_owner_id"), table_name="jobs")
+    op.drop_table("user_stats")
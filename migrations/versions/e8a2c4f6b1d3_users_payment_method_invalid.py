@@ -0,0 +1,50 @@
+"""users payment method invalid
+
+Revision ID: e8a2c4f6b1d3
+Revises: d7f9b1c3e5a8
+Create Date: 2026-10-18 19:05:21.604417
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "e8a2c4f6b1d3"
+down_revision = "d7f9b1c3e5a8"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column(
+        "users",
+        sa.Column(
+            "is_payment_method_invalid",
+            sa.Boolean(),
+            server_default=sa.false(),
+            nullable=False,
+        ),
+    )
+    op.create_index(
+        op.f("ix_platform_payments_user_id"),
+        "platform_payments",
+        ["user_id"],
+        unique=False,
+    )
+    # filling flag for existing users
+    # (same as app.controller.payment_method.payment_method_invalid)
+    op.execute(
+        """
+        UPDATE users SET is_payment_method_invalid = EXISTS (
+            SELECT 1 FROM platform_payments
+            WHERE platform_payments.user_id = users.id
+                AND platform_payments.status = 'REJECTED'
+        )
+        """
+    )
+
+
+def downgrade():
+    op.drop_index(op.f("ix_platform_payments_user_id"), table_name="platform_payments")
+    op.drop_column("users", "is_payment_method_invalid")
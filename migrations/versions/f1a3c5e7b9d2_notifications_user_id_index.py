@@ -0,0 +1,29 @@
+"""notifications user_id index
+
+Revision ID: f1a3c5e7b9d2
+Revises: e4b2d6a1c9f3
+Create Date: 2026-10-18 15:02:47.531204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "f1a3c5e7b9d2"
+down_revision = "e4b2d6a1c9f3"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index(
+        "ix_notifications_user_id_id",
+        "notifications",
+        ["user_id", sa.text("id DESC")],
+        unique=False,
+    )
+
+
+def downgrade():
+    op.drop_index("ix_notifications_user_id_id", table_name="notifications")
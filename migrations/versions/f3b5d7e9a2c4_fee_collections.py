@@ -0,0 +1,68 @@
+"""fee collections
+
+Revision ID: f3b5d7e9a2c4
+Revises: e8a2c4f6b1d3
+Create Date: 2026-10-18 19:48:10.275163
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "f3b5d7e9a2c4"
+down_revision = "e8a2c4f6b1d3"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "fee_collections",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("uuid", sa.String(length=36), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("finished_at", sa.DateTime(), nullable=True),
+        sa.Column("payments_count", sa.Integer(), nullable=False),
+        sa.Column("paid_count", sa.Integer(), nullable=False),
+        sa.Column("rejected_count", sa.Integer(), nullable=False),
+        sa.Column("failed_count", sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint("id", name=op.f("pk_fee_collections")),
+        sa.UniqueConstraint("uuid", name=op.f("uq_fee_collections_uuid")),
+    )
+    op.add_column(
+        "platform_payments",
+        sa.Column("fee_collection_id", sa.Integer(), nullable=True),
+    )
+    op.add_column(
+        "platform_payments",
+        sa.Column("charge_key", sa.String(length=80), nullable=True),
+    )
+    op.create_index(
+        op.f("ix_platform_payments_fee_collection_id"),
+        "platform_payments",
+        ["fee_collection_id"],
+        unique=False,
+    )
+    op.create_foreign_key(
+        op.f("fk_platform_payments_fee_collection_id_fee_collections"),
+        "platform_payments",
+        "fee_collections",
+        ["fee_collection_id"],
+        ["id"],
+    )
+
+
+def downgrade():
+    op.drop_constraint(
+        op.f("fk_platform_payments_fee_collection_id_fee_collections"),
+        "platform_payments",
+        type_="foreignkey",
+    )
+    op.drop_index(
+        op.f("ix_platform_payments_fee_collection_id"),
+        table_name="platform_payments",
+    )
+    op.drop_column("platform_payments", "charge_key")
+    op.drop_column("platform_payments", "fee_collection_id")
+    op.drop_table("fee_collections")
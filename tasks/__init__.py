@@ -1,7 +1,14 @@
 # flake8: noqa F401
 from .shell import shell
 from .init_db import init_db, create_jobs, create_locations, create_professions
-from .user import create_user, login_user, delete_user
+from .user import (
+    create_user,
+    login_user,
+    delete_user,
+    update_users_stats,
+    update_users_payment_method,
+    check_users_payment_method,
+)
 from .job import (
     create_jobs,
     create_jobs_for_user,
@@ -9,8 +16,16 @@ from .job import (
     create_job_for_notification,
     patch_job_status,
     test_time_response,
+    update_jobs_search_vector,
+    update_job_price_stats,
 )
 from .application import create_application, create_application_for_notification
-from .collect_fee import collecting_fee
+from .collect_fee import (
+    collecting_fee,
+    benchmark_collect_fee,
+    reconcile_fee_charges,
+    resolve_fee_charge,
+)
+from .payplus import replay_payplus_webhooks
 from .professions import initialize_professions
 from .superuser import create_superuser
@@ -6,3 +6,84 @@ def collecting_fee(_):
     from app.controller.celery import pay_plus_fee
 
     pay_plus_fee.apply()
+
+
+@task
+def reconcile_fee_charges(_):
+    """confirm sent fee charges without result by stored webhooks, print the rest"""
+    from app.database import db as dbo
+    from app.controller.platform_payment import reconcile_sent_charges
+
+    with dbo.Session() as db:
+        for uuid in reconcile_sent_charges(db):
+            print(uuid)
+
+
+@task
+def resolve_fee_charge(
+    _, uuid: str, paid: bool = False, transaction_number: str | None = None
+):
+    """set result of sent fee charge checked in PayPlus
+
+    Args:
+        uuid (str): platform payment uuid.
+        paid (bool, optional): charged, not paid one is charged again. Defaults to False.
+        transaction_number (str, optional): PayPlus transaction of paid one. Defaults to None.
+    """
+    from app.database import db as dbo
+    from app.controller.platform_payment import resolve_sent_charge
+
+    with dbo.Session() as db:
+        resolve_sent_charge(db, uuid, paid, transaction_number)
+
+
+@task
+def benchmark_collect_fee(
+    _,
+    payments: int = 1000,
+    latency_ms: int = 200,
+    reject_rate: float = 0.1,
+    concurrency: int | None = None,
+):
+    """collect fee from fake PayPlus server, for dev database only!
+
+    Args:
+        payments (int, optional): unpaid payments to create. Defaults to 1000.
+        latency_ms (int, optional): fake PayPlus response time. Defaults to 200.
+        reject_rate (float, optional): share of declined charges. Defaults to 0.1.
+        concurrency (int, optional): parallel charges. Defaults to settings.
+    """
+    from sqlalchemy import select
+
+    from app import model as m
+    from app.config import get_settings
+    from app.database import db as dbo
+    from app.controller.payplus_client import get_payplus_client
+    from app.controller.platform_payment import collect_fee
+    from app.logger import log
+
+    settings = get_settings()
+    settings.PAY_PLUS_FAKE = True
+    settings.PAY_PLUS_FAKE_LATENCY_MS = latency_ms
+    settings.PAY_PLUS_FAKE_REJECT_RATE = reject_rate
+    if concurrency:
+        settings.PAY_PLUS_CHARGE_CONCURRENCY = concurrency
+    get_payplus_client.cache_clear()
+
+    with dbo.Session() as db:
+        user_ids = db.scalars(
+            select(m.User.id).where(m.User.payplus_card_uid.is_not(None))
+        ).all()
+        if not user_ids:
+            log(log.ERROR, "No users with payplus card")
+            return
+        db.add_all(
+            [
+                m.PlatformPayment(user_id=user_ids[i % len(user_ids)])
+                for i in range(payments)
+            ]
+        )
+        db.commit()
+
+    result = collect_fee()
+    log(log.INFO, "Benchmark result: %s", result)
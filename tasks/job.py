@@ -270,3 +270,29 @@ def patch_job_status(
         log(log.INFO, "Job status updated")
 
         return db.scalar(select(m.Job).where(m.Job.name == name))
+
+
+@task
+def update_jobs_search_vector(_):
+    """recalculates full text search vector for all jobs"""
+
+    from app.database import db as dbo
+    from app.controller.job_search import update_jobs_search_vector as update
+
+    with dbo.Session() as db:
+        update(db)
+        db.commit()
+    log(log.INFO, "Jobs search vector updated")
+
+
+@task
+def update_job_price_stats(_):
+    """recalculates pending jobs price stats for all locations and professions"""
+
+    from app.database import db as dbo
+    from app.controller.job_price_stats import update_job_price_stats as update
+
+    with dbo.Session() as db:
+        update(db)
+        db.commit()
+    log(log.INFO, "Job price stats updated")
@@ -0,0 +1,30 @@
+from invoke import task
+
+
+@task
+def replay_payplus_webhooks(
+    _,
+    statuses: str = "RECEIVED,FAILED",
+    since: str | None = None,
+    inline: bool = False,
+):
+    """apply again stored PayPlus webhooks which were not applied
+
+    Args:
+        statuses (str, optional): comma separated event statuses. Defaults to "RECEIVED,FAILED".
+        since (str, optional): ISO date of the earliest event. Defaults to None.
+        inline (bool, optional): apply in place instead of celery worker. Defaults to False.
+    """
+    from datetime import datetime
+
+    from app import schema as s
+    from app.database import db as dbo
+    from app.controller.payplus_webhook import replay_webhook_events
+
+    with dbo.Session() as db:
+        replay_webhook_events(
+            db,
+            [s.enums.WebhookEventStatus(status) for status in statuses.split(",")],
+            since=datetime.fromisoformat(since) if since else None,
+            inline=inline,
+        )
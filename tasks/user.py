@@ -285,3 +285,44 @@ def delete_user(_, phone: str = TEST_USER_PHONE, email: str | None = None):
         log(log.INFO, "Error while deleting user:\n%s", e)
         exit(1)
     log(log.INFO, "User %s deleted", phone)
+
+
+@task
+def update_users_stats(_):
+    """recalculates denormalized stats counters for all users"""
+
+    from app.database import db as dbo
+    from app.controller.user_stats import update_users_stats as update
+
+    with dbo.Session() as db:
+        update(db)
+        db.commit()
+    log(log.INFO, "Users stats updated")
+
+
+@task
+def update_users_payment_method(_):
+    """recalculates denormalized payment method flag for all users"""
+
+    from app.database import db as dbo
+    from app.controller.payment_method import update_users_payment_method as update
+
+    with dbo.Session() as db:
+        update(db)
+        db.commit()
+    log(log.INFO, "Users payment method updated")
+
+
+@task
+def check_users_payment_method(_):
+    """finds users whose payment method flag doesn't match their payments"""
+
+    from app.database import db as dbo
+    from app.controller.payment_method import check_users_payment_method as check
+
+    with dbo.Session() as db:
+        user_ids = check(db)
+    if user_ids:
+        log(log.WARNING, "Users with wrong payment method flag: %s", user_ids)
+        exit(1)
+    log(log.INFO, "Users payment method flags are consistent")
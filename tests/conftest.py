@@ -7,4 +7,5 @@ pytest_plugins = [
     "tests.fixture.db",
     "tests.fixture.client",
     "tests.fixture.test_data",
+    "tests.fixture.query_counter",
 ]
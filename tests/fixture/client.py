@@ -1,36 +1,22 @@
 from typing import Generator
-import uuid
 
 import pytest
 from fastapi.testclient import TestClient
-from google.cloud import storage
 from sqlalchemy.orm import Session
 
 import app.schema as s
 from app.controller.push_notification import PushHandler
+from app.controller.celery import (
+    check_file_content_hash,
+    process_file_variants,
+    process_user_picture,
+)
 from .test_data import TestData
 
 
 @pytest.fixture
 def client(monkeypatch) -> Generator:
     from app.main import app
-    from app.controller.attachment import AttachmentController
-
-    def mock_google_account_json(**kwargs):
-        return True
-
-    class URLType:
-        public_url = f"https://storage.googleapis.com/tenkabel-dev/attachments/{str(uuid.uuid4())}"
-
-    class GoogleStorageMock:
-        def upload_file_to_google_cloud_storage(*args, **kwargs):
-            return URLType
-
-        def delete_file_from_google_cloud_storage(*args, **kwargs):
-            return
-
-        def upload_user_profile_picture(*args, **kwargs):
-            return "https://storage.googleapis.com/tenkabel-dev/attachments/1"
 
     class PushNotificationMock:
         _is_initialized = False
@@ -46,24 +32,10 @@ def client(monkeypatch) -> Generator:
         monkeypatch.setattr(
             PushHandler, "send_notification", PushNotificationMock.send_notification
         )
-        monkeypatch.setattr(
-            storage.Client, "from_service_account_json", mock_google_account_json
-        )
-        monkeypatch.setattr(
-            AttachmentController,
-            "upload_file_to_google_cloud_storage",
-            GoogleStorageMock.upload_file_to_google_cloud_storage,
-        )
-        monkeypatch.setattr(
-            AttachmentController,
-            "delete_file_from_google_cloud_storage",
-            GoogleStorageMock.delete_file_from_google_cloud_storage,
-        )
-        monkeypatch.setattr(
-            AttachmentController,
-            "upload_user_profile_picture",
-            GoogleStorageMock.upload_user_profile_picture,
-        )
+        # files are processed by celery worker
+        monkeypatch.setattr(process_user_picture, "delay", lambda *args: None)
+        monkeypatch.setattr(process_file_variants, "delay", lambda *args: None)
+        monkeypatch.setattr(check_file_content_hash, "delay", lambda *args: None)
 
         yield c
 
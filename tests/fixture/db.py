@@ -10,7 +10,12 @@ from app.main import app
 @pytest.fixture
 def db(test_data: TestData) -> Generator:
     from app.database import db, get_db
+    from app.controller import reference_cache
+    from app.utility.principal_cache import principal_cache
 
+    # cached reference data and users belong to the previous test database
+    reference_cache.invalidate()
+    principal_cache.invalidate()
     with db.Session() as session:
         db.Model.metadata.drop_all(bind=session.bind)
         db.Model.metadata.create_all(bind=session.bind)
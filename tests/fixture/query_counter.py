@@ -0,0 +1,40 @@
+from contextlib import contextmanager
+from typing import Generator
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.database import get_async_engine
+
+
+class QueryCounter:
+    """Number of SQL statements executed while counter is active"""
+
+    __test__ = False
+
+    def __init__(self) -> None:
+        self.count = 0
+
+    def __call__(self, *args, **kwargs) -> None:
+        self.count += 1
+
+
+@pytest.fixture
+def query_counter(db: Session) -> Generator:
+    engines = [db.get_bind(), get_async_engine().sync_engine]
+
+    @contextmanager
+    def count_queries() -> Generator[QueryCounter, None, None]:
+        # drop loaded objects so lazy loads are counted as in a fresh request
+        db.expunge_all()
+        counter = QueryCounter()
+        for engine in engines:
+            event.listen(engine, "before_cursor_execute", counter)
+        try:
+            yield counter
+        finally:
+            for engine in engines:
+                event.remove(engine, "before_cursor_execute", counter)
+
+    yield count_queries
@@ -1,7 +1,12 @@
+from fastapi import status
 from fastapi.testclient import TestClient
+from sqlalchemy import select, func
 from sqlalchemy.orm import Session
 
+import app.model as m
+import app.schema as s
 from tests.fixture import TestData
+from tests.utility import create_jobs, create_professions, fill_test_data
 
 
 def test_admin_auth(
@@ -18,3 +23,102 @@ def test_admin_auth(
     response = client.post("admin/login", data=su_data)
     assert response and response.status_code == 200
     assert "Admin" in response.text
+    assert db.scalar(
+        select(m.SuperUser.last_login).where(
+            m.SuperUser.email == test_data.test_superuser.email
+        )
+    )
+
+    response = client.post(
+        "admin/login", data=dict(su_data, password="wrong"), follow_redirects=False
+    )
+    assert response.status_code == status.HTTP_302_FOUND
+
+
+def test_admin_lists(
+    client: TestClient,
+    db: Session,
+    test_data: TestData,
+):
+    create_professions(db)
+    fill_test_data(db)
+    create_jobs(db)
+    client.post(
+        "admin/login",
+        data={
+            "username": test_data.test_superuser.email,
+            "password": test_data.test_superuser.password,
+        },
+    )
+
+    for identity in ("user", "job"):
+        response = client.get(f"admin/{identity}/list")
+        assert response.status_code == status.HTTP_200_OK
+
+    jobs_ids = db.scalars(select(m.Job.id).limit(2)).all()
+    response = client.get(
+        "admin/job/action/delete-job",
+        params={"pks": ",".join(map(str, jobs_ids))},
+        follow_redirects=False,
+    )
+    assert response.status_code in (
+        status.HTTP_302_FOUND,
+        status.HTTP_307_TEMPORARY_REDIRECT,
+    )
+    db.expire_all()
+    assert all(db.scalars(select(m.Job.is_deleted).where(m.Job.id.in_(jobs_ids))).all())
+
+
+def test_admin_delete_job_stats(
+    client: TestClient,
+    db: Session,
+    test_data: TestData,
+):
+    create_professions(db)
+    fill_test_data(db)
+    create_jobs(db)
+    client.post(
+        "admin/login",
+        data={
+            "username": test_data.test_superuser.email,
+            "password": test_data.test_superuser.password,
+        },
+    )
+
+    pending_job: m.Job = db.scalar(
+        select(m.Job).where(
+            m.Job.status == s.enums.JobStatus.PENDING, m.Job.is_deleted.is_(False)
+        )
+    )
+    worked_job: m.Job = db.scalar(
+        select(m.Job).where(m.Job.worker_id.is_not(None), m.Job.is_deleted.is_(False))
+    )
+    worker_id = worked_job.worker_id
+
+    def canceled_count() -> int:
+        return db.scalar(
+            select(m.UserStats.jobs_canceled_count).where(
+                m.UserStats.user_id == worker_id
+            )
+        )
+
+    def listed_jobs_count() -> int:
+        return db.scalar(
+            select(func.sum(m.JobPriceStats.jobs_count)).where(
+                m.JobPriceStats.location_id == 0, m.JobPriceStats.profession_id == 0
+            )
+        )
+
+    jobs_canceled, jobs_listed = canceled_count(), listed_jobs_count()
+    response = client.get(
+        "admin/job/action/delete-job",
+        params={"pks": f"{pending_job.id},{worked_job.id}"},
+        follow_redirects=False,
+    )
+    assert response.status_code in (
+        status.HTTP_302_FOUND,
+        status.HTTP_307_TEMPORARY_REDIRECT,
+    )
+    db.expire_all()
+    assert canceled_count() == jobs_canceled + 1
+    assert listed_jobs_count() == jobs_listed - 1
@@ -1,10 +1,27 @@
+import base64
+import hashlib
+import io
+from urllib.parse import parse_qs, urlparse
+
+import pytest
 from fastapi import status
 from fastapi.testclient import TestClient
 from sqlalchemy.orm import Session
 from sqlalchemy import select
+from PIL import Image
+from redis import RedisError
 
 import app.model as m
 import app.schema as s
+from app.controller.celery import (
+    check_file_content_hash,
+    process_file_variants,
+    process_user_picture,
+)
+from app.controller.image import IMAGE_VARIANT_SIZES, ImageController
+from app.controller.storage import LocalStorageBackend, StorageError
+from app.config import get_settings
+from app.dependency import get_storage
 
 from tests.fixture import TestData
 
@@ -32,6 +49,9 @@ def test_file_methods(
     ).first()
     assert file
     assert file.user.email == test_data.test_authorized_users[0].email
+    assert get_storage().exists(file.storage_path)
+    assert file.url == get_storage().public_url(file.storage_path)
+    storage_path = file.storage_path
 
     # getting attachment
     response = client.get(
@@ -48,5 +68,322 @@ def test_file_methods(
     )
     assert response.status_code == status.HTTP_200_OK
     file: m.File = db.scalars(select(m.File).where(m.File.uuid == file.uuid)).first()
+    assert not get_storage().exists(storage_path)
 
     assert not file
+
+
+def test_file_content_dedup(
+    client: TestClient,
+    db: Session,
+    authorized_users_tokens: list[s.Token],
+):
+    headers = {"Authorization": f"Bearer {authorized_users_tokens[0].access_token}"}
+    with open("tests/utility/images/test_avatar_1.png", "rb") as f:
+        content = f.read()
+
+    response = client.post(
+        "api/files", files={"file": ("first.png", content)}, headers=headers
+    )
+    assert response.status_code == status.HTTP_201_CREATED
+    first_file = s.FileOut.parse_obj(response.json())
+
+    # same content is not uploaded again
+    files_num = len(get_storage().files)
+    response = client.post(
+        "api/files", files={"file": ("second.png", content)}, headers=headers
+    )
+    assert response.status_code == status.HTTP_201_CREATED
+    assert response.json()["uuid"] == first_file.uuid
+    assert len(get_storage().files) == files_num
+
+    # other content with same name doesn't overwrite the first file
+    response = client.post(
+        "api/files", files={"file": ("first.png", content[:100])}, headers=headers
+    )
+    assert response.status_code == status.HTTP_201_CREATED
+    assert response.json()["uuid"] != first_file.uuid
+    assert response.json()["url"] != first_file.url
+
+    # direct upload of the same content
+    request_data = s.FileUploadIn(
+        filename="third.png",
+        content_type="image/png",
+        size=len(content),
+        content_hash=hashlib.sha256(content).hexdigest(),
+    )
+    response = client.post(
+        "api/files/upload-slot", json=request_data.dict(), headers=headers
+    )
+    assert response.status_code == status.HTTP_201_CREATED
+    slot = s.FileUploadOut.parse_obj(response.json())
+    assert not slot.upload_url
+    assert slot.file.uuid == first_file.uuid
+
+
+def test_upload_without_transaction(
+    client: TestClient,
+    db: Session,
+    authorized_users_tokens: list[s.Token],
+    monkeypatch,
+):
+    storage = get_storage()
+    upload = storage.upload
+    in_transaction = []
+
+    def checked_upload(*args, **kwargs):
+        in_transaction.append(db.in_transaction())
+        return upload(*args, **kwargs)
+
+    monkeypatch.setattr(storage, "upload", checked_upload)
+    response = client.post(
+        "api/files",
+        files={"file": ("no_transaction.txt", b"not held")},
+        headers={"Authorization": f"Bearer {authorized_users_tokens[0].access_token}"},
+    )
+    assert response.status_code == status.HTTP_201_CREATED
+    # connection went back to pool before storage was called
+    assert in_transaction == [False]
+
+
+def test_local_storage(tmp_path):
+    storage = LocalStorageBackend(
+        str(tmp_path), "http://localhost/storage/", "http://localhost/upload", "secret"
+    )
+    url = storage.upload("attachments/user/file name.txt", b"data")
+    assert url == "http://localhost/storage/attachments/user/file%20name.txt"
+    assert storage.exists("attachments/user/file name.txt")
+    assert (tmp_path / "attachments/user/file name.txt").read_bytes() == b"data"
+
+    storage.delete("attachments/user/file name.txt")
+    assert not storage.exists("attachments/user/file name.txt")
+    # deleting missing file is not an error
+    storage.delete("attachments/user/file name.txt")
+
+    with pytest.raises(StorageError):
+        storage.upload("../outside.txt", b"data")
+
+    url = storage.signed_upload_url("file.txt", "text/plain", 60)
+    query = parse_qs(urlparse(url).query)
+    expires, signature = int(query["expires"][0]), query["signature"][0]
+    assert storage.verify_upload_signature("file.txt", "text/plain", expires, signature)
+    assert not storage.verify_upload_signature(
+        "file.txt", "image/png", expires, signature
+    )
+    assert not storage.verify_upload_signature(
+        "other.txt", "text/plain", expires, signature
+    )
+
+
+def test_direct_upload(
+    client: TestClient,
+    db: Session,
+    authorized_users_tokens: list[s.Token],
+    monkeypatch,
+):
+    headers = {"Authorization": f"Bearer {authorized_users_tokens[0].access_token}"}
+    with open("tests/utility/images/test_avatar_1.png", "rb") as f:
+        content = f.read()
+    request_data = s.FileUploadIn(
+        filename="avatar.png", content_type="image/png", size=len(content)
+    )
+
+    response = client.post(
+        "api/files/upload-slot", json=request_data.dict(), headers=headers
+    )
+    assert response.status_code == status.HTTP_201_CREATED
+    slot = s.FileUploadOut.parse_obj(response.json())
+    assert not slot.file.is_uploaded
+
+    # pending file can't be attached
+    response = client.post(
+        "api/attachments",
+        json=dict(job_id=1, file_uuids=[slot.file.uuid]),
+        headers=headers,
+    )
+    assert response.status_code == status.HTTP_409_CONFLICT
+
+    response = client.post(f"api/files/{slot.file.uuid}/confirm", headers=headers)
+    assert response.status_code == status.HTTP_409_CONFLICT
+
+    response = client.put(
+        slot.upload_url, content=content, headers={"Content-Type": "text/plain"}
+    )
+    assert response.status_code == status.HTTP_403_FORBIDDEN
+    response = client.put(slot.upload_url, content=content, headers=slot.headers)
+    assert response.status_code == status.HTTP_200_OK
+
+    def failed_stat(path: str):
+        raise StorageError("storage is unavailable")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(get_storage(), "stat", failed_stat)
+        response = client.post(f"api/files/{slot.file.uuid}/confirm", headers=headers)
+    assert response.status_code == status.HTTP_409_CONFLICT
+
+    response = client.post(f"api/files/{slot.file.uuid}/confirm", headers=headers)
+    assert response.status_code == status.HTTP_200_OK
+    file = s.FileOut.parse_obj(response.json())
+    assert file.is_uploaded
+    assert get_storage().stat(
+        db.scalar(select(m.File.path).where(m.File.uuid == file.uuid))
+    ).size == len(content)
+
+    # uploaded content doesn't match the declared one
+    response = client.post(
+        "api/files/upload-slot", json=request_data.dict(), headers=headers
+    )
+    slot = s.FileUploadOut.parse_obj(response.json())
+    response = client.put(slot.upload_url, content=content[:10], headers=slot.headers)
+    assert response.status_code == status.HTTP_200_OK
+    response = client.post(f"api/files/{slot.file.uuid}/confirm", headers=headers)
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+    # declared hash is checked by celery worker, mismatching file is deleted
+    for declared_content in (b"other content", content):
+        request_data.content_hash = hashlib.sha256(declared_content).hexdigest()
+        response = client.post(
+            "api/files/upload-slot", json=request_data.dict(), headers=headers
+        )
+        slot = s.FileUploadOut.parse_obj(response.json())
+        response = client.put(slot.upload_url, content=content, headers=slot.headers)
+        assert response.status_code == status.HTTP_200_OK
+        response = client.post(f"api/files/{slot.file.uuid}/confirm", headers=headers)
+        assert response.status_code == status.HTTP_200_OK
+        file: m.File = db.scalar(select(m.File).where(m.File.uuid == slot.file.uuid))
+        # not used for dedup till checked
+        assert not file.content_hash
+        check_file_content_hash.apply(args=(file.id, request_data.content_hash))
+        db.refresh(file)
+        is_matching = declared_content == content
+        assert file.is_deleted is not is_matching
+        assert get_storage().exists(file.path) is is_matching
+        assert file.content_hash == (request_data.content_hash if is_matching else None)
+    request_data.content_hash = None
+
+    # filename is a part of storage path
+    for filename in ("../avatar.png", "dir/avatar.png", "dir\\avatar.png"):
+        response = client.post(
+            "api/files/upload-slot",
+            json=dict(request_data.dict(), filename=filename),
+            headers=headers,
+        )
+        assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+    response = client.post(
+        "api/files/upload-slot", json=dict(request_data.dict(), size=0), headers=headers
+    )
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+    # quotas
+    settings = get_settings()
+    with monkeypatch.context() as patch:
+        patch.setattr(settings, "FILE_MAX_SIZE", len(content) - 1)
+        response = client.put(slot.upload_url, content=content, headers=slot.headers)
+        assert response.status_code == status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    request_data.size = settings.FILE_MAX_SIZE + 1
+    response = client.post(
+        "api/files/upload-slot", json=request_data.dict(), headers=headers
+    )
+    assert response.status_code == status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    monkeypatch.setattr(settings, "USER_FILES_QUOTA", len(content) + 1)
+    request_data.size = 2
+    response = client.post(
+        "api/files/upload-slot", json=request_data.dict(), headers=headers
+    )
+    assert response.status_code == status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+
+
+def test_image_variants(
+    client: TestClient,
+    db: Session,
+    test_data: TestData,
+    authorized_users_tokens: list[s.Token],
+    monkeypatch,
+):
+    headers = {"Authorization": f"Bearer {authorized_users_tokens[0].access_token}"}
+    with open("tests/utility/images/test_avatar_1.png", "rb") as f:
+        content = f.read()
+    storage = get_storage()
+
+    response = client.post(
+        "api/files", files={"file": ("variants.png", content)}, headers=headers
+    )
+    assert response.status_code == status.HTTP_201_CREATED
+    assert not s.FileOut.parse_obj(response.json()).variants
+    file: m.File = db.scalar(
+        select(m.File).where(m.File.original_filename == "variants.png")
+    )
+
+    process_file_variants.apply(args=(file.id,))
+    db.refresh(file)
+    variants = s.FileOut.from_orm(file).variants
+    assert variants
+    for variant, size in IMAGE_VARIANT_SIZES.items():
+        path = ImageController.variant_path(file.path, variant, "webp")
+        image = Image.open(io.BytesIO(storage.download(path)))
+        assert image.format == "WEBP"
+        assert max(image.size) <= size
+        assert getattr(variants, variant) == storage.public_url(path)
+
+    # profile picture is stored as JPEG, variants are made of original when ready
+    user: m.User = db.scalar(
+        select(m.User).where(
+            m.User.username == test_data.test_authorized_users[0].username
+        )
+    )
+    request_data = s.UserUpdateIn(
+        username=user.username,
+        first_name=user.first_name,
+        last_name=user.last_name,
+        picture=base64.b64encode(content).decode(),
+        picture_filename="avatar.png",
+        professions=[],
+        locations=[],
+    )
+    scheduled: list[str] = []
+    with monkeypatch.context() as patch:
+        patch.setattr(
+            process_user_picture,
+            "delay",
+            lambda user_id, path: scheduled.append(path),
+        )
+        response = client.patch("api/users", json=request_data.dict(), headers=headers)
+    assert response.status_code == status.HTTP_200_OK
+    db.refresh(user)
+    assert not user.picture_variants
+    (path,) = scheduled
+    assert path.startswith(f"profile/{user.uuid}/") and path.endswith("avatar.png")
+    assert storage.download(path) == content
+    picture_path = ImageController.picture_path(path)
+    assert user.picture == storage.public_url(picture_path)
+    image = Image.open(io.BytesIO(storage.download(picture_path)))
+    assert image.format == "JPEG"
+
+    process_user_picture.apply(args=(user.id, path))
+    db.refresh(user)
+    variants = s.UserPicture.from_orm(user).picture_variants
+    assert variants.full == storage.public_url(
+        ImageController.variant_path(path, "full", "webp")
+    )
+    # JPEG is kept for clients not aware of variants, original is not needed
+    assert user.picture == storage.public_url(picture_path)
+    assert not storage.exists(path)
+
+    # variants are made in place if the task is not queued,
+    # replaced picture and its variants are deleted
+    def not_queued(*args, **kwargs):
+        raise RedisError("Redis is down")
+
+    replaced_urls = [user.picture, *user.picture_variants.values()]
+    with monkeypatch.context() as patch:
+        patch.setattr(process_user_picture, "delay", not_queued)
+        response = client.patch("api/users", json=request_data.dict(), headers=headers)
+    assert response.status_code == status.HTTP_200_OK
+    db.refresh(user)
+    assert user.picture not in replaced_urls
+    assert user.picture_variants
+    assert not any(storage.exists(storage.path_from_url(url)) for url in replaced_urls)
+
+    request_data.picture = base64.b64encode(b"not an image").decode()
+    response = client.patch("api/users", json=request_data.dict(), headers=headers)
+    assert response.status_code == status.HTTP_409_CONFLICT
@@ -0,0 +1,24 @@
+from fastapi import status
+from fastapi.testclient import TestClient
+
+import app.schema as s
+
+
+def test_db_health(client: TestClient):
+    response = client.get("health/db")
+    assert response.status_code == status.HTTP_200_OK
+    health = s.DBHealth.parse_obj(response.json())
+    assert health.is_alive
+    assert health.async_pool.pool_class == "TimedAsyncQueuePool"
+    assert health.async_pool.checkouts
+    assert health.sync_pool.pool_class == "TimedQueuePool"
+    assert health.sync_pool.size
+
+
+def test_connection_hold(client: TestClient):
+    client.get("health/db")
+    response = client.get("health/db")
+    health = s.DBHealth.parse_obj(response.json())
+    hold = health.connection_hold["GET db_health"]
+    assert hold.count >= 1
+    assert hold.seconds_max <= hold.seconds_total
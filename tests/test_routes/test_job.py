@@ -3,10 +3,11 @@ from datetime import datetime
 from fastapi import status
 from fastapi.testclient import TestClient
 from sqlalchemy.orm import Session
-from sqlalchemy import select, and_, or_
+from sqlalchemy import select, and_, or_, func
 
 import app.model as m
 import app.schema as s
+from app.controller import update_job_price_stats
 from app.oauth2 import create_access_token
 from tests.fixture import TestData
 from tests.utility import (
@@ -18,6 +19,7 @@ from tests.utility import (
     generate_customer_uid,
     generate_card_token,
     create_files_for_user,
+    create_applications_for_user,
 )
 
 
@@ -50,6 +52,11 @@ TEST_TIMES = [
 TEST_MIN_PRICE = 1
 TEST_MAX_PRICE = 40
 
+# queries per request with eager loading, must not grow with number of jobs
+MAX_QUERIES_SEARCH_JOBS = 6
+MAX_QUERIES_JOB = 30
+MAX_QUERIES_USER_JOBS = 36
+
 
 def test_auth_user_jobs(
     client: TestClient,
@@ -344,6 +351,57 @@ def test_search_job(
     assert len(response_jobs_list.jobs) == 0
 
 
+def test_search_job_fields(
+    client: TestClient,
+    db: Session,
+    faker,
+):
+    create_professions(db)
+    create_jobs(db)
+    fill_test_data(db)
+
+    owner: m.User = db.scalar(select(m.User))
+    profession = m.Profession(name_en="Glazier", name_hebrew="זגג")
+    region = m.Location(name_en="Zikhron", name_hebrew="זכרון")
+    db.add_all([profession, region])
+    db.flush()
+
+    def create_job(name: str, city: str, profession_id: int | None) -> m.Job:
+        job = m.Job(
+            owner_id=owner.id,
+            profession_id=profession_id,
+            name=name,
+            description=faker.sentence(),
+            payment=10,
+            commission=1,
+            city=city,
+            time=datetime.utcnow().strftime("%Y-%m-%d %H:%M"),
+            customer_first_name=faker.first_name(),
+            customer_last_name=faker.last_name(),
+            customer_phone=faker.phone_number(),
+            customer_street_address=faker.address(),
+        )
+        db.add(job)
+        db.flush()
+        return job
+
+    named_job = create_job("Chandelier mounting", "Haifa", None)
+    profession_job = create_job("Window repair", "Haifa", profession.id)
+    # no profession and empty city, the job is still found by region
+    region_job = create_job("Garden works", "", None)
+    db.add(m.JobLocation(job_id=region_job.id, location_id=region.id))
+    db.commit()
+
+    def search(q: str) -> list[int]:
+        response = client.get("api/jobs", params={"q": q})
+        assert response.status_code == status.HTTP_200_OK
+        return [job.id for job in s.ListJobSearch.parse_obj(response.json()).jobs]
+
+    assert search("Chandelier") == [named_job.id]
+    assert search("Glazier") == [profession_job.id]
+    assert search("Zikhron") == [region_job.id]
+
+
 def test_update_job(
     client: TestClient,
     db: Session,
@@ -703,3 +761,215 @@ def test_create_jobs_options(
         .order_by(m.Job.payment.asc())
     )
     assert smallest_price_job.payment == resp_data.min_price
+
+
+def test_job_price_stats(
+    client: TestClient,
+    db: Session,
+    query_counter,
+):
+    create_professions(db)
+    create_locations(db)
+    fill_test_data(db)
+    create_jobs(db, NUM_TEST_JOBS)
+
+    def price_stats() -> list[tuple]:
+        return db.execute(
+            select(
+                m.JobPriceStats.location_id,
+                m.JobPriceStats.profession_id,
+                m.JobPriceStats.bucket,
+                m.JobPriceStats.jobs_count,
+                m.JobPriceStats.min_price,
+                m.JobPriceStats.max_price,
+            ).order_by(
+                m.JobPriceStats.location_id,
+                m.JobPriceStats.profession_id,
+                m.JobPriceStats.bucket,
+            )
+        ).all()
+
+    # stats maintained on jobs changes are the same as recalculated ones
+    maintained_stats = price_stats()
+    assert maintained_stats
+    update_job_price_stats(db)
+    db.commit()
+    assert price_stats() == maintained_stats
+
+    with query_counter() as counter:
+        response = client.get("api/options/price", params={"histogram": True})
+    assert response.status_code == status.HTTP_200_OK
+    # stats only
+    assert counter.count == 1
+    resp_data = s.PriceOption.parse_obj(response.json())
+    pending_jobs = db.scalars(
+        select(m.Job).where(
+            m.Job.status == s.enums.JobStatus.PENDING, m.Job.is_deleted.is_(False)
+        )
+    ).all()
+    assert resp_data.buckets
+    assert sum(b.jobs_count for b in resp_data.buckets) == len(pending_jobs)
+
+    # the most expensive job
+    job = pending_jobs[0]
+    job.payment = 10_000
+    db.commit()
+    response = client.get("api/options/price", params={"histogram": True})
+    resp_data = s.PriceOption.parse_obj(response.json())
+    assert resp_data.max_price == 10_000
+    assert resp_data.buckets[-1].price_from <= 10_000 < resp_data.buckets[-1].price_to
+    assert resp_data.buckets[-1].jobs_count == 1
+
+    # user's own jobs are not in their price range
+    owner: m.User = db.get(m.User, job.owner_id)
+    response = client.get("api/options/price", params={"user_uuid": owner.uuid})
+    resp_data = s.PriceOption.parse_obj(response.json())
+    assert resp_data.max_price == db.scalar(
+        select(func.max(m.Job.payment)).where(
+            m.Job.status == s.enums.JobStatus.PENDING,
+            m.Job.is_deleted.is_(False),
+            m.Job.owner_id != owner.id,
+        )
+    )
+
+    # job is not pending anymore
+    job.set_enum(s.enums.JobStatus.APPROVED, db)
+    db.commit()
+    response = client.get("api/options/price")
+    resp_data = s.PriceOption.parse_obj(response.json())
+    assert resp_data.max_price < 10_000
+    maintained_stats = price_stats()
+    update_job_price_stats(db)
+    db.commit()
+    assert price_stats() == maintained_stats
+
+    # a job in several requested regions is counted once
+    job = pending_jobs[1]
+    locations = db.scalars(select(m.Location).limit(2)).all()
+    for location in locations:
+        if location not in job.regions:
+            db.add(m.JobLocation(job_id=job.id, location_id=location.id))
+    db.commit()
+    response = client.get(
+        "api/options/price",
+        params={"regions": [loc.name_en for loc in locations], "histogram": True},
+    )
+    resp_data = s.PriceOption.parse_obj(response.json())
+    assert sum(b.jobs_count for b in resp_data.buckets) == db.scalar(
+        select(func.count(m.Job.id)).where(
+            m.Job.status == s.enums.JobStatus.PENDING,
+            m.Job.is_deleted.is_(False),
+            m.Job.regions.any(m.Location.id.in_([loc.id for loc in locations])),
+        )
+    )
+
+    # unknown category
+    response = client.get("api/options/price", params={"category": "unknown"})
+    assert response.status_code == status.HTTP_200_OK
+    resp_data = s.PriceOption.parse_obj(response.json())
+    assert resp_data.max_price is None and resp_data.min_price is None
+
+
+def test_paginated_jobs(
+    client: TestClient,
+    db: Session,
+    faker,
+):
+    create_professions(db)
+    create_locations(db)
+    create_jobs(db, NUM_TEST_JOBS)
+    fill_test_data(db)
+
+    response = client.get("api/jobs")
+    assert response.status_code == status.HTTP_200_OK
+    all_jobs = s.ListJobSearch.parse_obj(response.json())
+    assert all_jobs.next_cursor is None
+
+    page_size = 7
+    paged_ids = []
+    cursor = None
+    while True:
+        params = {"paginated": True, "limit": page_size}
+        if cursor:
+            params["cursor"] = cursor
+        response = client.get("api/jobs", params=params)
+        assert response.status_code == status.HTTP_200_OK
+        page = s.ListJobSearch.parse_obj(response.json())
+        assert len(page.jobs) <= page_size
+        paged_ids += [job.id for job in page.jobs]
+        cursor = page.next_cursor
+        if not cursor:
+            break
+    assert paged_ids == [job.id for job in all_jobs.jobs]
+
+    # page size is limited on server side
+    response = client.get("api/jobs", params={"paginated": True, "limit": 10000})
+    assert response.status_code == status.HTTP_200_OK
+    page = s.ListJobSearch.parse_obj(response.json())
+    assert len(page.jobs) <= 100
+
+    response = client.get("api/jobs", params={"paginated": True, "cursor": "bad!"})
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+
+def test_jobs_query_count(
+    client: TestClient,
+    db: Session,
+    test_data: TestData,
+    authorized_users_tokens: list[s.Token],
+    query_counter,
+):
+    create_professions(db)
+    create_locations(db)
+    fill_test_data(db)
+    create_jobs(db, NUM_TEST_JOBS)
+
+    user: m.User = db.scalar(
+        select(m.User).where(m.User.phone == test_data.test_authorized_users[0].phone)
+    )
+    create_jobs_for_user(db, user.id)
+    create_applications_for_user(db, user.id)
+    headers = {"Authorization": f"Bearer {authorized_users_tokens[0].access_token}"}
+    job: m.Job = db.scalar(select(m.Job).where(m.Job.owner_id == user.id))
+    # a job in the user's feed, so the feed is never empty whatever random jobs are
+    feed_job: m.Job = db.scalar(
+        select(m.Job).where(
+            m.Job.owner_id != user.id,
+            m.Job.status == s.enums.JobStatus.PENDING,
+            m.Job.is_deleted.is_(False),
+            ~m.Job.applications.any(),
+        )
+    )
+    if user.professions:
+        feed_job.profession_id = user.professions[0].id
+    if user.locations and user.locations[0] not in feed_job.regions:
+        db.add(m.JobLocation(job_id=feed_job.id, location_id=user.locations[0].id))
+    db.commit()
+    user_id = user.id
+    max_queries = {
+        "api/jobs": MAX_QUERIES_SEARCH_JOBS,
+        f"api/jobs/{job.uuid}": MAX_QUERIES_JOB,
+        "api/users/jobs": MAX_QUERIES_USER_JOBS,
+        "api/users/postings": MAX_QUERIES_USER_JOBS,
+    }
+
+    def count_queries() -> dict[str, int]:
+        counts = {}
+        for url in max_queries:
+            with query_counter() as counter:
+                response = client.get(url, headers=headers)
+            assert response.status_code == status.HTTP_200_OK
+            counts[url] = counter.count
+        return counts
+
+    # caches filled by the first requests are not counted
+    count_queries()
+    counts = count_queries()
+    for url, count in counts.items():
+        assert count <= max_queries[url], url
+
+    # twice as many jobs, applications and users on them
+    create_jobs(db, NUM_TEST_JOBS)
+    create_jobs_for_user(db, user_id)
+    create_applications_for_user(db, user_id)
+    assert count_queries() == counts
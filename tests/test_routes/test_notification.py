@@ -5,14 +5,19 @@ from sqlalchemy import select
 
 import app.schema as s
 import app.model as m
+from app.controller import job_created_notify, PushHandler
 from tests.fixture import TestData
 from tests.utility import (
     fill_test_data,
     create_professions,
+    create_locations,
     create_jobs,
     create_applications,
 )
 
+# queries per request with batched payloads, must not grow with page size
+MAX_QUERIES_NOTIFICATIONS = 60
+
 
 def test_notification_get_list(
     client: TestClient,
@@ -42,3 +47,269 @@ def test_notification_get_list(
     for item in resp_obj.items:
         assert item.user_id == user.id
         assert item.type
+
+
+def test_notification_paginated_list(
+    client: TestClient,
+    db: Session,
+    authorized_users_tokens: list[s.Token],
+    query_counter,
+):
+    create_professions(db)
+    fill_test_data(db)
+    create_jobs(db)
+    create_applications(db)
+    headers = {"Authorization": f"Bearer {authorized_users_tokens[0].access_token}"}
+
+    response = client.get("api/notifications", headers=headers)
+    assert response.status_code == status.HTTP_200_OK
+    all_items = s.NotificationList.parse_obj(response.json()).items
+    assert not response.json()["next_cursor"]
+
+    items = []
+    cursor = None
+    pages = 0
+    while True:
+        params = dict(paginated=True, limit=2)
+        if cursor:
+            params["cursor"] = cursor
+        with query_counter() as counter:
+            response = client.get("api/notifications", headers=headers, params=params)
+        assert response.status_code == status.HTTP_200_OK
+        # payloads are fetched in batches, not by notification
+        assert counter.count <= MAX_QUERIES_NOTIFICATIONS
+        page = s.NotificationList.parse_obj(response.json())
+        assert len(page.items) <= 2
+        items += page.items
+        pages += 1
+        cursor = page.next_cursor
+        if not cursor:
+            break
+
+    assert pages > 1
+    assert [item.id for item in items] == [item.id for item in all_items]
+
+
+def test_notifications_read(
+    client: TestClient,
+    db: Session,
+    authorized_users_tokens: list[s.Token],
+):
+    create_professions(db)
+    fill_test_data(db)
+    create_jobs(db)
+    create_applications(db)
+    headers = {"Authorization": f"Bearer {authorized_users_tokens[0].access_token}"}
+
+    response = client.get("api/notifications", headers=headers)
+    assert response.status_code == status.HTTP_200_OK
+    items = s.NotificationList.parse_obj(response.json()).items
+    assert len(items) > 1
+    assert not any(item.is_read for item in items)
+
+    response = client.get("api/notifications/unread-count", headers=headers)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["count"] == len(items)
+
+    response = client.patch(
+        "api/notifications/read", headers=headers, json=dict(uuids=[items[0].uuid])
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["count"] == len(items) - 1
+
+    response = client.get("api/notifications", headers=headers)
+    items = s.NotificationList.parse_obj(response.json()).items
+    assert [item.is_read for item in items] == [True] + [False] * (len(items) - 1)
+
+    # all notifications
+    response = client.patch("api/notifications/read", headers=headers, json={})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["count"] == 0
+    response = client.get("api/notifications/unread-count", headers=headers)
+    assert response.json()["count"] == 0
+
+
+def test_job_created_notify(db: Session, monkeypatch):
+    create_professions(db)
+    create_locations(db)
+    profession, other_profession = db.scalars(select(m.Profession).limit(2)).all()
+    location, other_location = db.scalars(select(m.Location).limit(2)).all()
+
+    # (notification locations, notification professions, push enabled)
+    settings = [
+        ([location], [profession], True),
+        ([location, other_location], [], False),
+        ([], [profession], True),
+        ([other_location], [profession], True),
+        ([location], [other_profession], True),
+        ([], [], True),
+    ]
+    users: list[m.User] = []
+    for i, (locations, professions, push_enabled) in enumerate(settings):
+        user = m.User(
+            phone=f"972 54 100 {i:04}",
+            email=f"notify{i}@test.com",
+            password_hash="pass",
+            country_code="IL",
+            notification_locations_flag=push_enabled,
+            notification_profession_flag=push_enabled,
+        )
+        db.add(user)
+        db.flush()
+        db.add_all(
+            m.UserNotificationLocation(user_id=user.id, location_id=loc.id)
+            for loc in locations
+        )
+        db.add_all(
+            m.UserNotificationsProfessions(user_id=user.id, profession_id=prof.id)
+            for prof in professions
+        )
+        db.add_all(
+            m.Device(uuid=f"device{i}_{n}", push_token=f"token{i}", user_id=user.id)
+            for n in range(2)
+        )
+        users.append(user)
+    deleted_user = m.User(
+        phone="972 54 100 9999",
+        email="notify_deleted@test.com",
+        password_hash="pass",
+        country_code="IL",
+        is_deleted=True,
+    )
+    db.add(deleted_user)
+    db.flush()
+    db.add(m.UserNotificationLocation(user_id=deleted_user.id, location_id=location.id))
+
+    job = m.Job(
+        owner_id=users[-1].id,
+        profession_id=profession.id,
+        city=location.name_en,
+        payment=100,
+        commission=10,
+        who_pays=s.Job.WhoPays.ME,
+        name="notify",
+        description="notify",
+        time="now",
+        customer_first_name="first",
+        customer_last_name="last",
+        customer_phone="phone",
+        customer_street_address="street",
+    )
+    db.add(job)
+    db.flush()
+    db.add(m.JobLocation(job_id=job.id, location_id=location.id))
+    db.commit()
+
+    device_tokens = []
+
+    def send_notification(_, message: s.PushNotificationMessage):
+        device_tokens.extend(message.device_tokens)
+
+    monkeypatch.setattr(PushHandler, "__init__", lambda _: None)
+    monkeypatch.setattr(PushHandler, "send_notification", send_notification)
+    job_created_notify(job, db)
+
+    notifications = db.scalars(
+        select(m.Notification).where(m.Notification.entity_id == job.id)
+    ).all()
+    assert sorted(n.user_id for n in notifications) == [u.id for u in users[:3]]
+    assert all(
+        n.uuid and n.type == s.NotificationType.JOB_CREATED for n in notifications
+    )
+    assert sorted(device_tokens) == ["token0", "token2"]
+
+
+def test_send_push_notification(monkeypatch):
+    from firebase_admin import messaging
+    from firebase_admin.exceptions import UnavailableError
+
+    from app.controller.celery import send_push_notification
+
+    sent_chunks: list[list[str]] = []
+
+    def send_multicast(multicast_message: messaging.MulticastMessage):
+        sent_chunks.append(multicast_message.tokens)
+        if len(sent_chunks) == 1:
+            raise UnavailableError("FCM is unavailable")
+        return messaging.BatchResponse([])
+
+    monkeypatch.setattr(PushHandler, "_is_initialized", True)
+    monkeypatch.setattr(PushHandler, "count_stats", lambda *args, **kwargs: None)
+    monkeypatch.setattr(messaging, "send_multicast", send_multicast)
+
+    device_tokens = [f"token{i}" for i in range(1200)]
+    send_push_notification.apply(args=(device_tokens, {"job_name": "test"}))
+
+    # tokens are sent by chunks of 500, failed chunk is retried
+    assert [len(chunk) for chunk in sent_chunks] == [500, 500, 200, 500]
+    assert sent_chunks[-1] == sent_chunks[0]
+
+
+def test_prune_invalid_push_tokens(db: Session, monkeypatch):
+    from firebase_admin import messaging
+    from firebase_admin.exceptions import InvalidArgumentError, UnavailableError
+
+    results = {
+        "valid": None,
+        "unregistered": messaging.UnregisteredError("unregistered"),
+        "invalid": InvalidArgumentError("invalid"),
+        "unavailable": UnavailableError("unavailable"),
+    }
+    user: m.User = db.scalar(select(m.User))
+    for token in results:
+        db.add(m.Device(uuid=token, push_token=token, user_id=user.id))
+    db.commit()
+
+    def send_multicast(multicast_message: messaging.MulticastMessage):
+        return messaging.BatchResponse(
+            [
+                messaging.SendResponse(
+                    None if results[token] else {"name": token}, results[token]
+                )
+                for token in multicast_message.tokens
+            ]
+        )
+
+    stats = {}
+    monkeypatch.setattr(PushHandler, "_is_initialized", True)
+    monkeypatch.setattr(
+        PushHandler, "count_stats", lambda _, **kwargs: stats.update(kwargs)
+    )
+    monkeypatch.setattr(messaging, "send_multicast", send_multicast)
+
+    failed_tokens = PushHandler().send_multicast(list(results), {"job_name": "test"})
+    assert failed_tokens == ["unavailable"]
+    assert stats == dict(sent=4, pruned=2)
+    db.expire_all()
+    assert sorted(db.scalars(select(m.Device.push_token)).all()) == [
+        "unavailable",
+        "valid",
+    ]
+
+
+def test_unread_count_cached_principal(
+    client: TestClient,
+    db: Session,
+    authorized_users_tokens: list[s.Token],
+    query_counter,
+):
+    headers = {"Authorization": f"Bearer {authorized_users_tokens[0].access_token}"}
+    response = client.get("api/notifications/unread-count", headers=headers)
+    assert response.status_code == status.HTTP_200_OK
+
+    # user flags are cached, only notifications are counted
+    with query_counter() as counter:
+        response = client.get("api/notifications/unread-count", headers=headers)
+    assert response.status_code == status.HTTP_200_OK
+    assert counter.count == 1
+
+    response = client.request(
+        "DELETE",
+        "api/users",
+        headers=headers,
+        content=s.LogoutIn(device_uuid="no_device").json(),
+    )
+    assert response.status_code == status.HTTP_200_OK
+    # deletion invalidates cached user
+    response = client.get("api/notifications/unread-count", headers=headers)
+    assert response.status_code == status.HTTP_404_NOT_FOUND
@@ -1,3 +1,5 @@
+from datetime import datetime
+
 from fastapi import status
 from fastapi.testclient import TestClient
 from sqlalchemy.orm import Session
@@ -6,7 +8,11 @@ import pytest
 
 import app.schema as s
 import app.model as m
-from app.controller.platform_payment import collect_fee
+from app.controller.platform_payment import (
+    collect_fee,
+    reconcile_sent_charges,
+    resolve_sent_charge,
+)
 from app.config import Settings, get_settings
 
 from tests.fixture import TestData
@@ -29,7 +35,7 @@ def test_payplus_form_url(
     authorized_users_tokens: list[s.Token],
     faker,
 ):
-    import httpx
+    from app.controller.payplus_client import get_payplus_client
 
     fill_test_data(db)
     create_professions(db)
@@ -60,7 +66,7 @@ def test_payplus_form_url(
 
         return MockResponse()
 
-    monkeypatch.setattr(httpx, "post", mock_post)
+    monkeypatch.setattr(get_payplus_client(), "post", mock_post)
     response = client.get(
         f"api/payment/form-url/{auth_user.jobs_owned[0].uuid}",
         headers={"Authorization": f"Bearer {authorized_users_tokens[0].access_token}"},
@@ -79,7 +85,7 @@ def test_payment_flow(
     faker,
     settings: Settings = get_settings(),
 ):
-    import httpx
+    from app.controller.payplus_client import get_payplus_client
 
     # Mocking request to payplus
     def mock_post(*args, **kwargs):
@@ -93,7 +99,7 @@ def test_payment_flow(
 
         return MockResponse()
 
-    monkeypatch.setattr(httpx, "post", mock_post)
+    monkeypatch.setattr(get_payplus_client(), "post", mock_post)
     fill_test_data(db)
     create_professions(db)
 
@@ -125,3 +131,321 @@ def test_payment_flow(
 
     # testing collect_fee() method
     collect_fee()
+
+
+def test_collect_fee(
+    db: Session,
+    monkeypatch,
+    test_data: TestData,
+    authorized_users_tokens: list[s.Token],
+    settings: Settings = get_settings(),
+):
+    import json
+    from app.controller.payplus_client import get_payplus_client
+
+    fill_test_data(db)
+    create_professions(db)
+    auth_user: m.User = db.scalar(
+        select(m.User).where(m.User.email == test_data.test_authorized_users[0].email)
+    )
+    create_jobs_for_user(db, auth_user.id, 5)
+    users = db.scalars(select(m.User).limit(3)).all()
+    for user in users:
+        generate_card_token(user, db)
+    jobs = db.scalars(select(m.Job).where(m.Job.owner_id == auth_user.id)).all()
+
+    # two jobs for the first user, one for the second, none for the third
+    payments = []
+    for user, user_jobs in zip(users, (jobs[:2], jobs[2:3], [])):
+        platform_payment = m.PlatformPayment(user_id=user.id)
+        db.add(platform_payment)
+        db.flush()
+        for job in user_jobs:
+            db.add(
+                m.PlatformCommission(
+                    user_id=user.id,
+                    job_id=job.id,
+                    platform_payment_id=platform_payment.id,
+                )
+            )
+        payments.append(platform_payment)
+    # crashed run left a payment in progress and rejected another one
+    crashed = m.FeeCollection()
+    db.add(crashed)
+    db.flush()
+    payments[1].status = s.enums.PlatformPaymentStatus.PROGRESS
+    payments[1].fee_collection_id = crashed.id
+    payments[2].status = s.enums.PlatformPaymentStatus.REJECTED
+    payments[2].fee_collection_id = crashed.id
+    # charges sent by crashed run, one of them confirmed by webhook
+    sent_payments = []
+    for user in users[1:]:
+        sent_payment = m.PlatformPayment(
+            user_id=user.id,
+            status=s.enums.PlatformPaymentStatus.PROGRESS,
+            fee_collection_id=crashed.id,
+            charge_sent_at=datetime.utcnow(),
+        )
+        db.add(sent_payment)
+        db.flush()
+        sent_payments.append(sent_payment)
+    db.add(
+        m.PayPlusWebhookEvent(
+            dedupe_key="Charge:sent",
+            transaction_type="Charge",
+            platform_payment_uuid=sent_payments[0].uuid,
+            payload={
+                "transaction_type": "Charge",
+                "transaction": {
+                    "number": "sent",
+                    "date": "2026-10-18 20:00:00",
+                    "more_info_1": json.dumps(
+                        {"platform_payment_uuid": sent_payments[0].uuid}
+                    ),
+                },
+            },
+            status=s.enums.WebhookEventStatus.RECEIVED,
+            attempts=0,
+            error="",
+        )
+    )
+    db.commit()
+
+    charged = {}
+
+    def mock_post(*args, **kwargs):
+        charge_data = kwargs["json"]
+        info = json.loads(charge_data["more_info_1"])
+        charged[info["platform_payment_uuid"]] = charge_data["amount"]
+        assert info["charge_key"].startswith(info["platform_payment_uuid"])
+        is_rejected = charge_data["token"] == users[0].payplus_card_uid
+        result = "error" if is_rejected else "success"
+
+        class MockResponse:
+            status_code = status.HTTP_200_OK
+
+            def json(self):
+                return {"results": {"status": result, "description": result}}
+
+        return MockResponse()
+
+    monkeypatch.setattr(get_payplus_client(), "post", mock_post)
+    progress = []
+    result = collect_fee(lambda p: progress.append(dict(p)))
+
+    # rejected by crashed run and sent ones are not charged again
+    assert set(charged) == {payments[0].uuid, payments[1].uuid}
+    coefficient = settings.VAT_COEFFICIENT * settings.COMMISSION_COEFFICIENT
+    assert charged[payments[0].uuid] == round(
+        (jobs[0].payment + jobs[1].payment) * coefficient, 2
+    )
+    assert result["total"] == 2
+    assert result["paid"] == 1
+    assert result["rejected"] == 1
+    assert result["unconfirmed"] == 1
+    assert [p["done"] for p in progress] == [1, 2]
+
+    db.expire_all()
+    assert payments[0].status == s.enums.PlatformPaymentStatus.REJECTED
+    assert payments[1].status == s.enums.PlatformPaymentStatus.PAID
+    assert users[0].is_payment_method_invalid
+    assert sent_payments[0].status == s.enums.PlatformPaymentStatus.PAID
+    # left for reconciliation
+    assert sent_payments[1].status == s.enums.PlatformPaymentStatus.PROGRESS
+    assert crashed.finished_at
+    assert crashed.paid_count == 2
+    assert crashed.rejected_count == 2
+    assert crashed.unconfirmed_count == 1
+    assert crashed.payments_count == 5
+
+
+def test_collect_fee_bad_response(
+    db: Session,
+    monkeypatch,
+    test_data: TestData,
+):
+    from app.controller.payplus_client import get_payplus_client
+
+    fill_test_data(db)
+    users = db.scalars(select(m.User).limit(2)).all()
+    for user in users:
+        generate_card_token(user, db)
+        db.add(m.PlatformPayment(user_id=user.id))
+    db.commit()
+
+    charged_tokens = []
+
+    def mock_post(*args, **kwargs):
+        charged_tokens.append(kwargs["json"]["token"])
+        is_bad = kwargs["json"]["token"] == users[0].payplus_card_uid
+
+        class MockResponse:
+            status_code = status.HTTP_502_BAD_GATEWAY if is_bad else status.HTTP_200_OK
+
+            def json(self):
+                if is_bad:
+                    raise ValueError("Expecting value: line 1 column 1 (char 0)")
+                return {"results": {"status": "success"}}
+
+        return MockResponse()
+
+    monkeypatch.setattr(get_payplus_client(), "post", mock_post)
+    # bad response doesn't stop the collection
+    result = collect_fee()
+    assert result["total"] == 2
+    assert result["paid"] == 1
+    assert result["failed"] == 1
+
+    # result of the charge is unknown, it is not charged by next run
+    bad_payment = db.scalar(
+        select(m.PlatformPayment).where(m.PlatformPayment.user_id == users[0].id)
+    )
+    assert bad_payment.status == s.enums.PlatformPaymentStatus.PROGRESS
+    assert bad_payment.charge_sent_at
+    result = collect_fee()
+    assert result["total"] == 0
+
+    # operator checked in PayPlus the charge left without result
+    assert reconcile_sent_charges(db) == [bad_payment.uuid]
+    resolve_sent_charge(db, bad_payment.uuid, is_paid=False)
+    assert reconcile_sent_charges(db) == []
+    charged_tokens.clear()
+    result = collect_fee()
+    assert result["total"] == 1
+    assert charged_tokens == [users[0].payplus_card_uid]
+
+
+def test_payplus_client(monkeypatch, settings: Settings = get_settings()):
+    import httpx
+    from app.controller.payplus_client import PayPlusClient, PayPlusCircuitOpen
+    from app.controller.payplus_fake import FakePayPlus
+
+    fake = FakePayPlus()
+    client = fake.client(settings)
+    monkeypatch.setattr(client, "backoff", lambda attempt: 0)
+    response = client.post(
+        "/Transactions/Charge",
+        json={"token": "card", "amount": 10, "more_info_1": '{"charge_key": "a"}'},
+    )
+    assert response.json()["results"]["status"] == "success"
+    assert fake.charges == {"a": 10}
+
+    requests = []
+
+    def unavailable(request: httpx.Request):
+        requests.append(request)
+        raise httpx.ConnectError("refused", request=request)
+
+    client = PayPlusClient(
+        settings,
+        transport=httpx.MockTransport(unavailable),
+        base_url=FakePayPlus.base_url,
+    )
+    monkeypatch.setattr(client, "backoff", lambda attempt: 0)
+    with pytest.raises(httpx.ConnectError):
+        client.post("/Customers/Add", json={})
+    # not sent requests are retried
+    assert len(requests) == settings.PAY_PLUS_RETRIES + 1
+
+    with pytest.raises(httpx.RequestError):
+        for _ in range(settings.PAY_PLUS_CIRCUIT_FAILURES):
+            client.post("/Customers/Add", json={})
+    sent = len(requests)
+    with pytest.raises(PayPlusCircuitOpen):
+        client.post("/Customers/Add", json={})
+    assert len(requests) == sent
+
+
+def test_collect_fee_fake_payplus(
+    db: Session,
+    monkeypatch,
+    test_data: TestData,
+    authorized_users_tokens: list[s.Token],
+    settings: Settings = get_settings(),
+):
+    from app.controller import payplus
+    from app.controller.payplus_fake import FakePayPlus
+
+    fill_test_data(db)
+    users = db.scalars(select(m.User)).all()
+    for user in users:
+        generate_card_token(user, db)
+        db.add(m.PlatformPayment(user_id=user.id))
+    db.commit()
+
+    fake = FakePayPlus(latency_ms=10)
+    fake.rejected_tokens.add(users[0].payplus_card_uid)
+    client = fake.client(settings)
+    monkeypatch.setattr(payplus, "get_payplus_client", lambda: client)
+
+    result = collect_fee()
+    assert result["total"] == len(users)
+    assert result["rejected"] == 1
+    assert result["paid"] == len(users) - 1
+    assert len(fake.charges) == len(users) - 1
+
+
+def test_payplus_webhook_inbox(
+    client: TestClient,
+    db: Session,
+    monkeypatch,
+    test_data: TestData,
+):
+    import json
+    from app.router import platform_payment as payment_router
+    from app.controller.celery import apply_payplus_webhook_event
+    from app.controller.payplus_webhook import replay_webhook_events
+
+    scheduled = []
+    monkeypatch.setattr(payment_router, "schedule_webhook_event", scheduled.append)
+
+    fill_test_data(db)
+    user = db.scalar(select(m.User))
+    platform_payment = m.PlatformPayment(user_id=user.id)
+    db.add(platform_payment)
+    db.commit()
+
+    def webhook(payment_uuid: str, number: str) -> dict:
+        return {
+            "transaction_type": "Charge",
+            "transaction": {
+                "number": number,
+                "status_code": "000",
+                "date": "2026-10-18 20:00:00",
+                "more_info_1": json.dumps({"platform_payment_uuid": payment_uuid}),
+            },
+        }
+
+    data = webhook(platform_payment.uuid, "1")
+    for _ in range(2):
+        response = client.post("api/payment/webhook", json=data)
+        assert response.status_code == status.HTTP_200_OK
+    # resent webhook is stored once
+    assert len(scheduled) == 1
+    event = db.get(m.PayPlusWebhookEvent, scheduled[0])
+    assert event.status == s.enums.WebhookEventStatus.RECEIVED
+    assert event.platform_payment_uuid == platform_payment.uuid
+    assert platform_payment.status == s.enums.PlatformPaymentStatus.UNPAID
+
+    for _ in range(2):
+        apply_payplus_webhook_event.apply(args=(event.id,))
+    db.expire_all()
+    assert event.status == s.enums.WebhookEventStatus.PROCESSED
+    assert event.attempts == 1
+    assert platform_payment.status == s.enums.PlatformPaymentStatus.PAID
+    assert platform_payment.transaction_number == "1"
+
+    response = client.post("api/payment/webhook", json=webhook("unknown", "2"))
+    assert response.status_code == status.HTTP_200_OK
+    apply_payplus_webhook_event.apply(args=(scheduled[-1],))
+    failed = db.get(m.PayPlusWebhookEvent, scheduled[-1])
+    assert failed.status == s.enums.WebhookEventStatus.FAILED
+
+    assert replay_webhook_events(
+        db, [s.enums.WebhookEventStatus.FAILED], inline=True
+    ) == [failed.id]
+    db.expire_all()
+    assert failed.attempts == 2
+
+    response = client.post("api/payment/webhook", content=b"not json")
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
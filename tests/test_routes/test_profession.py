@@ -3,6 +3,7 @@ from fastapi.testclient import TestClient
 from sqlalchemy.orm import Session
 from tests.utility import create_professions, fill_test_data
 
+import app.model as m
 import app.schema as s
 
 
@@ -18,3 +19,33 @@ def test_get_professions(
     assert response.status_code == status.HTTP_200_OK
     resp_obj = s.ProfessionList.parse_obj(response.json())
     assert len(resp_obj.professions) > 0
+
+
+def test_professions_cache(
+    client: TestClient,
+    db: Session,
+):
+    from app.controller import reference_cache, PROFESSIONS_CACHE_KEY
+
+    create_professions(db)
+
+    response = client.get("api/professions")
+    assert response.status_code == status.HTTP_200_OK
+    etag = response.headers["ETag"]
+    professions_num = len(response.json()["professions"])
+
+    response = client.get("api/professions", headers={"If-None-Match": etag})
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+    assert not response.content
+
+    # cached response is served until invalidated
+    db.add(m.Profession(name_en="Cached", name_hebrew="Cached"))
+    db.commit()
+    response = client.get("api/professions", headers={"If-None-Match": etag})
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+    reference_cache.invalidate(PROFESSIONS_CACHE_KEY)
+    response = client.get("api/professions", headers={"If-None-Match": etag})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["ETag"] != etag
+    assert len(response.json()["professions"]) == professions_num + 1
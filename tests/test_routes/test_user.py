@@ -2,6 +2,7 @@ import base64
 import json
 from datetime import datetime, timedelta
 
+import pytest
 from fastapi import status
 from fastapi.encoders import jsonable_encoder
 from fastapi.testclient import TestClient
@@ -26,6 +27,7 @@ from tests.utility import (
     generate_customer_uid,
     create_jobs_for_user,
     create_attachments_for_user,
+    create_reviews,
 )
 
 
@@ -69,7 +71,7 @@ def test_signup(
     authorized_users_tokens: list[s.Token],
     faker,
 ):
-    import httpx
+    from app.controller.payplus_client import get_payplus_client
 
     payplus_response = {
         "results": {
@@ -91,7 +93,7 @@ def test_signup(
 
         return MockResponse()
 
-    monkeypatch.setattr(httpx, "post", mock_post)
+    monkeypatch.setattr(get_payplus_client(), "post", mock_post)
 
     create_professions(db)
     create_locations(db)
@@ -227,7 +229,7 @@ def test_google_auth(
     test_data: TestData,
     faker,
 ) -> None:
-    import httpx
+    from app.controller.payplus_client import get_payplus_client
 
     payplus_response = {
         "results": {
@@ -249,7 +251,7 @@ def test_google_auth(
 
         return MockResponse()
 
-    monkeypatch.setattr(httpx, "post", mock_post)
+    monkeypatch.setattr(get_payplus_client(), "post", mock_post)
 
     create_professions(db)
     create_locations(db)
@@ -316,7 +318,7 @@ def test_apple_auth(
     test_data: TestData,
     faker,
 ) -> None:
-    import httpx
+    from app.controller.payplus_client import get_payplus_client
 
     payplus_response = {
         "results": {
@@ -338,7 +340,7 @@ def test_apple_auth(
 
         return MockResponse()
 
-    monkeypatch.setattr(httpx, "post", mock_post)
+    monkeypatch.setattr(get_payplus_client(), "post", mock_post)
 
     create_locations(db)
     create_professions(db)
@@ -406,7 +408,7 @@ def test_get_user_profile(
     authorized_users_tokens: list[s.Token],
     faker,
 ):
-    import httpx
+    from app.controller.payplus_client import get_payplus_client
 
     payplus_response = {
         "results": {
@@ -430,7 +432,7 @@ def test_get_user_profile(
 
         return MockResponse()
 
-    monkeypatch.setattr(httpx, "post", mock_post)
+    monkeypatch.setattr(get_payplus_client(), "post", mock_post)
 
     create_professions(db)
     create_locations(db)
@@ -928,6 +930,98 @@ def test_payments_tab(
         )
 
 
+def test_payments_tab_totals(
+    client: TestClient,
+    db: Session,
+    test_data: TestData,
+    authorized_users_tokens: list[s.Token],
+    query_counter,
+):
+    create_professions(db)
+    create_locations(db)
+    fill_test_data(db)
+    create_jobs(db)
+
+    user: m.User = db.scalar(
+        select(m.User).where(m.User.email == test_data.test_authorized_users[0].email)
+    )
+    user_id = user.id
+    create_jobs_for_user(db, user_id, 15)
+    # unpaid jobs to page through, statuses of created jobs are random
+    # and paid status can't be downgraded
+    not_paid_jobs = [
+        job
+        for job in db.get(m.User, user_id).jobs_to_do
+        if job.payment_status != s.enums.PaymentStatus.PAID
+    ]
+    for job in not_paid_jobs[:5]:
+        job.set_enum(s.enums.PaymentStatus.UNPAID, db)
+    db.commit()
+    headers = {"Authorization": f"Bearer {authorized_users_tokens[0].access_token}"}
+
+    def total(jobs: list[m.Job], field: str, status_field: str, status) -> float:
+        return sum(
+            getattr(j, field) for j in jobs if getattr(j, status_field) == status
+        )
+
+    PaymentStatus, CommissionStatus = s.enums.PaymentStatus, s.enums.CommissionStatus
+    with query_counter() as counter:
+        response = client.get("api/users/payments-tab", headers=headers)
+    assert response.status_code == status.HTTP_200_OK
+    # principal and all totals in one query
+    assert counter.count <= 2
+    tab = s.PaymentTab.parse_obj(response.json())
+    user = db.get(m.User, user_id)
+    jobs_to_do, jobs_owned = user.jobs_to_do, user.jobs_owned
+    assert tab.total_earnings == total(
+        jobs_to_do, "payment", "payment_status", PaymentStatus.PAID
+    )
+    assert tab.unpaid_payments == total(
+        jobs_to_do, "payment", "payment_status", PaymentStatus.UNPAID
+    )
+    assert tab.approve_payments == total(
+        jobs_to_do, "payment", "payment_status", PaymentStatus.REQUESTED
+    )
+    assert tab.send_payments == total(
+        jobs_owned, "payment", "payment_status", PaymentStatus.REQUESTED
+    )
+    assert tab.unpaid_commissions == pytest.approx(
+        total(jobs_to_do, "commission", "commission_status", CommissionStatus.UNPAID)
+    )
+    assert tab.approve_commissions == pytest.approx(
+        total(jobs_to_do, "commission", "commission_status", CommissionStatus.REQUESTED)
+    )
+    assert tab.send_commissions == pytest.approx(
+        total(jobs_owned, "commission", "commission_status", CommissionStatus.REQUESTED)
+    )
+
+    params = {
+        "tab_type": s.enums.PaymentsTab.PAYMENT.value,
+        "additional_info_tab": s.AdditionalInfoTab.UNPAID.value,
+    }
+    response = client.get(
+        "api/users/additional-info-payments", headers=headers, params=params
+    )
+    all_jobs = s.PaymentTabOutList.parse_obj(response.json()).data
+    assert all_jobs
+
+    paged_jobs, cursor = [], None
+    while True:
+        response = client.get(
+            "api/users/additional-info-payments",
+            headers=headers,
+            params=dict(params, paginated=True, limit=2, cursor=cursor),
+        )
+        assert response.status_code == status.HTTP_200_OK
+        page = s.PaymentTabOutList.parse_obj(response.json())
+        assert len(page.data) <= 2
+        paged_jobs += page.data
+        cursor = page.next_cursor
+        if not cursor:
+            break
+    assert [j.job_id for j in paged_jobs] == [j.job_id for j in all_jobs]
+
+
 def test_is_new_user(
     client: TestClient,
     db: Session,
@@ -942,3 +1036,53 @@ def test_is_new_user(
     user.created_at = datetime.now() - timedelta(days=92)
     db.commit()
     assert not user.is_new_user
+
+
+def test_users_stats(
+    client: TestClient,
+    db: Session,
+    faker,
+):
+    from app.controller import update_users_stats
+
+    create_professions(db)
+    create_locations(db)
+    fill_test_data(db)
+    create_jobs(db)
+    create_reviews(db)
+
+    def assert_stats_are_actual():
+        db.expire_all()
+        for user in db.scalars(select(m.User)).all():
+            assert user.jobs_posted_count == len(user.jobs_owned)
+            assert user.jobs_completed_count == len(
+                [
+                    job
+                    for job in user.jobs_to_do
+                    if job.status == s.enums.JobStatus.JOB_IS_FINISHED
+                ]
+            )
+            assert user.jobs_canceled_count == len(
+                [job for job in user.jobs_to_do if job.is_deleted]
+            )
+            for rate, count in (
+                (s.BaseRate.RateStatus.POSITIVE, user.positive_rates_count),
+                (s.BaseRate.RateStatus.NEGATIVE, user.negative_rates_count),
+                (s.BaseRate.RateStatus.NEUTRAL, user.neutral_rates_count),
+            ):
+                assert count == len([r for r in user.owned_rates if r.rate == rate])
+
+    assert_stats_are_actual()
+
+    job: m.Job = db.scalar(select(m.Job).where(m.Job.worker_id.is_not(None)))
+    job.is_deleted = True
+    job.set_enum(s.enums.JobStatus.JOB_IS_FINISHED, db)
+    job.worker_id = db.scalar(select(m.User.id).where(m.User.id != job.worker_id))
+    db.commit()
+    assert_stats_are_actual()
+
+    # rebuilding from scratch gives the same result
+    db.execute(m.UserStats.__table__.delete())
+    update_users_stats(db)
+    db.commit()
+    assert_stats_are_actual()
@@ -1,6 +1,6 @@
 from fastapi.testclient import TestClient
 from sqlalchemy.orm import Session
-from sqlalchemy import select
+from sqlalchemy import select, update
 from fastapi import status
 
 
@@ -29,3 +29,56 @@ def test_who_am_i(
     assert response.status_code == status.HTTP_200_OK
     resp_obj: s.WhoAmIOut = s.WhoAmIOut.parse_obj(response.json())
     assert resp_obj.uuid == user.uuid
+    assert not resp_obj.is_payment_method_invalid
+
+    db.add(
+        m.PlatformPayment(
+            user_id=user.id, status=s.enums.PlatformPaymentStatus.REJECTED
+        )
+    )
+    db.commit()
+    response = client.get(
+        "api/whoami/user",
+        headers={"Authorization": f"Bearer {authorized_users_tokens[0].access_token}"},
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert s.WhoAmIOut.parse_obj(response.json()).is_payment_method_invalid
+
+
+def test_payment_method_invalid_flag(
+    db: Session,
+    test_data: TestData,
+    authorized_users_tokens: list[s.Token],
+):
+    from app.controller import update_users_payment_method, check_users_payment_method
+
+    user: m.User = db.scalar(
+        select(m.User).where(m.User.phone == test_data.test_authorized_users[0].phone)
+    )
+    assert not user.is_payment_method_invalid
+
+    platform_payment = m.PlatformPayment(
+        user_id=user.id, status=s.enums.PlatformPaymentStatus.REJECTED
+    )
+    db.add(platform_payment)
+    db.commit()
+    assert user.is_payment_method_invalid
+
+    # paid by webhook
+    platform_payment.status = s.enums.PlatformPaymentStatus.PAID
+    db.commit()
+    assert not user.is_payment_method_invalid
+    assert not check_users_payment_method(db)
+
+    # flag broken by raw update is found and recalculated
+    db.execute(
+        update(m.User)
+        .where(m.User.id == user.id)
+        .values(is_payment_method_invalid=True)
+    )
+    db.commit()
+    assert check_users_payment_method(db) == [user.id]
+    update_users_payment_method(db)
+    db.commit()
+    assert not check_users_payment_method(db)
+    assert not user.is_payment_method_invalid
@@ -2,6 +2,7 @@ from sqlalchemy.orm import Session
 
 from app import model as m
 from app.utility import generate_uuid
+from app.utility.principal_cache import principal_cache
 
 
 def generate_customer_uid(user: m.User, db: Session) -> str:
@@ -22,5 +23,7 @@ def generate_card_token(user: m.User, db: Session) -> str:
     user.payplus_card_uid = generate_uuid()
     db.commit()
     db.refresh(user)
+    # as create_payplus_token does
+    principal_cache.invalidate(user.id)
 
     return user.payplus_card_uid